@@ -1,5 +1,7 @@
 from typing import Optional
-from .models import Project, Element, Board, Circuit
+from .models import Project, Element, Board, Circuit, Cable
+from elektryka_cutlist import polyline_m
+from elektryka_phases import THREE_PHASE, CircuitPhase, PhasePlan, balance_phases
 
 ET_COLORS = {
     "GNIAZDKO": "#1f77b4",
@@ -40,6 +42,35 @@ def find_board(project: Project, name: str) -> Optional[Board]:
             return b
     return None
 
+def cable_length_m(project: Project, cable: Cable, px_per_meter: float) -> Optional[float]:
+    """Długość przewodu po łamanej; bez łamanej — odległość między elementami."""
+    pts = list(cable.points)
+    if len(pts) < 2:
+        a = next((e for e in project.elements if e.id == cable.a_element_id), None)
+        b = next((e for e in project.elements if e.id == cable.b_element_id), None)
+        if a is None or b is None:
+            return None
+        pts = [(a.x, a.y), (b.x, b.y)]
+    return polyline_m(pts, px_per_meter)
+
+def cut_items(project: Project, px_per_meter: float):
+    """Odcinki do wykazu cięć: (Cable.kind, długość, opis)."""
+    for cab in project.cables:
+        yield cab.kind, cable_length_m(project, cab, px_per_meter), cab.id
+
+def phase_items(board: Board):
+    """Obwody rozdzielnicy do rozkładu faz: obciążenie load_va; aparat 3+ biegunowy = obwód trójfazowy."""
+    three = {m.circuit_id for m in board.modules if m.circuit_id and m.poles >= 3}
+    return [CircuitPhase(c.id, float(c.load_va or 0), c.phase, c.phase_pinned, c.phase == THREE_PHASE or c.id in three)
+            for c in board.circuits]
+
+def balance_board(board: Board) -> PhasePlan:
+    """Rozłóż obwody 1f rozdzielnicy na L1/L2/L3 i zapisz fazy w obwodach."""
+    plan = balance_phases(phase_items(board))
+    for c in board.circuits:
+        c.phase = plan.assignment.get(c.id, c.phase)
+    return plan
+
 def clamp(v, a, b):
     return max(a, min(b, v))
 
@@ -3,10 +3,13 @@ from tkinter import ttk, messagebox, simpledialog
 from typing import Optional, Tuple
 from .store import load_project, save_project
 from .models import Element, Cable, Board, Circuit, Project, Module
-from .board_logic import ET_COLORS, next_symbol, circuit_of_element, clamp
+from .board_logic import ET_COLORS, next_symbol, circuit_of_element, clamp, cut_items, balance_board, phase_items
+from elektryka_cutlist import format_plan, plan_cuts
+from elektryka_phases import format_loads, phase_loads
 
 CANVAS_W, CANVAS_H = 1024, 576
 GRID_SIZE = 40
+PX_PER_METER = GRID_SIZE   # oczko siatki = 1 m (długości przewodów do wykazu cięć)
 
 # Paleta aparatów (typ → (domyślna etykieta, polary/pola, kolor))
 MODULE_PALETTE = {
@@ -77,6 +80,7 @@ class ElektrykaApp(ttk.Frame):
         btns = ttk.Frame(right); btns.pack(pady=6)
         ttk.Button(btns, text="Połącz przewodem", command=self._start_connect).grid(row=0, column=0, padx=2)
         ttk.Button(btns, text="Usuń", command=self._delete_selected).grid(row=0, column=1, padx=2)
+        ttk.Button(right, text="Wykaz cięć (bębny)", command=self._cut_list).pack(pady=(0,6))
 
         self.status = ttk.Label(self.tab_plan, text="Gotowe", anchor="w"); self.status.pack(fill="x", side="bottom")
         self._update_status()
@@ -104,6 +108,7 @@ class ElektrykaApp(ttk.Frame):
         self.list_circuits = tk.Listbox(left, height=12); self.list_circuits.pack(fill="both", expand=True, padx=2)
         ttk.Button(left, text="Dodaj obwód", command=self._add_circuit).pack(pady=6)
         ttk.Button(left, text="Usuń obwód", command=self._del_circuit).pack()
+        ttk.Button(left, text="Rozłóż na fazy", command=self._balance_phases).pack(pady=6)
 
         # paleta modułów
         ttk.Label(right, text="Paleta aparatów").pack(pady=(0,4))
@@ -282,6 +287,12 @@ class ElektrykaApp(ttk.Frame):
             self._save()
         self._update_status()
 
+    def _cut_list(self):
+        plans = plan_cuts(cut_items(self.project, PX_PER_METER))
+        win = tk.Toplevel(self); win.title("Wykaz cięć przewodów")
+        txt = tk.Text(win, width=100, height=24, wrap="none"); txt.pack(fill="both", expand=True, padx=6, pady=6)
+        txt.insert("1.0", format_plan(plans) or "Brak przewodów."); txt.config(state="disabled")
+
     def _update_status(self, text: Optional[str] = None):
         if not hasattr(self, "status"):
             return
@@ -312,7 +323,7 @@ class ElektrykaApp(ttk.Frame):
         b = self._current_board()
         if not b: return
         for c in b.circuits:
-            self.list_circuits.insert("end", f"{c.name} / {c.breaker} / {c.rcd or '—'}")
+            self.list_circuits.insert("end", f"{c.name} / {c.breaker} / {c.rcd or '—'} / {c.phase or '—'}")
 
     def _refresh_board_view(self):
         self._refresh_board_lists()
@@ -336,12 +347,19 @@ class ElektrykaApp(ttk.Frame):
             x = pad + c*sz
             self.board_canvas.create_line(x, pad, x, pad+b.rows*sz, fill="#eceff1")
         # moduły
+        phases = {c.id: c.phase for c in b.circuits if c.phase}
         for m in b.modules:
             self._draw_module(m, pad, sz)
+            if phases.get(m.circuit_id):   # faza obwodu w rogu aparatu
+                self.board_canvas.create_text(pad + m.col*sz + 2, pad + m.row*sz + 1, anchor="nw", text=phases[m.circuit_id],
+                                              fill="#ffeb3b", font=("Segoe UI", 6), tags=(f"mod-{m.id}",))
         # info
         self.txt_info.insert("end", f"{b.name} ({b.location})  |  wiersze: {b.rows}, kolumny: {b.cols}\n")
+        if any(c.phase for c in b.circuits):
+            self.txt_info.insert("end", f"Fazy: {format_loads(phase_loads(phase_items(b)), 'VA')}\n")
         for c in b.circuits:
-            self.txt_info.insert("end", f" • {c.name} — {c.breaker}, RCD {c.rcd or '—'}\n")
+            ph = f", faza {c.phase}" + (" (przypięta)" if c.phase_pinned else "") if c.phase else ""
+            self.txt_info.insert("end", f" • {c.name} — {c.breaker}, RCD {c.rcd or '—'}{ph}\n")
 
     def _draw_module(self, m: Module, pad: int, sz: int):
         x1 = pad + m.col*sz
@@ -385,6 +403,13 @@ class ElektrykaApp(ttk.Frame):
         del b.circuits[sel[0]]
         self._refresh_board_view(); self._save()
 
+    def _balance_phases(self):
+        b = self._current_board()
+        if not b or not b.circuits: return
+        plan = balance_board(b)
+        self._refresh_board_view(); self._save()
+        messagebox.showinfo("Rozkład faz", f"Zmieniono fazy obwodów: {len(plan.moved)}\n{format_loads(plan.loads, 'VA')}")
+
     # --- Canvas: dodawanie/drag/usuwanie modułów ---
     def _board_click(self, ev):
         b = self._current_board()
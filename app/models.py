@@ -30,6 +30,8 @@ class Circuit:
     color: str = "#000000"
     enabled: bool = True
     load_va: int = 0
+    phase: str = ""        # L1/L2/L3, 3F albo "" (nieprzypisany)
+    phase_pinned: bool = False
 
 # 👉 NOWE: moduł na szynie DIN (w widoku rozdzielnicy)
 @dataclass
@@ -7,13 +7,36 @@
 #
 # Uwaga: minimalna ingerencja w istniejący kod (0.6.0) — dodane dataclassy, kilka paneli i rysowanie.
 
-import json, os
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Optional, Tuple
+import copy, io, json, os, queue, threading, time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
 
 from ui_calc import CableCalculatorDialog
+from elektryka_model import (Connection, Element, Segment, Link, Room, House, Circuit, Project,
+                             project_to_dict, project_from_dict, room_to_dict)
+from elektryka_autosave import AutosaveWriter, make_snapshot, read_manifest, load_recovery
+from elektryka_shards import ShardStore, PROJECT_DIR_SUFFIX, open_project_dir, save_project_dir, room_path
+from elektryka_archive import ElkArchive, ELK_SUFFIX, is_archive_ref, save_archive
+from elektryka_render import ExportCancelled, render_room, export_pages_pdf, resolve_room
+from elektryka_vector import export_rooms_pdf, export_room_svg
+from elektryka_settings import SETTINGS_FILE, CompiledSettings, compile_settings, load_settings
+from elektryka_thumbs import THUMB_SIZE, ThumbnailWorker
+from elektryka_leads import LeadRegistry, build_registry, lead_info, new_lead_id
+from elektryka_index import ElementIndex
+from elektryka_topology import TopologyCache
+from elektryka_routing import RouteCache
+from elektryka_housegraph import HouseGraphCache
+from elektryka_loads import LoadEngine
+from elektryka_chains import ChainEngine, would_cycle
+from elektryka_controls import ControlGraph, format_ref, parse_ref
+from elektryka_cutlist import format_plan, options as cut_options, plan_cuts, project_items
+from elektryka_protection import check_project, format_report as protection_report
+from elektryka_phases import PHASES, THREE_PHASE, CircuitPhase, balance_phases, format_loads, phase_loads, three_phase_circuits
+from elektryka_profiles import (DAYS as PROFILE_DAYS, format_result as profile_report, group_loads, profiles,
+                                project_items as profile_items, simulate)
+from elektryka_dxf import KINDS as DXF_KINDS, DxfError, guess_kind, import_segments, scan_layers
 
 try:
     from PIL import Image, ImageDraw, ImageTk
@@ -23,92 +46,67 @@ except Exception:
     Image = ImageDraw = ImageTk = None
 
 APP_TITLE = "Elektryka 0.7.2-pre"
-SETTINGS_FILE = "settings.json"
 PROJECT_FILE_DEFAULT = "project.json"
 
-# ================== DANE ==================
-@dataclass
-class Connection:
-    cable_type: str
-    conductors: Dict[str, bool]
-    to_distribution: bool = True
-    note: str = ""
-    circuit_id: Optional[str] = None
-
-@dataclass
-class Element:
-    id: str
-    type: str
-    x: int
-    y: int
-    label: str = ""
-    variant: str = ""
-    power_w: Optional[float] = None
-    chain_prev: Optional[str] = None
-    controls: List[str] = field(default_factory=list)
-    connections: List[Connection] = field(default_factory=list)
-    max_current_a: Optional[float] = None
-
-# --- NOWE: układ pokoju (origami) ---
-@dataclass
-class Segment:
-    kind: str              # "SCIANA" | "OKNO" | "DRZWI" | "PRZEJSCIE"
-    a: Tuple[int,int]      # (x1,y1)
-    b: Tuple[int,int]      # (x2,y2)
-    label: str = ""        # np. N/E/S/W
-    portal_to_room: Optional[str] = None   # jeśli PRZEJSCIE łączy inny pokój
-    portal_side: Optional[str] = None      # "N"|"E"|"S"|"W"
-
-@dataclass
-class Link:
-    a_id: str              # element id źródło
-    b_id: str              # element id cel
-    circuit_id: Optional[str] = None
-    note: str = ""
-    b_room: Optional[str] = None           # jeśli cel w innym pokoju
-
-@dataclass
-class Room:
-    name: str
-    background_image: str = ""
-    elements: List[Element] = field(default_factory=list)
-    # NOWE:
-    segments: List[Segment] = field(default_factory=list)
-    links: List[Link] = field(default_factory=list)
-
-@dataclass
-class House:
-    name: str
-    rooms: List[Room] = field(default_factory=list)
-
-@dataclass
-class Circuit:
-    id: str
-    name: str
-    color: str = "czarny"
-    breaker: str = ""
-    desc: str = ""
-    assigned_leads: List[str] = field(default_factory=list)
-
-@dataclass
-class Project:
-    version: str = "0.7.2-pre"
-    houses: List[House] = field(default_factory=list)
-    circuits: List[Circuit] = field(default_factory=list)
-    distribution_board: dict = field(default_factory=lambda: {"free_leads": []})
-    meta: dict = field(default_factory=dict)
-
 # ================== APP ==================
 class ElektrykaApp:
     def __init__(self, root: tk.Tk):
         self.root = root; root.title(APP_TITLE)
         self.settings = self._load_settings()
+        self.cfg: CompiledSettings = compile_settings(self.settings)   # kolory/limity gotowe do rysowania
+        self._settings_mtime = self._settings_stamp()
         self.project = Project()
+        self.project_path: Optional[str] = None
+        self._shards: Optional[ShardStore] = None   # projekt katalogowy: leniwe pokoje
+        self._archive: Optional[ElkArchive] = None  # projekt .elk: tła czytane z archiwum
+        self.leads = LeadRegistry()                  # przewody rozdzielnicy (źródło dla free_leads/assigned_leads)
+        self.index = ElementIndex(self.project)      # (dom, pokój, id) -> element — cele linków między pokojami
+        self.topology = TopologyCache()              # graf ścian pokoi (obrys, powierzchnia, strony N/E/S/W)
+        self.routes = RouteCache(self.topology)      # trasy kabli wzdłuż ścian (siatka A* na pokój)
+        self.housegraph = HouseGraphCache(self.routes, self.project)   # przewody do rozdzielnicy przez przejścia
+        self.loads = LoadEngine(self.cfg, circuit_of=lambda lid: self.leads.circuit_of(lid),
+                                length_of=self._cable_length)   # obciążenia i spadki napięcia
+        self.chains = ChainEngine(self.cfg, link_length=self._chain_length, loads=self.loads)   # ciągi „Ciąg dalszy z”
+        self.controls = ControlGraph(self.project)  # łącznik ↔ sterowane elementy (Element.controls)
+        self._protection = None                      # impedancja pętli obwodów — liczona na żądanie
+        # przeliczenie przewodów po zmianie ścian/przejść — odkładane, tylko pokoje o zmienionej trasie
+        self._reroute_job = None
+        self._reroute_houses: Set[str] = set(); self._reshaped: Dict[str, Room] = {}
+        # projekt katalogowy: pokoje niewczytane liczone w tle (wątek czyta pliki, silniki w wątku Tk)
+        self._unfilled: Set[str] = set()             # pokoje niewczytane jeszcze nie policzone przez silniki
+        self._fill_views: Dict[str, Room] = {}       # pokoje z plików w trakcie dopisywania do silników
+        self._fill: Optional[Tuple[threading.Thread, threading.Event, queue.Queue]] = None
+        self._hover_el: Optional[str] = None
+
+        # autozapis: pokoje zmienione od ostatniego zrzutu (uid -> Room)
+        self._dirty_rooms: Dict[str, Room] = {}
+        self._unsaved = False; self._autosave_pending = True
+        self._autosave: Optional[AutosaveWriter] = None; self._autosave_interval_ms = 60000
 
         self.current_house_idx = 0
         self.current_room_idx = 0
 
         self.bg_image = None; self.bg_pil = None
+        self._bg_cache: "OrderedDict[str, object]" = OrderedDict()   # zdekodowane tła (PIL) wg źródła
+
+        # cache pasków żył: (żyły włączone) -> PhotoImage; czyszczony przy zmianie kolorów żył
+        self._chip_cache: Dict[Tuple[str,...], object] = {}
+        self._chip_cache_sig = None
+
+        # listy po prawej: stan wierszy Treeview i zaplanowane porcje wstawiania
+        self._tree_rows: Dict[ttk.Treeview, Dict[str, tuple]] = {}
+        self._tree_jobs: Dict[ttk.Treeview, str] = {}
+
+        # eksport w tle: (wątek, Event anulowania, kolejka komunikatów) — najwyżej jeden naraz
+        self._export: Optional[Tuple[threading.Thread, threading.Event, queue.Queue]] = None
+
+        # miniatury pokoi: uid -> plik PNG aktualny dla bieżącej wersji pokoju (brak = do wygenerowania)
+        self._thumbs: Optional[ThumbnailWorker] = None
+        self._thumb_paths: Dict[str, str] = {}
+        self._thumb_images: Dict[str, tk.PhotoImage] = {}
+        self._thumb_gen: Dict[str, int] = {}        # wersja pokoju — wynik dla starszej wersji jest odrzucany
+        self._thumb_pending: set = set()
+        self._picker = None                          # otwarte okno wyboru: (Toplevel, Treeview, uid -> iid)
 
         # widok / filtry
         self.only_circuit_var = tk.BooleanVar(value=False)
@@ -124,23 +122,44 @@ class ElektrykaApp:
         self._build_ui()
         self._bind_keys()
         self._ensure_defaults()
+        self._mark_all_dirty()
+        self._attach_leads(); self._attach_index()
         self._refresh_lists()
         self._redraw()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     # ---------- settings ----------
     def _load_settings(self):
-        try:
-            with open(SETTINGS_FILE,"r",encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            messagebox.showwarning("Settings","Brak settings.json — używam domyślnych.")
-            return {
-                "ui":{"show_grid":True,"snap_to_grid":True,"default_grid_size":20,"show_conductor_chips_on_canvas":True,"auto_open_connections_dialog_on_place":True},
-                "limits":{"max_connections_per_element":4,"voltage_drop_lighting":3.0,"voltage_drop_general":5.0,"load_warning":0.8,"load_error":1.0,"socket_default_current_a":16.0},
-                "element_types":{"gniazdko":{},"wylacznik_1":{},"wylacznik_2":{},"roleta":{},"lampa":{}},
-                "colors":{"conductors":{"L":"#a52a2a","N":"#1a73e8","PE":"#9acd32","L1":"#a52a2a","L2":"#000000","L3":"#808080"},
-                          "circuit_palette":{"niebieski":"#1a73e8","czarny":"#000000","zolto-zielony":"#9acd32","szary":"#808080"}}
-            }
+        settings, err = load_settings(SETTINGS_FILE)
+        if err: messagebox.showwarning("Settings","Brak settings.json — używam domyślnych.")
+        return settings
+
+    def _settings_stamp(self):
+        try: return os.stat(SETTINGS_FILE).st_mtime_ns
+        except OSError: return None
+
+    def watch_settings(self, interval_ms: int = 1500):
+        """Przeładuj settings.json po zmianie pliku na dysku (sprawdzane co ``interval_ms``)."""
+        stamp = self._settings_stamp()
+        if stamp != self._settings_mtime:
+            self._settings_mtime = stamp
+            if stamp is not None: self._reload_settings()
+        self.root.after(interval_ms, self.watch_settings, interval_ms)
+
+    def _reload_settings(self):
+        settings, err = load_settings(SETTINGS_FILE)
+        if err:   # np. plik w trakcie zapisu albo błąd składni — zostają dotychczasowe ustawienia
+            self.status.set(f"settings.json: {err} — bez zmian"); return
+        self.settings = settings; self.cfg = compile_settings(settings)
+        self.loads.rebuild(self.project, settings=self.cfg)   # limity spadków i obciążeń
+        self.chains.rebuild(self.project, settings=self.cfg)
+        self._protection = None
+        self._start_fill()   # rebuild zna tylko pokoje wczytane — resztę policz ponownie w tle
+        # paski żył kluczowane są obiektem self.cfg, legenda eksportu — też (nowy obiekt = nowy klucz)
+        self._invalidate_chip_cache()
+        self.show_chips_var.set(self.settings.get("ui", {}).get("show_conductor_chips_on_canvas", True))
+        self._refresh_lists(); self._redraw()
+        self.status.set("Przeładowano settings.json")
 
     # ---------- helpers ----------
     def _cur_house(self) -> House:
@@ -153,7 +172,14 @@ class ElektrykaApp:
         h = self._cur_house()
         if not h.rooms: h.rooms.append(Room(name="Sypialnia"))
         self.current_room_idx = max(0, min(self.current_room_idx, len(h.rooms)-1))
-        return h.rooms[self.current_room_idx]
+        room = h.rooms[self.current_room_idx]
+        if self._shards is not None: self._shards.ensure_loaded(room)
+        return room
+
+    def _ensure_loaded(self, room: Room) -> Room:
+        """Pokój spoza bieżącego (dialogi) — doczytaj z projektu katalogowego, jeśli trzeba."""
+        if self._shards is not None: self._shards.ensure_loaded(room, keep=[self._cur_room()])
+        return room
 
     def _ensure_defaults(self):
         if not self.project.houses:
@@ -190,6 +216,7 @@ class ElektrykaApp:
         ttk.Button(rb, text="+ Pokój (wymiary mm)", command=self._add_room_by_size).pack(side="left", padx=6)
         ttk.Button(rb, text="Usuń", command=self._del_room).pack(side="left", padx=6)
         ttk.Button(rb, text="Zmień nazwę", command=self._rename_room).pack(side="left", padx=6)
+        ttk.Button(left, text="Wybierz pokój (podgląd)…", command=self._room_picker).pack(fill="x", padx=8)
 
         ttk.Separator(left).pack(fill="x", padx=8, pady=8)
         ttk.Label(left, text="Tło pokoju (JPG/JPEG/PNG)", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=8)
@@ -198,7 +225,7 @@ class ElektrykaApp:
 
         ttk.Separator(left).pack(fill="x", padx=8, pady=8)
         ttk.Label(left, text="Elementy (narzędzie)", font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=8)
-        self.tool_list = list(self.settings.get("element_types", {}).keys()) or ["gniazdko","wylacznik_1","wylacznik_2","roleta","lampa"]
+        self.tool_list = list(self.settings.get("element_types", {}).keys()) or ["gniazdko","wylacznik_1","wylacznik_2","roleta","lampa","rozdzielnica"]
         self.tool_var = tk.StringVar(value=self.tool_list[0])
         for t in self.tool_list:
             ttk.Radiobutton(left, text=t, value=t, variable=self.tool_var).pack(anchor="w", padx=12)
@@ -222,21 +249,32 @@ class ElektrykaApp:
 
         ttk.Label(right, text="Obwody", font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=8, pady=(8, 2))
         self.tv_circuits = ttk.Treeview(
-            right, columns=("name", "color", "breaker"), show="headings", height=8
+            right, columns=("name", "color", "breaker", "phase", "load", "loop"), show="headings", height=8
         )
         self.tv_circuits.heading("name", text="Nazwa")
         self.tv_circuits.heading("color", text="Kolor")
         self.tv_circuits.heading("breaker", text="Zabezp.")
-        self.tv_circuits.column("name", width=180)
-        self.tv_circuits.column("color", width=90)
-        self.tv_circuits.column("breaker", width=90)
+        self.tv_circuits.heading("phase", text="Faza")
+        self.tv_circuits.heading("load", text="Obciążenie")
+        self.tv_circuits.heading("loop", text="Zs / max")
+        self.tv_circuits.column("name", width=140)
+        self.tv_circuits.column("color", width=65)
+        self.tv_circuits.column("breaker", width=60)
+        self.tv_circuits.column("phase", width=45)
+        self.tv_circuits.column("load", width=100)
+        self.tv_circuits.column("loop", width=100)
+        self.tv_circuits.tag_configure("warn", foreground="#b58900")
+        self.tv_circuits.tag_configure("error", foreground="#c80000")
         self.tv_circuits.pack(fill="x", padx=8)
+        self.phase_info = tk.StringVar(value="")
+        ttk.Label(right, textvariable=self.phase_info, foreground="#555").pack(anchor="w", padx=8, pady=(2,0))
 
         cb = ttk.Frame(right)
         cb.pack(fill="x", padx=8, pady=4)
         ttk.Button(cb, text="+ Dodaj obwód", command=self._add_circuit).pack(side="left")
         ttk.Button(cb, text="Edytuj", command=self._edit_circuit).pack(side="left", padx=6)
         ttk.Button(cb, text="Usuń", command=self._del_circuit).pack(side="left")
+        ttk.Button(cb, text="Rozłóż na fazy", command=self._balance_phases).pack(side="left", padx=6)
 
         ttk.Separator(right).pack(fill="x", padx=8, pady=8)
         ttk.Label(right, text="Widok", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=8)
@@ -269,24 +307,43 @@ class ElektrykaApp:
         self.canvas.bind("<Button-1>", self._on_canvas_left)
         self.canvas.bind("<Button-3>", self._on_canvas_right)
         self.canvas.bind("<Configure>", lambda e:self._redraw())
+        self.canvas.bind("<Motion>", self._on_canvas_motion)
+        self.canvas.bind("<Leave>", lambda e: self._highlight_controls(None))
 
         # status
         self.status = tk.StringVar(value="Gotowy")
-        ttk.Label(self.root, textvariable=self.status, anchor="w").pack(side="bottom", fill="x")
+        sbar = ttk.Frame(self.root); sbar.pack(side="bottom", fill="x")
+        ttk.Label(sbar, textvariable=self.status, anchor="w").pack(side="left", fill="x", expand=True)
+        self.export_progress = ttk.Progressbar(sbar, length=160, mode="determinate")
+        self.btn_cancel_export = ttk.Button(sbar, text="Anuluj eksport", command=self._cancel_export)
 
         # menu
         menubar = tk.Menu(self.root)
         mfile = tk.Menu(menubar, tearoff=False)
         mfile.add_command(label="Wczytaj projekt (JSON)", command=self.load_project)
         mfile.add_command(label="Zapisz projekt (JSON)", command=self.save_project)
+        mfile.add_command(label="Wczytaj projekt (katalog pokoi)", command=self.load_project_dir)
+        mfile.add_command(label="Zapisz projekt (katalog pokoi)", command=self.save_project_dir)
+        mfile.add_command(label="Wczytaj projekt (archiwum .elk)", command=self.load_project_elk)
+        mfile.add_command(label="Zapisz projekt (archiwum .elk)", command=self.save_project_elk)
+        mfile.add_separator()
+        mfile.add_command(label="Importuj rzut DXF do pokoju…", command=self.import_dxf)
         mfile.add_separator()
         mfile.add_command(label="Eksport PDF pokoju", command=self.export_pdf)
+        mfile.add_command(label="Eksport PDF domu (wszystkie pokoje)", command=lambda: self.export_pdf_all("house"))
+        mfile.add_command(label="Eksport PDF projektu (wszystkie domy)", command=lambda: self.export_pdf_all("project"))
+        mfile.add_command(label="Eksport wektorowy pokoju (PDF/SVG)", command=self.export_vector)
+        mfile.add_command(label="Eksport wektorowy domu (PDF)", command=lambda: self.export_vector("house"))
         mfile.add_separator()
-        mfile.add_command(label="Wyjście", command=self.root.destroy)
+        mfile.add_command(label="Wyjście", command=self._on_close)
         menubar.add_cascade(label="Plik", menu=mfile)
 
         mtools = tk.Menu(menubar, tearoff=False)
         mtools.add_command(label="Kalkulator przewodów", command=self._open_cable_calculator)
+        mtools.add_command(label="Sprawdź linki między pokojami", command=self._check_links)
+        mtools.add_command(label="Wykaz cięć przewodów (bębny)…", command=self._cut_list)
+        mtools.add_command(label="Pętla zwarcia i zabezpieczenia…", command=self._protection_report)
+        mtools.add_command(label="Dobowy profil obciążenia…", command=self._load_profile)
         menubar.add_cascade(label="Narzędzia", menu=mtools)
         self.root.config(menu=menubar)
 
@@ -297,31 +354,268 @@ class ElektrykaApp:
     def _open_cable_calculator(self):
         CableCalculatorDialog(self.root)
 
+    def _check_links(self):
+        """Lista linków bez celu (usunięty element/pokój) w całym projekcie."""
+        bad = self.index.dangling()
+        controls = self.controls
+        if self._shards is not None:   # graf aplikacji zna tylko pokoje wczytane
+            controls = ControlGraph(); controls.rebuild(self.project, self._shards.view)
+        bad += [(h, r, Link(eid, tid, b_room=None if tr == r else tr), "brak elementu sterowanego")
+                for (h, r, eid), (_, tr, tid) in controls.dangling(self.index.get)]
+        if not bad:
+            messagebox.showinfo("Linki", "Wszystkie linki i sterowania mają cel."); return
+        d = tk.Toplevel(self.root); d.title(f"Linki bez celu ({len(bad)})"); d.transient(self.root)
+        tv = ttk.Treeview(d, columns=("house","room","link","why"), show="headings", height=14)
+        for col, txt, w in (("house","Dom",120), ("room","Pokój",140), ("link","Link",160), ("why","Problem",260)):
+            tv.heading(col, text=txt); tv.column(col, width=w, anchor="w")
+        for h, r, l, why in bad:
+            tv.insert("", "end", values=(h, r, f"{l.a_id} → {l.b_room + ':' if l.b_room else ''}{l.b_id}", why))
+        tv.pack(fill="both", expand=True, padx=8, pady=8)
+        ttk.Button(d, text="Zamknij", command=d.destroy).pack(anchor="e", padx=8, pady=(0,8))
+
+    def _cut_list(self):
+        """Przewody projektu rozpisane na bębny (cables.drums_m) — bęben po bębnie."""
+        view = self._shards.view if self._shards is not None else (lambda r: r)
+        drums, slack = cut_options(self.cfg)
+        plans = plan_cuts(project_items(self.project, view, self._cable_length), drums, slack)
+        text = format_plan(plans) or "Brak połączeń."
+        total = {}
+        for p in plans.values():
+            for size, n in p.drum_counts().items(): total[size] = total.get(size, 0) + n
+        self._show_text_report("Wykaz cięć przewodów",
+                               f"Bębny: " + (", ".join(f"{n}×{s:g} m" for s, n in sorted(total.items(), reverse=True)) or "—")
+                               + f"; zapas {slack:g} m na koniec przewodu", text, height=28)
+
+    def _project_snapshot(self):
+        """``(kopia projektu, view)`` do pracy w wątku: pokoje niewczytane to zaślepki, ``view`` czyta je z plików."""
+        snap = copy.deepcopy(self.project)
+        paths = {} if self._shards is None else {r.uid: room_path(self._shards.path, r.uid) for h in self.project.houses
+                                                 for r in h.rooms if not self._shards.is_loaded(r)}
+        return snap, (lambda r: resolve_room(paths[r.uid]) if r.uid in paths else r)
+
+    def _loop_check(self):
+        """Sprawdzenie pętli zwarcia do wykonania w wątku: ``check() -> {obwód: wynik}`` dla całego projektu.
+
+        :func:`elektryka_protection.check_project` liczy trasy i tory od zera na kopii projektu, jak :mod:`elektryka_cli`.
+        """
+        (snap, view), cfg = self._project_snapshot(), self.cfg
+        return lambda: check_project(snap, cfg, view)
+
+    def _protection_report(self):
+        """Samoczynne wyłączenie: Zs ≤ U0/Ia dla najdalszego elementu każdego obwodu (w tle, cały projekt)."""
+        check = self._loop_check(); circuits = copy.deepcopy(self.project.circuits)
+
+        def done(results, secs):
+            self._protection = results; self._refresh_lists()   # kolumna „Zs / max” do następnej zmiany
+            bad = sum(1 for cp in results.values() if cp.status == "error")
+            self._show_text_report("Pętla zwarcia i zabezpieczenia",
+                                   f"Obwody, w których wyłącznik nie zadziała: {bad}" if bad else "Wszystkie sprawdzone obwody wyłączą zwarcie.",
+                                   protection_report(results, circuits) or "Brak obwodów.")
+            return f"Pętla zwarcia: {len(results)} obwodów ({secs:.1f} s)"
+        self._start_task("Pętla zwarcia", lambda progress, cancel: check(), done)
+
+    def _load_profile(self):
+        """Symulacja dobowego obciążenia (profile typów elementów) — szczyty, percentyle, energia."""
+        days_var = tk.IntVar(value=PROFILE_DAYS); phases_var = tk.StringVar(value="3f")
+
+        def header(top):
+            ttk.Label(top, text="Liczba dób:").pack(side="left")
+            ttk.Spinbox(top, from_=10, to=10000, increment=100, textvariable=days_var, width=8).pack(side="left", padx=4)
+            ttk.Label(top, text="Przyłącze:").pack(side="left", padx=(12,0))
+            ttk.Combobox(top, values=["1f","3f"], textvariable=phases_var, state="readonly", width=4).pack(side="left", padx=4)
+            ttk.Button(top, text="Symuluj", command=run).pack(side="left", padx=(12,0))
+
+        def run():
+            try: days = max(1, int(days_var.get()))
+            except (tk.TclError, ValueError): days = PROFILE_DAYS
+            snap, view = self._project_snapshot(); types = profiles(self.cfg)
+            names = {c.id: c.name for c in snap.circuits}; phases = 1 if phases_var.get() == "1f" else 3
+            leads = {lid: c.id for c in snap.circuits for lid in c.assigned_leads}
+
+            def work(progress, cancel):   # pliki pokoi niewczytanych czytane w wątku
+                return simulate(group_loads(profile_items(snap, leads.get, view), types), days, progress=progress, cancel=cancel)
+
+            def done(res, secs):   # wynik z wątku — okno mogło zostać zamknięte
+                show(profile_report(res, names, phases))
+                return f"Symulacja {days} dób: {secs:.1f} s"
+            self._start_task("Symulacja obciążenia", work, done)
+
+        show = self._show_text_report("Dobowy profil obciążenia", header, width=120)
+        run()
+
+    def _show_text_report(self, title: str, header, text: str = "", width: int = 110, height: int = 24):
+        """Okno raportu tekstowego z „Zapisz…” i „Zamknij”. ``header`` — napis nad raportem albo
+        ``header(ramka)`` dodające własne kontrolki. Zwraca ``show(tekst)`` podmieniające treść."""
+        d = tk.Toplevel(self.root); d.title(title); d.transient(self.root)
+        top = ttk.Frame(d); top.pack(fill="x", padx=8, pady=(8,2))
+        if callable(header): header(top)
+        else: ttk.Label(top, text=header).pack(side="left")
+        txt = tk.Text(d, width=width, height=height, wrap="none"); txt.pack(fill="both", expand=True, padx=8, pady=4)
+        current = [""]
+
+        def show(new: str):
+            current[0] = new
+            if d.winfo_exists():
+                txt.config(state="normal"); txt.delete("1.0", "end"); txt.insert("1.0", new); txt.config(state="disabled")
+
+        def save():
+            path = filedialog.asksaveasfilename(parent=d, defaultextension=".txt", filetypes=[("Tekst","*.txt")])
+            if path and current[0]:
+                with open(path, "w", encoding="utf-8") as f: f.write(current[0] + "\n")
+                self.status.set(f"Zapisano „{title}”: {path}")
+        btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=(0,8))
+        ttk.Button(btns, text="Zamknij", command=d.destroy).pack(side="right")
+        ttk.Button(btns, text="Zapisz…", command=save).pack(side="right", padx=6)
+        show(text)
+        return show
+
     # ---------- refresh lists ----------
     def _refresh_lists(self):
-        self.lb_houses.delete(0,"end")
-        for h in self.project.houses: self.lb_houses.insert("end", h.name)
+        self._sync_listbox(self.lb_houses, [h.name for h in self.project.houses])
         if self.project.houses: self.lb_houses.selection_set(self.current_house_idx)
 
-        self.lb_rooms.delete(0,"end")
-        for r in self._cur_house().rooms: self.lb_rooms.insert("end", r.name)
+        self._sync_listbox(self.lb_rooms, [r.name for r in self._cur_house().rooms])
         if self._cur_house().rooms: self.lb_rooms.selection_set(self.current_room_idx)
 
-        for i in self.tv_circuits.get_children(): self.tv_circuits.delete(i)
-        for c in self.project.circuits:
-            self.tv_circuits.insert("", "end", iid=c.id, values=(c.name, c.color, c.breaker))
+        loads = {c.id: self.loads.circuit(c.id) for c in self.project.circuits}
+        prot = self._protection or {}   # ostatnie sprawdzenie pętli zwarcia (skasowane po zmianie)
+        self._sync_tree(self.tv_circuits, [(c.id, (c.name, c.color, c.breaker, f"[{c.phase}]" if c.phase_pinned and c.phase else c.phase,
+                                                   self._load_text(loads[c.id]), prot[c.id].text if c.id in prot else ""))
+                                           for c in self.project.circuits])
+        info = [format_loads(phase_loads(CircuitPhase(c.id, loads[c.id].current_a, c.phase) for c in self.project.circuits))
+                if any(c.phase for c in self.project.circuits) else "", self._incomplete()]
+        self.phase_info.set("  ·  ".join(x for x in info if x))   # obciążenia projektu katalogowego mogą być jeszcze niepełne
+        order = {"": 0, "ok": 1, "warn": 2, "error": 3}
+        for cid, cl in loads.items():
+            loop = prot[cid].status if cid in prot else ""
+            if self.tv_circuits.exists(cid): self.tv_circuits.item(cid, tags=(max(cl.status, loop, key=order.get),))
 
         self.filter_combo["values"] = [""] + [c.id for c in self.project.circuits]
         if self.filter_circuit_var.get() not in self.filter_combo["values"]:
             self.filter_circuit_var.set("")
 
-        for i in self.tv_leads.get_children(): self.tv_leads.delete(i)
-        for lead in self.project.distribution_board.get("free_leads", []):
-            self.tv_leads.insert("", "end", iid=lead["lead_id"],
-                                 values=(lead["lead_id"], lead["room"], lead["element_id"], lead["cable_type"]))
+        self._sync_tree(self.tv_leads, [(lead["lead_id"], (lead["lead_id"], lead.get("room", ""), lead.get("element_id", ""), lead.get("cable_type", "")))
+                                        for lead in self.leads.free_leads()])
 
         self._load_room_background()
 
+    def _sync_listbox(self, lb: tk.Listbox, names: List[str]):
+        """Podmień tylko zmienione pozycje listy (zamiast delete-all/insert-all)."""
+        old = list(lb.get(0, "end"))
+        lb.selection_clear(0, "end")
+        for i, name in enumerate(names[:len(old)]):
+            if old[i] != name: lb.delete(i); lb.insert(i, name)
+        if len(old) > len(names): lb.delete(len(names), "end")
+        elif len(names) > len(old): lb.insert("end", *names[len(old):])
+
+    @staticmethod
+    def _load_text(cl) -> str:
+        if not cl.elements: return ""
+        return f"{cl.current_a:.1f} A" + (f" / {cl.ratio*100:.0f}%" if cl.ratio is not None else "")
+
+    def _sync_tree(self, tv: ttk.Treeview, rows: List[Tuple[str, tuple]], first_chunk: int = 200, chunk: int = 500):
+        """Różnicowa aktualizacja Treeview wg iid: usuwa, zmienia i dodaje tylko to, co się zmieniło.
+
+        Nowe wiersze ponad pierwszy ekran są dokładane porcjami przez after(), więc okno nie zamiera
+        przy tysiącach wolnych przewodów.
+        """
+        job = self._tree_jobs.pop(tv, None)
+        if job: self.root.after_cancel(job)
+        shown = self._tree_rows.setdefault(tv, {})   # iid -> wartości aktualnie w drzewie
+        wanted = dict(rows)
+        gone = [iid for iid in shown if iid not in wanted]
+        if gone:
+            tv.delete(*gone)
+            for iid in gone: del shown[iid]
+        pending = []
+        for pos, (iid, values) in enumerate(rows):
+            old = shown.get(iid)
+            if old is None: pending.append((pos, iid, values))
+            elif old != values: tv.item(iid, values=values); shown[iid] = values
+
+        def insert_chunk(start, n):
+            for pos, iid, values in pending[start:start+n]:
+                tv.insert("", pos, iid=iid, values=values); shown[iid] = values
+            if start+n < len(pending): self._tree_jobs[tv] = self.root.after(1, insert_chunk, start+n, chunk)
+            else: self._tree_jobs.pop(tv, None)
+        if pending: insert_chunk(0, first_chunk)
+
+    # ---------- miniatury / wybór pokoju ----------
+    def _request_thumbs(self, rooms: List[Room]):
+        """Zleć miniatury pokoi bez aktualnej miniatury (wątek w tle; gotowe pliki z cache na dysku)."""
+        if self._thumbs is None: self._thumbs = ThumbnailWorker()
+        idle = not self._thumb_pending   # pętla odbioru już działa, jeśli coś czeka
+        archive_path = self._archive.path if self._archive is not None else None
+        for r in rooms:
+            key = f"{r.uid}:{self._thumb_gen.get(r.uid, 0)}"
+            if r.uid in self._thumb_paths or key in self._thumb_pending: continue
+            if self._shards is not None and not self._shards.is_loaded(r): src = room_path(self._shards.path, r.uid)
+            else: src = room_to_dict(r)
+            self._thumb_pending.add(key); self._thumbs.submit(key, src, archive_path)
+        if idle and self._thumb_pending: self.root.after(50, self._poll_thumbs)
+
+    def _poll_thumbs(self):
+        if self._thumbs is None: return
+        while True:
+            try: key, path = self._thumbs.results.get_nowait()
+            except queue.Empty: break
+            self._thumb_pending.discard(key)
+            uid, gen = key.rsplit(":", 1)
+            if path is None or int(gen) != self._thumb_gen.get(uid, 0): continue
+            self._thumb_paths[uid] = path
+            try: self._thumb_images[uid] = tk.PhotoImage(file=path)
+            except tk.TclError: continue
+            if self._picker is not None:
+                _d, tv, iids = self._picker
+                if uid in iids and tv.exists(iids[uid]): tv.item(iids[uid], image=self._thumb_images[uid])
+        if self._thumb_pending: self.root.after(100, self._poll_thumbs)
+
+    def _room_picker(self):
+        """Okno wyboru pokoju z miniaturami (wszystkie domy, filtr po nazwie)."""
+        if self._picker is not None:
+            self._picker[0].lift(); return
+        d = tk.Toplevel(self.root); d.title("Wybierz pokój"); d.geometry("460x640")
+        ttk.Style(d).configure("Thumbs.Treeview", rowheight=THUMB_SIZE[1] + 6)
+        q = tk.StringVar()
+        ent = ttk.Entry(d, textvariable=q); ent.pack(fill="x", padx=8, pady=6); ent.focus_set()
+        frame = ttk.Frame(d); frame.pack(fill="both", expand=True, padx=8)
+        tv = ttk.Treeview(frame, columns=("house",), show="tree headings", style="Thumbs.Treeview")
+        tv.heading("#0", text="Pokój"); tv.heading("house", text="Dom")
+        tv.column("#0", width=THUMB_SIZE[0] + 200); tv.column("house", width=100)
+        sb = ttk.Scrollbar(frame, orient="vertical", command=tv.yview); tv.configure(yscrollcommand=sb.set)
+        tv.pack(side="left", fill="both", expand=True); sb.pack(side="right", fill="y")
+
+        blank = tk.PhotoImage(width=THUMB_SIZE[0], height=THUMB_SIZE[1])
+        rows, iids, rooms = [], {}, []
+        for hi, h in enumerate(self.project.houses):
+            for ri, r in enumerate(h.rooms):
+                iid = f"{hi}:{ri}"; iids[r.uid] = iid; rooms.append(r)
+                tv.insert("", "end", iid=iid, text=f"  {r.name}", values=(h.name,),
+                          image=self._thumb_images.get(r.uid, blank))
+                rows.append((iid, f"{r.name} {h.name}".lower()))
+        cur = f"{self.current_house_idx}:{self.current_room_idx}"
+        if tv.exists(cur): tv.selection_set(cur); tv.see(cur)
+        self._picker = (d, tv, iids); d._blank = blank   # referencja — inaczej Tk zwolni obraz
+
+        def on_filter(*_):
+            needle = q.get().strip().lower()
+            for pos, (iid, text) in enumerate(rows):
+                if needle in text: tv.move(iid, "", pos)
+                else: tv.detach(iid)
+        q.trace_add("write", on_filter)
+
+        def choose(_e=None):
+            sel = tv.selection() or tv.get_children()[:1]
+            if not sel: return
+            hi, ri = map(int, sel[0].split(":"))
+            self.current_house_idx, self.current_room_idx = hi, ri
+            close(); self._refresh_lists(); self._redraw()
+        def close():
+            self._picker = None; d.destroy()
+        tv.bind("<Double-1>", choose); tv.bind("<Return>", choose); ent.bind("<Return>", choose)
+        d.bind("<Escape>", lambda e: close()); d.protocol("WM_DELETE_WINDOW", close)
+        self._request_thumbs(rooms)
+
     # ---------- dom/pokój ----------
     def _on_house_select(self):
         s = self.lb_houses.curselection()
@@ -334,6 +628,7 @@ class ElektrykaApp:
     def _add_house(self):
         self.project.houses.append(House(name=f"Dom {len(self.project.houses)+1}", rooms=[Room(name="Pokój 1")]))
         self.current_house_idx = len(self.project.houses)-1; self.current_room_idx = 0
+        self._mark_dirty(*self.project.houses[-1].rooms)
         self._refresh_lists()
 
     def _del_house(self):
@@ -341,13 +636,17 @@ class ElektrykaApp:
         h = self._cur_house()
         if not messagebox.askyesno("Usuń dom", f"Czy na pewno usunąć dom „{h.name}” wraz z pomieszczeniami?"):
             return
+        self.leads.remove_rooms([r.uid for r in h.rooms]); self.loads.remove_rooms([r.uid for r in h.rooms])
+        self.chains.remove_rooms([r.uid for r in h.rooms]); self.controls.remove_rooms([r.uid for r in h.rooms])
+        self._unfilled.difference_update(r.uid for r in h.rooms)
+        self.housegraph.forget(h.name); self._reroute_houses.discard(h.name)
         del self.project.houses[self.current_house_idx]
-        self.current_house_idx = 0; self.current_room_idx = 0
+        self.current_house_idx = 0; self.current_room_idx = 0; self._mark_dirty()
         self._refresh_lists(); self._redraw()
 
     def _add_room(self):
         h = self._cur_house(); h.rooms.append(Room(name=f"Pokój {len(h.rooms)+1}"))
-        self.current_room_idx = len(h.rooms)-1
+        self.current_room_idx = len(h.rooms)-1; self._mark_dirty(h.rooms[-1])
         self._refresh_lists()
 
     def _del_room(self):
@@ -356,8 +655,13 @@ class ElektrykaApp:
         r = self._cur_room()
         if not messagebox.askyesno("Usuń pokój", f"Czy na pewno usunąć pokój „{r.name}”?"):
             return
+        self.leads.remove_rooms([r.uid]); self.loads.remove_rooms([r.uid]); self.chains.remove_rooms([r.uid])
+        self.controls.remove_rooms([r.uid])
         del h.rooms[self.current_room_idx]
-        self.current_room_idx = 0
+        self._reshaped.pop(r.uid, None); self._unfilled.discard(r.uid)
+        if self.housegraph.drop(h.name):   # trasy przez usunięty pokój
+            self._schedule_reroute(h.name)
+        self.current_room_idx = 0; self._mark_dirty()
         self._refresh_lists(); self._redraw()
 
     def _rename_house(self):
@@ -365,8 +669,10 @@ class ElektrykaApp:
         h = self._cur_house()
         new = simpledialog.askstring("Nazwa domu", "Podaj nową nazwę:", initialvalue=h.name, parent=self.root)
         if new:
-            h.name = new.strip()
-            self._refresh_lists()
+            old, h.name = h.name, new.strip()
+            self.controls.rename_house(old, h.name); self.housegraph.rename_house(old, h.name)   # kluczowane nazwą domu
+            if old in self._reroute_houses: self._reroute_houses.discard(old); self._reroute_houses.add(h.name)
+            self._mark_dirty(); self._refresh_lists()
 
     def _rename_room(self):
         h = self._cur_house()
@@ -374,8 +680,21 @@ class ElektrykaApp:
         r = self._cur_room()
         new = simpledialog.askstring("Nazwa pokoju", "Podaj nową nazwę:", initialvalue=r.name, parent=self.root)
         if new:
-            r.name = new.strip()
-            self._refresh_lists()
+            old = r.name; referrers = self.index.referrers(h.name, old)
+            r.name = new.strip(); self.leads.rename_room(r.uid, r.name); self._mark_dirty(r)
+            if old != r.name and all(x.name != old for x in h.rooms):
+                # linki i przejścia innych pokoi wskazują pokój nazwą — przepisz na nową
+                for other in referrers:
+                    self._ensure_loaded(other)
+                    for l in other.links:
+                        if l.b_room == old: l.b_room = r.name
+                    for sg in other.segments:
+                        if sg.portal_to_room == old: sg.portal_to_room = r.name
+                    for e in other.elements:
+                        e.controls = [format_ref(r.name, eid, other.name) if rn == old else c
+                                      for c in e.controls for rn, eid in (parse_ref(c, other.name),)]
+                    self._mark_dirty(other)
+            self._refresh_lists(); self._redraw()
 
     def _add_room_by_size(self):
         d = tk.Toplevel(self.root); d.title("Nowy pokój z wymiarów (mm)"); d.transient(self.root); d.grab_set()
@@ -405,7 +724,7 @@ class ElektrykaApp:
             room.segments.append(Segment(kind="SCIANA", a=(x2,y2), b=(x1,y2), label="S", portal_side="S"))
             room.segments.append(Segment(kind="SCIANA", a=(x1,y2), b=(x1,y1), label="W", portal_side="W"))
             h = self._cur_house(); h.rooms.append(room)
-            self.current_room_idx = len(h.rooms)-1
+            self.current_room_idx = len(h.rooms)-1; self._mark_dirty(room)
             d.destroy(); self._refresh_lists(); self._redraw()
 
         btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=8)
@@ -435,29 +754,8 @@ class ElektrykaApp:
         ttk.Label(d, text="Portal pojawi się w połowie ścian (PRZEJŚCIE).", foreground="#555").pack(anchor="w", padx=8, pady=(0,8))
 
         def mid_of_side(room: Room, side: str):
-            for s in room.segments:
-                if s.kind == "SCIANA" and s.portal_side == side:
-                    return (s.a[0], s.a[1], s.b[0], s.b[1])
-            walls = [s for s in room.segments if s.kind == "SCIANA"]
-            if not walls:
-                return None
-            if side in ("N", "S"):
-                horiz = [s for s in walls if s.a[1] == s.b[1]]
-                if not horiz:
-                    return None
-                if side == "N":
-                    seg = min(horiz, key=lambda s: s.a[1])
-                else:
-                    seg = max(horiz, key=lambda s: s.a[1])
-            else:
-                vert = [s for s in walls if s.a[0] == s.b[0]]
-                if not vert:
-                    return None
-                if side == "W":
-                    seg = min(vert, key=lambda s: s.a[0])
-                else:
-                    seg = max(vert, key=lambda s: s.a[0])
-            return (seg.a[0], seg.a[1], seg.b[0], seg.b[1])
+            seg = self.topology.get(room).side(room, side)
+            return (seg.a[0], seg.a[1], seg.b[0], seg.b[1]) if seg else None
 
         def midpoint(x1,y1,x2,y2): return int((x1+x2)/2), int((y1+y2)/2)
 
@@ -465,17 +763,17 @@ class ElektrykaApp:
             rb_name = room_b.get().strip(); B = next((r for r in h.rooms if r.name == rb_name), None)
             if not B:
                 messagebox.showwarning("Połącz pokoje", "Nie znaleziono pokoju B."); return
-            A = cur_room; sa = side_a.get(); sb = side_b.get()
+            A = self._cur_room(); self._ensure_loaded(B); sa = side_a.get(); sb = side_b.get()
             segA = mid_of_side(A, sa); segB = mid_of_side(B, sb)
             if not segA or not segB:
                 messagebox.showwarning("Połącz pokoje", "W jednym z pokoi brak ściany z tą stroną."); return
             ax1, ay1, ax2, ay2 = segA; bx1, by1, bx2, by2 = segB
             ax, ay = midpoint(ax1, ay1, ax2, ay2); bx, by = midpoint(bx1, by1, bx2, by2)
-            if ay1 == ay2:  # horizontal wall
+            if side_a.get() in ("N", "S"):  # horizontal wall
                 pa_a = ((ax-10, ay), (ax+10, ay))
             else:
                 pa_a = ((ax, ay-10), (ax, ay+10))
-            if by1 == by2:
+            if side_b.get() in ("N", "S"):
                 pa_b = ((bx-10, by), (bx+10, by))
             else:
                 pa_b = ((bx, by-10), (bx, by+10))
@@ -483,33 +781,97 @@ class ElektrykaApp:
                                       label=f"{A.name}→{B.name}", portal_to_room=B.name, portal_side=sa))
             B.segments.append(Segment(kind="PRZEJSCIE", a=pa_b[0], b=pa_b[1],
                                       label=f"{B.name}→{A.name}", portal_to_room=A.name, portal_side=sb))
+            self._mark_dirty(A, B)
             d.destroy(); self._redraw()
 
         btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=8)
         ttk.Button(btns, text="OK", command=ok).pack(side="right")
         ttk.Button(btns, text="Anuluj", command=d.destroy).pack(side="right", padx=6)
 
+    # ---------- import DXF ----------
+    def import_dxf(self):
+        """Ściany/okna/drzwi z wybranych warstw DXF jako segmenty bieżącego pokoju."""
+        path = filedialog.askopenfilename(title="Importuj rzut DXF", filetypes=[("DXF","*.dxf;*.DXF")])
+        if not path: return
+        self.root.config(cursor="watch"); self.root.update_idletasks()
+        try:
+            layers, units = scan_layers(path)
+        except (OSError, DxfError) as e:
+            messagebox.showwarning("Import DXF", f"Nie można odczytać pliku:\n{e}"); return
+        finally:
+            self.root.config(cursor="")
+        if not layers:
+            messagebox.showinfo("Import DXF", "Brak linii i polilinii w pliku."); return
+        d = tk.Toplevel(self.root); d.title("Import DXF — warstwy"); d.transient(self.root); d.grab_set()
+        ttk.Label(d, text=f"{os.path.basename(path)} — jednostki: {'mm' if not units or units == 4 else f'$INSUNITS={units}'}",
+                  foreground="#555").pack(anchor="w", padx=8, pady=(8,4))
+        frl = ttk.Frame(d); frl.pack(fill="both", expand=True, padx=8)
+        kinds = {}
+        for i, (name, n) in enumerate(sorted(layers.items(), key=lambda t: (-t[1], t[0]))[:40]):
+            ttk.Label(frl, text=f"{name} ({n})").grid(row=i, column=0, sticky="w", pady=1)
+            kinds[name] = tk.StringVar(value=guess_kind(name))
+            ttk.Combobox(frl, textvariable=kinds[name], values=("",)+DXF_KINDS, state="readonly", width=10).grid(row=i, column=1, padx=6)
+        replace_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(d, text="Zastąp dotychczasowy układ pokoju", variable=replace_var).pack(anchor="w", padx=8, pady=4)
+
+        def ok():
+            chosen = {k: v.get() for k, v in kinds.items() if v.get()}
+            if not chosen:
+                messagebox.showinfo("Import DXF", "Wybierz rodzaj dla co najmniej jednej warstwy.", parent=d); return
+            ppm = float(self.cfg.ui.get("px_per_meter", 50))
+            self.root.config(cursor="watch"); self.root.update_idletasks()
+            try:
+                segs, st = import_segments(path, chosen, ppm, units)
+            except (OSError, DxfError) as e:
+                messagebox.showwarning("Import DXF", str(e), parent=d); return
+            finally:
+                self.root.config(cursor="")
+            r = self._cur_room()
+            if replace_var.get(): r.segments.clear()
+            r.segments.extend(segs); self._mark_dirty(r)
+            d.destroy(); self._redraw()
+            self.status.set(f"Import DXF: {st['entities']} obiektów, {st['pieces']} odcinków → {st['segments']} segmentów")
+
+        btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=8)
+        ttk.Button(btns, text="Importuj", command=ok).pack(side="right")
+        ttk.Button(btns, text="Anuluj", command=d.destroy).pack(side="right", padx=6)
+
     # ---------- tło ----------
     def load_background(self):
         path = filedialog.askopenfilename(title="Wybierz tło",
             filetypes=[("Obrazy","*.jpg;*.jpeg;*.png;*.JPG;*.JPEG;*.PNG")])
         if not path: return
-        r = self._cur_room(); r.background_image = os.path.abspath(path)
+        r = self._cur_room(); r.background_image = os.path.abspath(path); self._mark_dirty(r)
         self._load_room_background(); self._redraw()
 
     def clear_background(self):
-        r = self._cur_room(); r.background_image = ""
+        r = self._cur_room(); r.background_image = ""; self._mark_dirty(r)
         self.bg_image = None; self.bg_pil = None; self._redraw()
 
     def _load_room_background(self):
         r = self._cur_room()
         self.bg_image = None; self.bg_pil = None
-        if r.background_image and os.path.exists(r.background_image) and PIL_AVAILABLE:
-            try:
-                self.bg_pil = Image.open(r.background_image).convert("RGB")
-                self.bg_image = ImageTk.PhotoImage(self.bg_pil)
-            except Exception as e:
-                messagebox.showwarning("Tło", f"Problem z wczytaniem tła:\n{e}")
+        if not PIL_AVAILABLE or not r.background_image: return
+        try:
+            self.bg_pil = self._decode_background(r.background_image)
+            if self.bg_pil is not None: self.bg_image = ImageTk.PhotoImage(self.bg_pil)
+        except Exception as e:
+            messagebox.showwarning("Tło", f"Problem z wczytaniem tła:\n{e}")
+
+    def _decode_background(self, src: str):
+        """Tło jako obraz PIL; ten sam skan (np. wspólny człon archiwum) dekodowany tylko raz."""
+        if src in self._bg_cache:
+            self._bg_cache.move_to_end(src); return self._bg_cache[src]
+        if is_archive_ref(src):
+            if self._archive is None or not self._archive.has(src): return None
+            img = Image.open(io.BytesIO(self._archive.read_member(src))).convert("RGB")
+        elif os.path.exists(src):
+            img = Image.open(src).convert("RGB")
+        else:
+            return None
+        self._bg_cache[src] = img
+        while len(self._bg_cache) > 4: self._bg_cache.popitem(last=False)
+        return img
 
     # ---------- CANVAS interaction ----------
     def _grid_snap(self, x, y):
@@ -527,6 +889,7 @@ class ElektrykaApp:
             else:
                 a = self._layout_prev_point; b = (x,y)
                 self._cur_room().segments.append(Segment(kind=self.segment_kind_var.get(), a=a, b=b))
+                self._mark_dirty(self._cur_room())
                 self._layout_prev_point = b
             self._redraw(); return
 
@@ -536,8 +899,8 @@ class ElektrykaApp:
         eid = f"E-{len(r.elements)+1:03d}"
         el = Element(id=eid, type=self.tool_var.get(), x=x, y=y)
         if el.type.startswith("gniazdko"):
-            el.max_current_a = float(self.settings["limits"].get("socket_default_current_a", 16.0))
-        r.elements.append(el)
+            el.max_current_a = self.cfg.limit("socket_default_current_a", 16.0)
+        r.elements.append(el); self._mark_dirty(r)
         self._redraw()
         if self.settings["ui"].get("auto_open_connections_dialog_on_place", True):
             self._open_connections_dialog(el)
@@ -568,7 +931,7 @@ class ElektrykaApp:
         self.status.set("Zakończono ciąg segmentów.")
 
     def _clear_layout(self):
-        r = self._cur_room(); r.segments.clear(); self._layout_prev_point=None; self._redraw()
+        r = self._cur_room(); r.segments.clear(); self._layout_prev_point=None; self._mark_dirty(r); self._redraw()
 
     # ---------- rysowanie ----------
     def _draw_grid(self):
@@ -582,15 +945,6 @@ class ElektrykaApp:
         if self.bg_image is not None:
             self.canvas.create_image(0,0, image=self.bg_image, anchor="nw")
 
-    def _circuit_color_hex(self, circ_id: Optional[str]) -> str:
-        if not circ_id: return "#555555"
-        c = next((c for c in self.project.circuits if c.id == circ_id), None)
-        if not c: return "#555555"
-        return self.settings["colors"]["circuit_palette"].get(c.color, "#000000")
-
-    def _color_hex(self, key):
-        return self.settings["colors"]["conductors"].get(key, "#000000")
-
     def _draw_segments(self):
         # kolory segmentów
         palette = {
@@ -612,21 +966,37 @@ class ElektrykaApp:
                 else:
                     my -= 12 if s.a[0] < s.b[0] else -12
                 self.canvas.create_text(mx, my, text=s.label, fill="#444", font=("Segoe UI", 8, "bold"))
+        room = self._cur_room()
+        if room.segments:
+            topo = self.topology.get(room); ppm = float(self.cfg.ui.get("px_per_meter", 50))
+            text = (f"Pow. {topo.area_m2(ppm):.2f} m², obwód {topo.perimeter_m(ppm):.2f} m" if topo.closed
+                    else f"Obrys niezamknięty ({topo.open_ends} wolne końce)")
+            self.canvas.create_text(8, max(20, self.canvas.winfo_height()-8), text=text, fill="#555",
+                                    font=("Segoe UI", 8), anchor="sw")
 
     def _draw_element(self, el: Element):
         r=8
-        self.canvas.create_oval(el.x-r, el.y-r, el.x+r, el.y+r, outline="#000", fill="#fff", tags=("el",f"el:{el.id}"))
+        uid = self._cur_room().uid   # spadek napięcia / obciążenie obwodu / ciąg
+        st = max(self.loads.element_status(uid, el.id), self.chains.element_status(uid, el.id),
+                 key=("", "ok", "warn", "error").index)
+        outline = {"warn": "#d4a017", "error": "#c80000"}.get(st, "#000")
+        self.canvas.create_oval(el.x-r, el.y-r, el.x+r, el.y+r, outline=outline, width=2 if outline != "#000" else 1,
+                                fill="#fff", tags=("el",f"el:{el.id}"))
         if el.label: self.canvas.create_text(el.x, el.y-12, text=el.label, fill="#333")
 
         if self.settings["ui"].get("show_conductor_chips_on_canvas", True) and el.connections:
             con = el.connections[0]
             x_off = el.x + 12; y_off = el.y - 8
-            for k,used in con.conductors.items():
-                if used:
-                    c = self._color_hex(k)
-                    self.canvas.create_rectangle(x_off, y_off, x_off+20, y_off+12, outline="#222", fill=c, tags=("el",f"el:{el.id}"))
-                    self.canvas.create_text(x_off+10, y_off+6, text=k, fill="#fff", font=("Segoe UI", 7, "bold"), tags=("el",f"el:{el.id}"))
-                    x_off += 24
+            strip = self._chip_strip_image(con)
+            if strip is not None:
+                self.canvas.create_image(x_off, y_off, image=strip, anchor="nw", tags=("el",f"el:{el.id}"))
+            else:  # bez Pillow: paski rysowane elementami canvasu
+                for k,used in con.conductors.items():
+                    if used:
+                        c = self.cfg.conductor(k)
+                        self.canvas.create_rectangle(x_off, y_off, x_off+20, y_off+12, outline="#222", fill=c, tags=("el",f"el:{el.id}"))
+                        self.canvas.create_text(x_off+10, y_off+6, text=k, fill="#fff", font=("Segoe UI", 7, "bold"), tags=("el",f"el:{el.id}"))
+                        x_off += 24
 
         if el.max_current_a:
             try:
@@ -636,32 +1006,109 @@ class ElektrykaApp:
             except:
                 pass
 
+    def _invalidate_chip_cache(self):
+        self._chip_cache.clear(); self._chip_cache_sig = None
+
+    def _chip_strip_image(self, con: Connection):
+        """Pasek żył połączenia jako jeden PhotoImage (cache wg zestawu żył i kolorów)."""
+        if not PIL_AVAILABLE: return None
+        keys = tuple(k for k,used in con.conductors.items() if used)
+        if not keys: return None
+        if self._chip_cache_sig is not self.cfg:
+            self._chip_cache.clear(); self._chip_cache_sig = self.cfg
+        img = self._chip_cache.get(keys)
+        if img is None:
+            strip = Image.new("RGBA", (len(keys)*24-3, 13), (0,0,0,0))
+            draw = ImageDraw.Draw(strip)
+            for i,k in enumerate(keys):
+                x = i*24
+                draw.rectangle([x, 0, x+20, 12], outline=(34,34,34), fill=self.cfg.conductor_rgb.get(k, (0,0,0)))
+                l,t,rr,b = draw.textbbox((0,0), k)
+                draw.text((x+10-(rr-l)/2-l, 6-(b-t)/2-t), k, fill=(255,255,255))
+            img = ImageTk.PhotoImage(strip)
+            self._chip_cache[keys] = img
+        return img
+
+    def _draw_chains(self):
+        """Odcinki ciągów (prev → element) z prądem skumulowanym; pętle na czerwono."""
+        if not self.show_links_var.get(): return
+        room = self._cur_room(); idx = self.index.elements(room)
+        for lk in self.chains.chained(room.uid):
+            a, b = idx.get(lk.prev), idx.get(lk.element_id)
+            if a is None or b is None: continue
+            color = {"warn": "#d4a017", "error": "#c80000"}.get(lk.status, "#777777")
+            r = self.routes.route_elements(room, a, b)
+            pts = r.flat() if r is not None else [a.x, a.y, b.x, b.y]
+            self.canvas.create_line(*pts, fill=color, width=1, dash=(2,2))
+            mx, my = r.points[len(r.points)//2] if r is not None else ((a.x+b.x)/2, (a.y+b.y)/2)
+            self.canvas.create_text(mx+4, my+8, text="pętla" if lk.in_cycle else f"Σ {lk.current_a:.1f} A",
+                                    fill=color, font=("Segoe UI", 7), anchor="w")
+
     def _draw_links(self):
         if not self.show_links_var.get(): return
         only = self.only_circuit_var.get()
         pick = self.filter_circuit_var.get().strip()
-        room = self._cur_room()
-        # mapa id->element
-        idx = {e.id: e for e in room.elements}
+        room = self._cur_room(); house = self._cur_house().name
+        idx = self.index.elements(room); ppm = float(self.cfg.ui.get("px_per_meter", 50))
+        colors = self.cfg.circuit_hex_map(self.project.circuits)
+        # link do innego pokoju prowadzi do przejścia w jego stronę (jeśli jest)
+        portals = {s.portal_to_room: ((s.a[0]+s.b[0])//2, (s.a[1]+s.b[1])//2)
+                   for s in room.segments if s.kind == "PRZEJSCIE" and s.portal_to_room}
         for link in room.links:
             if link.a_id not in idx: continue
             if only and pick and (link.circuit_id != pick): continue
             a = idx[link.a_id]
-            color = self._circuit_color_hex(link.circuit_id)
-            if link.b_id in idx:
-                b = idx[link.b_id]
-                self.canvas.create_line(a.x, a.y, b.x, b.y, fill=color, width=3, arrow="last")
+            color = colors.get(link.circuit_id, "#555555") if link.circuit_id else "#555555"
+            b = self.index.resolve(house, room, link)
+            remote = bool(link.b_room) and link.b_room != room.name
+            if b is not None and not remote:
+                # trasa wzdłuż ścian zamiast cięciwy, z długością przewodu
+                r = self.routes.route_elements(room, a, b)
+                pts = r.flat() if r is not None else [a.x, a.y, b.x, b.y]
+                self.canvas.create_line(*pts, fill=color, width=3, arrow="last")
+                if r is not None:
+                    mx, my = r.points[len(r.points)//2]
+                    self.canvas.create_text(mx+4, my-8, text=f"{r.length_m(ppm):.1f} m", fill=color,
+                                            font=("Segoe UI", 7), anchor="w")
             else:
-                tgt_label = link.b_id
-                if link.b_room:
-                    tgt_label = f"{link.b_room}:{link.b_id}"
-                self.canvas.create_line(a.x, a.y, a.x+40, a.y-40, fill=color, width=2, arrow="last", dash=(4,4))
-                self.canvas.create_text(a.x+44, a.y-52, text=tgt_label, fill=color, font=("Segoe UI", 8, "bold"), anchor="w")
+                tx, ty = portals.get(link.b_room, (a.x+40, a.y-40)) if remote else (a.x+40, a.y-40)
+                if b is not None:
+                    tgt_label = f"→ {link.b_room}: {b.label or b.id}"
+                else:
+                    color = "#c80000"
+                    tgt_label = (f"{link.b_room}:{link.b_id}" if remote else link.b_id) + " (brak celu)"
+                r = self.routes.route(room, (a.x, a.y), (tx, ty)) if b is not None and link.b_room in portals else None
+                self.canvas.create_line(*(r.flat() if r is not None else [a.x, a.y, tx, ty]),
+                                        fill=color, width=2, arrow="last", dash=(4,4))
+                self.canvas.create_text(tx+4, ty-12, text=tgt_label, fill=color, font=("Segoe UI", 8, "bold"), anchor="w")
             if link.note:
                 self.canvas.create_text(a.x, a.y+34, text=link.note, fill="#666", font=("Segoe UI", 7))
 
+    def _on_canvas_motion(self, event):
+        hit = self.canvas.find_overlapping(event.x-2, event.y-2, event.x+2, event.y+2)
+        eid = next((t[3:] for i in reversed(hit) for t in self.canvas.gettags(i) if t.startswith("el:")), None)
+        if eid != self._hover_el: self._highlight_controls(eid)
+
+    def _highlight_controls(self, eid: Optional[str]):
+        """Podświetl elementy sterowane przez element (i łączniki sterujące nim); inne pokoje — na pasku stanu."""
+        self._hover_el = eid; self.canvas.delete("ctl_hl")
+        if eid is None or not self.project.houses or not self._cur_house().rooms: return
+        room = self._cur_room(); house = self._cur_house().name; idx = self.index.elements(room)
+        src = idx.get(eid)
+        drives = self.controls.controls(house, room.name, eid); by = self.controls.controlled_by(house, room.name, eid)
+        if src is None or not (drives or by): return
+        for (_, rn, tid), color in [(k, "#ff8c00") for k in drives] + [(k, "#1a73e8") for k in by]:
+            t = idx.get(tid) if rn == room.name else None
+            if t is None: continue
+            self.canvas.create_oval(t.x-13, t.y-13, t.x+13, t.y+13, outline=color, width=3, tags=("ctl_hl",))
+            self.canvas.create_line(src.x, src.y, t.x, t.y, fill=color, dash=(1,3), tags=("ctl_hl",))
+        parts = []
+        if drives: parts.append("steruje: " + ", ".join(format_ref(rn, tid, room.name) for _, rn, tid in drives))
+        if by: parts.append("sterowany przez: " + ", ".join(format_ref(rn, tid, room.name) for _, rn, tid in by))
+        self.status.set(f"{eid} — " + "; ".join(parts))
+
     def _redraw(self):
-        self.canvas.delete("all")
+        self.canvas.delete("all"); self._hover_el = None
         self._draw_background()
         self._draw_grid()
         self._draw_segments()
@@ -675,6 +1122,7 @@ class ElektrykaApp:
                     continue
             self._draw_element(el)
 
+        self._draw_chains()
         self._draw_links()
 
     # ---------- edycje ----------
@@ -689,7 +1137,7 @@ class ElektrykaApp:
         ttk.Label(fr2, text="Max prąd [A]:", width=14).pack(side="left")
         e_ma = ttk.Entry(fr2, width=10); e_ma.pack(side="left")
         e_ma.insert(0, str(el.max_current_a if el.max_current_a is not None else
-                           self.settings["limits"].get("socket_default_current_a", 16.0) if el.type.startswith("gniazdko") else ""))
+                           self.cfg.limit("socket_default_current_a", 16.0) if el.type.startswith("gniazdko") else ""))
 
         fr4 = ttk.Frame(d); fr4.pack(fill="x", padx=8, pady=4)
         ttk.Label(fr4, text="Moc [W]:", width=14).pack(side="left")
@@ -702,12 +1150,28 @@ class ElektrykaApp:
         chain_var = tk.StringVar(value=el.chain_prev or "")
         ttk.Combobox(fr3, textvariable=chain_var, values=[""]+same_type_ids, width=14, state="readonly").pack(side="left")
 
+        fr5 = ttk.Frame(d); fr5.pack(fill="x", padx=8, pady=4)
+        ttk.Label(fr5, text="Steruje:", width=14).pack(side="left")
+        e_ctl = ttk.Entry(fr5); e_ctl.pack(side="left", fill="x", expand=True); e_ctl.insert(0, ", ".join(el.controls))
+        ttk.Label(d, text="id elementów po przecinku; w innym pokoju: Pokój:id", foreground="#777").pack(anchor="w", padx=8)
+
         info = ttk.Label(d, foreground="#555"); info.pack(anchor="w", padx=8, pady=(0,8))
+        lines = []
         try:
             ma = float(e_ma.get())
             if ma > 0:
-                info.config(text=f"Sugerowane max: {ma:.0f} A @ 230 V ≈ {ma*230:.0f} W")
+                lines.append(f"Sugerowane max: {ma:.0f} A @ 230 V ≈ {ma*230:.0f} W")
         except: pass
+        room = self._cur_room(); house = self._cur_house().name
+        by = self.controls.controlled_by(house, room.name, el.id)
+        if by: lines.append("Sterowany przez: " + ", ".join(format_ref(rn, eid, room.name) for _, rn, eid in by))
+        lk = self.chains.link(room.uid, el.id)
+        if lk is not None and lk.in_cycle:
+            lines.append("Ciąg zamknięty w pętlę — popraw „Ciąg dalszy z”.")
+        elif lk is not None and (lk.prev or lk.downstream):
+            drop = f", spadek do końca ciągu {lk.worst_drop_pct:.2f}%" if lk.worst_drop_pct is not None else ""
+            lines.append(f"Ciąg od {lk.root}: dalej {lk.downstream} el., prąd odcinka {lk.current_a:.1f} A{drop}")
+        info.config(text="\n".join(lines))
 
         def ok():
             el.label = e_label.get().strip()
@@ -717,7 +1181,12 @@ class ElektrykaApp:
             try:
                 v = e_pw.get().strip(); el.power_w = float(v) if v else None
             except: el.power_w = None
-            el.chain_prev = chain_var.get().strip() or None
+            prev = chain_var.get().strip() or None
+            if would_cycle(self._cur_room(), el.id, prev):
+                messagebox.showerror("Ciąg", f"„{prev}” jest dalej w ciągu tego elementu — powstałaby pętla.", parent=d); return
+            el.chain_prev = prev
+            el.controls = [c.strip() for c in e_ctl.get().split(",") if c.strip()]
+            self._mark_dirty(self._cur_room())
             d.destroy(); self._redraw()
 
         btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=8)
@@ -745,8 +1214,8 @@ class ElektrykaApp:
 
         def refresh_targets(*_):
             rn = tgt_room_var.get()
-            room = next((r for r in h.rooms if r.name == rn), None)
-            ids = [e.id for e in (room.elements if room else []) if not (room is self._cur_room() and e.id == src_el.id)]
+            room = self.index.room(h.name, rn)
+            ids = [eid for eid in (self.index.elements(room) if room else ()) if not (room is self._cur_room() and eid == src_el.id)]
             cb_targets["values"] = ids
             cb_targets.set(ids[0] if ids else "")
         tgt_room_var.trace_add("write", refresh_targets); refresh_targets()
@@ -768,6 +1237,7 @@ class ElektrykaApp:
                 self._cur_room().links.append(Link(a_id=src_el.id, b_id=t, circuit_id=(circ_var.get().strip() or None), note=note.get().strip()))
             else:
                 self._cur_room().links.append(Link(a_id=src_el.id, b_id=t, circuit_id=(circ_var.get().strip() or None), note=note.get().strip(), b_room=rn))
+            self._mark_dirty(self._cur_room())
             d.destroy(); self._redraw()
 
         btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=8)
@@ -781,11 +1251,8 @@ class ElektrykaApp:
         cid = sel[0]
         c = self._circuit_by_id(cid)
         if not c: return
-        sel_leads = self.tv_leads.selection()
-        for iid in sel_leads:
-            if iid not in c.assigned_leads:
-                c.assigned_leads.append(iid)
-        self.project.distribution_board["free_leads"] = [l for l in self.project.distribution_board["free_leads"] if l["lead_id"] not in sel_leads]
+        self.leads.assign(self.tv_leads.selection(), c.id)
+        self._mark_dirty()
         self._refresh_lists()
 
     def _circuit_by_id(self, cid: str) -> Optional[Circuit]:
@@ -807,8 +1274,30 @@ class ElektrykaApp:
         if not sel: return
         cid = sel[0]
         self.project.circuits = [c for c in self.project.circuits if c.id != cid]
+        self.leads.drop_circuit(cid)   # przewody wracają do wolnych
+        self._mark_dirty()
         self._refresh_lists(); self._redraw()
 
+    def _balance_phases(self):
+        """Obwody 1f na L1/L2/L3 wg obliczonego prądu (przypięte i trójfazowe bez zmian)."""
+        if not self.project.circuits: return
+        if self._unfilled:   # prądy obwodów bez pokoi niewczytanych — rozkład byłby przypadkowy
+            messagebox.showinfo("Rozkład faz", f"Obciążenia: {self._incomplete()}.\n"
+                                "Rozkład faz będzie dostępny po zakończeniu przeliczania."); return
+        view = self._shards.view if self._shards is not None else (lambda r: r)
+        three = three_phase_circuits(self.project, self.leads.circuit_of, view)
+        items = [CircuitPhase(c.id, self.loads.circuit(c.id).current_a, c.phase, c.phase_pinned, c.id in three)
+                 for c in self.project.circuits]
+        before = phase_loads(items)
+        plan = balance_phases(items)
+        if not plan.moved:
+            self.status.set("Rozkład faz bez zmian: " + format_loads(plan.loads)); return
+        for c in self.project.circuits:
+            c.phase = plan.assignment.get(c.id, c.phase)
+        self._mark_dirty()
+        self._refresh_lists()
+        self.status.set(f"Rozłożono na fazy ({len(plan.moved)} obwodów): {format_loads(before)} → {format_loads(plan.loads)}")
+
     def _open_circuit_editor(self, circ: Optional[Circuit]=None):
         d = tk.Toplevel(self.root); d.title("Obwód"); d.transient(self.root); d.grab_set()
         def row(lbl, init=""):
@@ -820,10 +1309,16 @@ class ElektrykaApp:
         e_name = row("Nazwa:", circ.name if circ else "")
         fr = ttk.Frame(d); fr.pack(fill="x", padx=8, pady=4)
         ttk.Label(fr, text="Kolor:", width=12).pack(side="left")
-        colors = list(self.settings["colors"]["circuit_palette"].keys())
+        colors = list(self.cfg.palette_hex)
         color_var = tk.StringVar(value=circ.color if circ else colors[0])
         ttk.OptionMenu(fr, color_var, color_var.get(), *colors).pack(side="left")
         e_breaker = row("Zabezp.:", circ.breaker if circ else "")
+        fr = ttk.Frame(d); fr.pack(fill="x", padx=8, pady=4)
+        ttk.Label(fr, text="Faza:", width=12).pack(side="left")
+        phase_var = tk.StringVar(value=circ.phase if circ else "")
+        ttk.Combobox(fr, values=["", *PHASES, THREE_PHASE], textvariable=phase_var, state="readonly", width=5).pack(side="left")
+        pinned_var = tk.BooleanVar(value=circ.phase_pinned if circ else False)
+        ttk.Checkbutton(fr, text="Przypięta (bez zmian przy rozkładzie)", variable=pinned_var).pack(side="left", padx=8)
         advis = ttk.Label(d, text="", foreground="#555"); advis.pack(anchor="w", padx=8, pady=(0,8))
         def adv(*_):
             sug = ""  # sugestie zostawiamy jak były, jeśli masz w settings.json — zadziała
@@ -834,9 +1329,13 @@ class ElektrykaApp:
             cid = e_id.get().strip(); nm = e_name.get().strip()
             if not cid or not nm: return
             if circ is None:
-                self.project.circuits.append(Circuit(id=cid, name=nm, color=color_var.get(), breaker=e_breaker.get().strip()))
+                self.project.circuits.append(Circuit(id=cid, name=nm, color=color_var.get(), breaker=e_breaker.get().strip(),
+                                                     phase=phase_var.get(), phase_pinned=pinned_var.get()))
             else:
+                self.leads.rename_circuit(circ.id, cid)
                 circ.id = cid; circ.name = nm; circ.color = color_var.get(); circ.breaker = e_breaker.get().strip()
+                circ.phase = phase_var.get(); circ.phase_pinned = pinned_var.get()
+            self._mark_dirty()
             d.destroy(); self._refresh_lists(); self._redraw()
         ttk.Button(btns, text="OK", command=ok).pack(side="right")
         ttk.Button(btns, text="Anuluj", command=d.destroy).pack(side="right", padx=6)
@@ -845,14 +1344,24 @@ class ElektrykaApp:
     def _open_connections_dialog(self, el: Element):
         d = tk.Toplevel(self.root); d.title(f"Połączenia: {el.id}"); d.transient(self.root); d.grab_set()
 
-        tv = ttk.Treeview(d, columns=("cable","conductors","circuit","to_db","note"), show="headings", height=6)
-        for h, w in (("cable",100),("conductors",220),("circuit",70),("to_db",70),("note",220)):
-            tv.heading(h, text={"cable":"Kabel","conductors":"Żyły","circuit":"Obwód","to_db":"Do rozdz.","note":"Notatka"}[h])
+        tv = ttk.Treeview(d, columns=("cable","conductors","circuit","to_db","drop","note"), show="headings", height=6)
+        for h, w in (("cable",100),("conductors",200),("circuit",70),("to_db",70),("drop",110),("note",200)):
+            tv.heading(h, text={"cable":"Kabel","conductors":"Żyły","circuit":"Obwód","to_db":"Do rozdz.",
+                                "drop":"Spadek U","note":"Notatka"}[h])
             tv.column(h, width=w)
+        tv.tag_configure("warn", foreground="#b58900"); tv.tag_configure("error", foreground="#c80000")
         tv.pack(fill="x", padx=8, pady=6)
         for idx,con in enumerate(el.connections):
             cons = ",".join([k for k,v in con.conductors.items() if v])
-            tv.insert("", "end", iid=str(idx), values=(con.cable_type, cons, (con.circuit_id or "-"), "tak" if con.to_distribution else "nie", con.note))
+            board = self.leads.circuit_of(con.lead_id)   # przewód już przypisany w rozdzielnicy
+            to_db = (f"tak ({board})" if board else "tak") if con.to_distribution else "nie"
+            cl = self.loads.connection(self._cur_room().uid, el.id, idx)
+            if cl and cl.drop_pct is not None and cl.length_m is not None:   # długość wpisana albo z trasy do rozdzielnicy
+                drop = f"{cl.drop_pct:.2f}% ({cl.length_m:.1f} m" + (", trasa)" if con.length_m is None else ")")
+            else:
+                drop = "brak długości" if (cl.length_m if cl else con.length_m) is None else "?"
+            tv.insert("", "end", iid=str(idx), values=(con.cable_type, cons, (con.circuit_id or "-"), to_db, drop, con.note),
+                      tags=((cl.status,) if cl else ()))
 
         fr = ttk.Frame(d); fr.pack(fill="x", padx=8, pady=6)
         ttk.Label(fr, text="Kabel:", width=10).pack(side="left")
@@ -880,6 +1389,20 @@ class ElektrykaApp:
         fr2 = ttk.Frame(d); fr2.pack(fill="x", padx=8, pady=6)
         to_db = tk.BooleanVar(value=True)
         ttk.Checkbutton(fr2, text="Do rozdzielnicy (wolny przewód)", variable=to_db).pack(side="left")
+        ttk.Label(fr2, text="Długość [m]:").pack(side="left", padx=(10,4))
+        length = ttk.Entry(fr2, width=7); length.pack(side="left")
+
+        def length_from_route():
+            room = self._cur_room(); ppm = float(self.cfg.ui.get('px_per_meter', 50))
+            run = self.housegraph.run(self._cur_house(), room, el) if to_db.get() else None
+            if run is not None:
+                length.delete(0, "end"); length.insert(0, f"{run.length_m(ppm):.1f}")
+                warn.config(text="Trasa: " + " → ".join(run.rooms)); return
+            r = self.routes.route_to_portal(room, el)
+            if r is None:
+                warn.config(text="Brak drogi do rozdzielnicy ani przejścia w pokoju — narysuj PRZEJSCIE albo wpisz długość."); return
+            length.delete(0, "end"); length.insert(0, f"{r.length_m(ppm):.1f}")
+        ttk.Button(fr2, text="z trasy", width=7, command=length_from_route).pack(side="left", padx=(2,0))
         ttk.Label(fr2, text="Notatka:").pack(side="left", padx=(10,4))
         note = ttk.Entry(fr2); note.pack(side="left", fill="x", expand=True)
 
@@ -892,16 +1415,20 @@ class ElektrykaApp:
         warn = ttk.Label(d, text="", foreground="#b58900"); warn.pack(anchor="w", padx=8)
 
         def add_conn():
-            lim = self.settings["limits"]["max_connections_per_element"]
+            lim = int(self.cfg.limit("max_connections_per_element", 4))
             if len(el.connections) >= lim:
                 warn.config(text=f"Limit połączeń: {lim} (zmień w settings.json)"); return
             conductors = {k:v.get() for k,v in cond_vars.items()}
+            try:
+                v = length.get().strip().replace(",", "."); length_m = float(v) if v else None
+            except ValueError: length_m = None
             con = Connection(cable_type=cable_var.get(), conductors=conductors, to_distribution=to_db.get(),
-                             note=note.get().strip(), circuit_id=(circuit_var.get().strip() or None))
+                             note=note.get().strip(), circuit_id=(circuit_var.get().strip() or None),
+                             lead_id=new_lead_id(el.id), length_m=length_m)
             el.connections.append(con)
             if con.to_distribution:
-                lead_id = f"{el.id}:{len(el.connections)-1}"
-                self.project.distribution_board["free_leads"].append({"lead_id": lead_id, "room": self._cur_room().name, "element_id": el.id, "cable_type": con.cable_type})
+                self.leads.add(lead_info(self._cur_room(), el, con))
+            self._mark_dirty(self._cur_room())
             d.destroy(); self._open_connections_dialog(el); self._refresh_lists(); self._redraw()
 
         btns = ttk.Frame(d); btns.pack(fill="x", padx=8, pady=8)
@@ -913,154 +1440,456 @@ class ElektrykaApp:
         sel = tv.selection()
         if not sel: return
         idx = int(sel[0])
-        lead_id = f"{el.id}:{idx}"
-        self.project.distribution_board["free_leads"] = [l for l in self.project.distribution_board["free_leads"] if l["lead_id"] != lead_id]
-        if 0 <= idx < len(el.connections): del el.connections[idx]
+        if 0 <= idx < len(el.connections):
+            self.leads.remove(el.connections[idx].lead_id); del el.connections[idx]
+        self._mark_dirty(self._cur_room())
         dlg.destroy(); self._open_connections_dialog(el); self._refresh_lists(); self._redraw()
 
     # ---------- pliki ----------
     def save_project(self):
         path = filedialog.asksaveasfilename(title="Zapisz projekt", defaultextension=".json", filetypes=[("JSON","*.json")])
         if not path: return
-        out = {
-            "version": self.project.version,
-            "houses": [],
-            "circuits": [asdict(c) for c in self.project.circuits],
-            "distribution_board": self.project.distribution_board,
-            "meta": self.project.meta
-        }
-        for h in self.project.houses:
-            hh = {"name": h.name, "rooms": []}
-            for r in h.rooms:
-                rr = {
-                    "name": r.name,
-                    "background_image": r.background_image,
-                    "elements": [],
-                    # NOWE:
-                    "segments": [asdict(s) for s in r.segments],
-                    "links": [asdict(l) for l in r.links],
-                }
-                for e in r.elements:
-                    rr["elements"].append({
-                        "id": e.id, "type": e.type, "x": e.x, "y": e.y, "label": e.label,
-                        "variant": e.variant, "power_w": e.power_w, "chain_prev": e.chain_prev,
-                        "controls": e.controls, "max_current_a": e.max_current_a,
-                        "connections": [asdict(c) for c in e.connections]
-                    })
-                hh["rooms"].append(rr)
-            out["houses"].append(hh)
-
+        if self._shards is not None:  # od teraz projekt jednoplikowy — autozapis potrzebuje wszystkich pokoi
+            self._shards.load_all(r for h in self.project.houses for r in h.rooms); self._shards = None
+            self._mark_all_dirty()
+        self._detach_archive_images(os.path.splitext(path)[0] + "_tla")
+        out = project_to_dict(self.project)
         with open(path,"w",encoding="utf-8") as f: json.dump(out, f, ensure_ascii=False, indent=2)
+        self.project_path = path; self._unsaved = False; self._autosave_pending = True
+        self.status.set(f"Zapisano: {path}")
+
+    def save_project_dir(self):
+        if self._export is not None and self._shards is not None:   # zadanie w tle czyta pliki niewczytanych pokoi
+            messagebox.showinfo("Zapisz projekt", "Eksport lub obliczenia w tle czytają pliki pokoi — zapisz po ich zakończeniu albo je anuluj."); return
+        path = filedialog.asksaveasfilename(title="Zapisz projekt (katalog pokoi)", defaultextension=PROJECT_DIR_SUFFIX,
+                                            filetypes=[("Projekt katalogowy", "*"+PROJECT_DIR_SUFFIX)])
+        if not path: return
+        if os.path.isfile(path):
+            messagebox.showwarning("Zapisz projekt", "Wskazana ścieżka jest plikiem — wybierz nazwę katalogu."); return
+        self._detach_archive_images(os.path.join(path, "tla"))
+        save_project_dir(self.project, path, self._shards)
+        if self._shards is None: self._shards = ShardStore(path, self._max_loaded_rooms())
+        self.project_path = path; self._unsaved = False; self._autosave_pending = True
         self.status.set(f"Zapisano: {path}")
 
     def load_project(self):
         path = filedialog.askopenfilename(title="Wczytaj projekt", filetypes=[("JSON","*.json")])
         if not path: return
         with open(path,"r",encoding="utf-8") as f: data = json.load(f)
-        self._load_project_from_data(data)
+        self._close_archive(); self._load_project_from_data(data); self.project_path = path
+
+    def load_project_dir(self):
+        path = filedialog.askdirectory(title="Wczytaj projekt (katalog pokoi)", mustexist=True)
+        if not path: return
+        try:
+            project, store = open_project_dir(path, self._max_loaded_rooms())
+        except Exception as e:
+            messagebox.showwarning("Wczytaj projekt", f"To nie jest projekt katalogowy:\n{e}"); return
+        self._close_archive()
+        self.project = project; self._shards = store; self.project_path = path
+        self.current_house_idx = 0; self.current_room_idx = 0
+        self._unsaved = False; self._dirty_rooms.clear(); self._autosave_pending = True
+        self._attach_leads(); self._attach_index()
+        self._refresh_lists(); self._redraw()
+
+    def save_project_elk(self):
+        path = filedialog.asksaveasfilename(title="Zapisz projekt (archiwum)", defaultextension=ELK_SUFFIX,
+                                            filetypes=[("Archiwum Elektryka", "*"+ELK_SUFFIX)])
+        if not path: return
+        if self._shards is not None:
+            self._shards.load_all(r for h in self.project.houses for r in h.rooms); self._shards = None
+            self._mark_all_dirty()
+        mapping = save_archive(project_to_dict(self.project), path, self._archive)
+        for h in self.project.houses:
+            for r in h.rooms:
+                if r.background_image in mapping and mapping[r.background_image] != r.background_image:
+                    r.background_image = mapping[r.background_image]; self._dirty_rooms[r.uid] = r
+        if self._archive is not None: self._archive.close()
+        self._archive = ElkArchive(path); self._bg_cache.clear()
+        self.project_path = path; self._unsaved = False; self._autosave_pending = True
+        self._load_room_background(); self.status.set(f"Zapisano: {path}")
+
+    def load_project_elk(self):
+        path = filedialog.askopenfilename(title="Wczytaj projekt (archiwum)", filetypes=[("Archiwum Elektryka", "*"+ELK_SUFFIX)])
+        if not path: return
+        try:
+            arch = ElkArchive(path); data = arch.read_project()
+        except Exception as e:
+            messagebox.showwarning("Wczytaj projekt", f"Nie można odczytać archiwum:\n{e}"); return
+        self._close_archive(); self._archive = arch
+        self._load_project_from_data(data); self.project_path = path
+
+    def _close_archive(self):
+        if self._archive is not None: self._archive.close()
+        self._archive = None; self._bg_cache.clear()
+
+    def _detach_archive_images(self, directory: str):
+        """Przed zapisem poza archiwum: tła z archiwum wypakuj do katalogu i wskaż ścieżkami."""
+        if self._archive is None: return
+        for h in self.project.houses:
+            for r in h.rooms:
+                if self._archive.has(r.background_image):
+                    r.background_image = self._archive.extract(r.background_image, directory); self._mark_dirty(r)
+
+    def _max_loaded_rooms(self) -> int:
+        return int(self.settings.get("project", {}).get("max_loaded_rooms", 40))
 
     def _load_project_from_data(self, data):
-        houses = []
-        for h in data.get("houses", []):
-            rooms = []
-            for r in h.get("rooms", []):
-                elements = []
-                for e in r.get("elements", []):
-                    conns = [Connection(**c) for c in e.get("connections", [])]
-                    elements.append(Element(
-                        id=e.get("id",""), type=e.get("type",""), x=e.get("x",0), y=e.get("y",0),
-                        label=e.get("label",""), variant=e.get("variant",""),
-                        power_w=e.get("power_w", None), chain_prev=e.get("chain_prev", None),
-                        controls=e.get("controls", []), connections=conns, max_current_a=e.get("max_current_a", None)
-                    ))
-                segments = [Segment(**s) for s in r.get("segments", [])]
-                links = [Link(**l) for l in r.get("links", [])]
-                rooms.append(Room(
-                    name=r.get("name",""), background_image=r.get("background_image",""),
-                    elements=elements, segments=segments, links=links
-                ))
-            houses.append(House(name=h.get("name",""), rooms=rooms))
-        circuits = [Circuit(**c) for c in data.get("circuits", [])]
-        self.project = Project(
-            version=data.get("version","0.7.0"),
-            houses=houses, circuits=circuits,
-            distribution_board=data.get("distribution_board", {"free_leads": []}),
-            meta=data.get("meta", {})
-        )
+        self.project = project_from_dict(data); self._shards = None
         self.current_house_idx = 0; self.current_room_idx = 0
+        self._unsaved = False; self._mark_all_dirty(); self._attach_leads(); self._attach_index()
         self._refresh_lists(); self._redraw()
 
+    # ---------- autozapis ----------
+    def _mark_dirty(self, *rooms: Room):
+        """Zmiana w projekcie: pokoje do przepisania przy najbliższym autozapisie (manifest zawsze)."""
+        for r in rooms:
+            self._dirty_rooms[r.uid] = r
+            if self._shards is not None: self._shards.touch(r)
+            self._thumb_paths.pop(r.uid, None); self._thumb_gen[r.uid] = self._thumb_gen.get(r.uid, 0) + 1
+        self.index.invalidate(rooms); self.topology.invalidate(rooms); self.routes.invalidate(rooms)
+        moved, reshaped = self.housegraph.invalidate(rooms)  # domy, w których zmieniły się ściany/przejścia
+        if rooms: self.loads.update_rooms(rooms); self.chains.update_rooms(rooms)   # tylko zmienione elementy
+        # odcinki ciągów idą wzdłuż ścian pokoju — sygnatura elementów nie widzi zmiany segmentów
+        loaded = self._shards.is_loaded if self._shards is not None else (lambda r: True)
+        if reshaped: self.chains.update_rooms([r for r in reshaped if loaded(r)], force=True)
+        self.controls.update_rooms(rooms)
+        if moved:   # nowe długości przewodów — po chwili, bez ponownego liczenia przy każdym ruchu ściany
+            self._reshaped.update((r.uid, r) for r in reshaped)
+            self._schedule_reroute(*moved)
+        if self.leads.changed: self.leads.flush(self.project)   # listy zapisywane w projekcie
+        if not rooms: self.loads.refresh_circuits()              # obwody / przypisania przewodów
+        self._protection = None
+        self._unsaved = True; self._autosave_pending = True
+
+    def _schedule_reroute(self, *houses: str):
+        self._reroute_houses.update(houses)
+        if self._reroute_job is not None: self.root.after_cancel(self._reroute_job)
+        self._reroute_job = self.root.after(150, self._reroute)
+
+    def _reroute(self):
+        """Przelicz przewody do rozdzielnicy tylko w pokojach zmienionych lub z inną odległością przejść."""
+        self._reroute_job = None
+        houses, self._reroute_houses = self._reroute_houses, set()
+        reshaped, self._reshaped = self._reshaped, {}
+        loaded = self._shards.is_loaded if self._shards is not None else (lambda r: True)
+        todo, stale = [], []
+        for h in self.project.houses:
+            if h.name not in houses: continue
+            uids = self.housegraph.rerouted(h) | reshaped.keys()
+            for r in h.rooms:
+                if r.uid in uids: (todo if loaded(r) else stale).append(r)
+        if stale: self._start_fill(stale)   # niewczytane — z plików, w tle
+        if todo:
+            self.loads.update_rooms(todo, force=True); self.chains.update_rooms(todo, force=True)
+            self._protection = None
+            self._refresh_lists(); self._redraw()
+
+    def _cable_length(self, room: Room, el: Element, con) -> Optional[float]:
+        """Długość przewodu [m]: wpisana albo — do rozdzielnicy — trasa przez przejścia domu."""
+        if con.length_m is not None or not con.to_distribution:
+            return con.length_m
+        name = self.index.house_of(room)
+        h = next((h for h in self.project.houses if h.name == name), None)
+        run = self.housegraph.run(h, room, el) if h is not None else None
+        return run.length_m(float(self.cfg.ui.get("px_per_meter", 50))) if run is not None else None
+
+    def _chain_length(self, room: Room, a: Element, b: Element) -> Optional[float]:
+        """Odcinek ciągu między elementami [m] — po trasie wzdłuż ścian."""
+        r = self.routes.route_elements(room, a, b)
+        return r.length_m(float(self.cfg.ui.get("px_per_meter", 50))) if r is not None else None
+
+    def _attach_leads(self):
+        """Rejestr przewodów bieżącego projektu — ze sprawdzeniem i naprawą spójności."""
+        loaded = self._shards.is_loaded if self._shards is not None else (lambda r: True)
+        self.leads, notes = build_registry(self.project, loaded)
+        if self._shards is not None: self._shards.on_load = self._on_room_loaded
+        if notes:
+            self._mark_dirty()
+            self.status.set(f"Naprawiono rejestr przewodów ({len(notes)}): {notes[0]}" + (" …" if len(notes) > 1 else ""))
+
+    def _attach_index(self):
+        """Indeksy bieżącego projektu; pokoje niewczytane są czytane z plików bez doczytywania.
+
+        Obciążenia, ciągi i sterowania od razu obejmują tylko pokoje wczytane — pokoje niewczytane
+        dochodzą w tle (:meth:`_start_fill`), a do tego czasu wyniki są oznaczone jako niepełne.
+        """
+        view = self._shards.view if self._shards is not None else (lambda r: r)
+        self.index.reset(self.project); self.topology.clear(); self.routes.clear()
+        self.index.room_view = view; self.housegraph.reset(self.project, view)
+        if self._reroute_job is not None: self.root.after_cancel(self._reroute_job); self._reroute_job = None
+        self._reroute_houses.clear(); self._reshaped.clear(); self._unfilled.clear()
+        self.loads.rebuild(self.project, self._engine_view); self.chains.rebuild(self.project, self._engine_view)
+        self.controls.rebuild(self.project, self._engine_view); self._protection = None
+        self._start_fill()
+        if self._shards is None:   # projekt katalogowy: sprawdzenie na żądanie (czyta wszystkie pokoje)
+            n = len(self.index.dangling())
+            if n: self.status.set(f"Linki bez celu: {n} — Narzędzia → Sprawdź linki między pokojami")
+
+    def _on_room_loaded(self, room: Room):
+        """Pokój doczytany z projektu katalogowego — starsze połączenia dostają stałe identyfikatory przewodów."""
+        self.topology.invalidate((room,)); self.routes.invalidate((room,))   # zwolniony pokój miał puste segmenty
+        stale = room.uid in self._unfilled   # jeszcze nie policzony albo trasa zmieniła się, gdy był zwolniony
+        self._unfilled.discard(room.uid)
+        self.loads.update_rooms([room], force=stale); self.chains.update_rooms([room], force=stale)
+        self.controls.update_rooms([room]); self._protection = None
+        if self.leads.adopt_room(room): self._mark_dirty(room)
+        elif self.leads.changed: self.leads.flush(self.project)
+
+    def _engine_view(self, room: Room) -> Room:
+        """Pokój dla silników: wczytany albo — w trakcie :meth:`_poll_fill` — przeczytany z pliku."""
+        return self._fill_views.get(room.uid, room)
+
+    def _start_fill(self, rooms: Optional[List[Room]] = None):
+        """Policz w tle niewczytane pokoje projektu katalogowego (``rooms`` — tylko te; domyślnie wszystkie).
+
+        Wątek czyta i parsuje pliki pokoi, a :meth:`_poll_fill` dopisuje je porcjami do silników
+        w wątku Tk. Pokoi w ``_unfilled`` nie ma jeszcze w wynikach (patrz :meth:`_incomplete`).
+        """
+        if self._shards is None:
+            self._unfilled.clear(); return
+        loaded = self._shards.is_loaded
+        if rooms is None: rooms = [r for h in self.project.houses for r in h.rooms]
+        self._unfilled.update(r.uid for r in rooms if not loaded(r))
+        self._stop_fill()
+        todo = [(r, room_path(self._shards.path, r.uid)) for h in self.project.houses for r in h.rooms if r.uid in self._unfilled]
+        if not todo: return
+        stop = threading.Event(); q: queue.Queue = queue.Queue(maxsize=64)
+
+        def run():
+            for r, path in todo + [(None, None)]:
+                try: item = (r, resolve_room(path) if path else None)
+                except Exception: item = (r, None)   # uszkodzony plik — pokój zostaje niepoliczony
+                while not stop.is_set():
+                    try: q.put(item, timeout=0.2); break
+                    except queue.Full: pass
+                if stop.is_set(): return
+
+        th = threading.Thread(target=run, name="elektryka-fill", daemon=True)
+        self._fill = (th, stop, q); th.start()
+        self.root.after(50, self._poll_fill)
+
+    def _stop_fill(self):
+        if self._fill is not None:
+            self._fill[1].set(); self._fill = None
+
+    def _poll_fill(self):
+        if self._fill is None: return
+        th, stop, q = self._fill
+        batch, done, t0 = [], False, time.perf_counter()
+        while time.perf_counter() - t0 < 0.03:   # porcja — okno zostaje responsywne
+            try: r, view = q.get_nowait()
+            except queue.Empty: break
+            if r is None: done = True; break
+            if r.uid in self._unfilled and view is not None and not self._shards.is_loaded(r):
+                self._fill_views[r.uid] = view; batch.append(r)
+        if batch:
+            try:
+                self.loads.update_rooms(batch, force=True); self.chains.update_rooms(batch, force=True)
+                self.controls.update_rooms(batch)
+            finally:
+                self._fill_views.clear()
+            self._unfilled.difference_update(r.uid for r in batch); self._protection = None
+        if done:
+            self._fill = None; self._refresh_lists()
+            if not self._unfilled: self.status.set("Obciążenia policzone dla całego projektu")
+            return
+        if batch and not q.qsize(): self._refresh_lists()
+        self.root.after(20 if batch else 50, self._poll_fill)
+
+    def _incomplete(self) -> str:
+        """Opis niepełnych obliczeń („” — komplet): pokoje niewczytane, których silniki jeszcze nie policzyły."""
+        n = len(self._unfilled)
+        return f"niepełne — {n} pokoi jeszcze nieprzeliczonych" if n else ""
+
+    def _mark_all_dirty(self):
+        for h in self.project.houses:
+            for r in h.rooms:
+                if self._shards is None or self._shards.is_loaded(r): self._dirty_rooms[r.uid] = r
+        self._autosave_pending = True
+        # nowy projekt: miniatury ustalane od nowa (niezmienione pokoje trafią w cache na dysku)
+        self._thumb_paths.clear(); self._thumb_images.clear()
+        self._thumb_gen = {uid: g + 1 for uid, g in self._thumb_gen.items()}
+
+    def _autosave_snapshot(self):
+        from_project = set()
+        if self._shards is not None:  # niezmienione pokoje odtworzymy z katalogu projektu
+            from_project = {r.uid for h in self.project.houses for r in h.rooms} - self._shards.modified
+        snap = make_snapshot(self.project, list(self._dirty_rooms.values()), self.project_path,
+                             clean=not self._unsaved, from_project=from_project)
+        self._dirty_rooms.clear(); self._autosave_pending = False
+        return snap
+
+    def start_autosave(self):
+        cfg = self.settings.get("autosave", {})
+        if not cfg.get("enabled", True) or self._autosave is not None: return
+        self._autosave = AutosaveWriter()
+        self._autosave_interval_ms = int(float(cfg.get("interval_s", 60)) * 1000)
+        self.root.after(self._autosave_interval_ms, self._autosave_tick)
+
+    def _autosave_tick(self):
+        if self._autosave.last_error:
+            self.status.set(f"Autozapis: błąd ({self._autosave.last_error})")
+            self._autosave.last_error = None; self._mark_all_dirty()
+        if self._autosave_pending:
+            self._autosave.submit(self._autosave_snapshot())
+        self.root.after(self._autosave_interval_ms, self._autosave_tick)
+
+    def offer_autosave_recovery(self):
+        man = read_manifest()
+        if not man or man.get("clean", True): return
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(man.get("saved_at", 0)))
+        if not messagebox.askyesno("Autozapis", f"Znaleziono niezapisane zmiany z {when}.\nPrzywrócić projekt z autozapisu?"):
+            return
+        data = load_recovery()
+        if data is None: return
+        self._load_project_from_data(data)
+        self.project_path = man.get("project_path")
+        if self.project_path and self.project_path.endswith(ELK_SUFFIX) and os.path.isfile(self.project_path):
+            self._archive = ElkArchive(self.project_path); self._load_room_background(); self._redraw()
+        self._unsaved = True
+        self.status.set("Przywrócono projekt z autozapisu — zapisz go, aby zachować zmiany.")
+
+    def _on_close(self):
+        if self._export is not None: self._export[1].set()
+        if self._autosave is not None:
+            if self._autosave_pending: self._autosave.submit(self._autosave_snapshot())
+            self._autosave.close()
+        if self._thumbs is not None: self._thumbs.close()
+        self.root.destroy()
+
     # ---------- PDF ----------
-    def export_pdf(self):
-        if not PIL_AVAILABLE:
-            messagebox.showinfo("Brak Pillow", "Zainstaluj Pillow: pip install pillow"); return
-        path = filedialog.asksaveasfilename(title="Eksport PDF", defaultextension=".pdf", filetypes=[("PDF","*.pdf")])
-        if not path: return
-        W,H = 1600,1000
-        if self.bg_pil is not None:
-            base = self.bg_pil.copy().convert("RGB"); base = base.resize((W,H))
-        else:
-            base = Image.new("RGB",(W,H),"white")
-        draw = ImageDraw.Draw(base)
+    def _export_snapshot(self, rooms: List[Room]) -> list:
+        """Niezmienne kopie pokoi do eksportu w tle.
+
+        Niewczytane pokoje projektu katalogowego — ścieżką pliku, czytane dopiero w wątku;
+        :meth:`save_project_dir` czeka na koniec zadania, więc pliki się w tym czasie nie zmienią.
+        """
+        out = []
+        for r in rooms:
+            if self._shards is not None and not self._shards.is_loaded(r): out.append(room_path(self._shards.path, r.uid))
+            else: out.append(copy.deepcopy(r))
+        return out
+
+    def _start_task(self, label: str, work, done):
+        """Uruchom ``work(progress, cancel) -> wynik`` w wątku (pasek postępu i „Anuluj” na pasku stanu);
+        ``done(wynik, czas [s]) -> komunikat`` wołane w wątku Tk. Najwyżej jedno zadanie naraz."""
+        if self._export is not None:
+            messagebox.showinfo(label, "Poprzednie zadanie w tle jeszcze trwa."); return
+        cancel = threading.Event(); q: queue.Queue = queue.Queue()
+
+        def run():
+            t0 = time.perf_counter()
+            try:
+                res = work(lambda i, n: q.put(("progress", i, n)), cancel)
+                q.put(("done", res, time.perf_counter()-t0))
+            except ExportCancelled:
+                q.put(("cancelled", f"{label}: anulowano"))
+            except Exception as e:
+                q.put(("error", f"{label}: błąd — {e}"))
 
-        # SEGMENTY (układ)
-        palette = {"SCIANA": (43,43,43), "OKNO": (26,115,232), "DRZWI": (165,42,42), "PRZEJSCIE": (154,205,50)}
-        for s in self._cur_room().segments:
-            col = palette.get(s.kind, (43,43,43))
-            draw.line([s.a[0], s.a[1], s.b[0], s.b[1]], fill=col, width=4 if s.kind=="SCIANA" else 3)
+        th = threading.Thread(target=run, name="elektryka-task", daemon=True)
+        self._export = (th, cancel, q)
+        self.export_progress.config(value=0, maximum=1); self.export_progress.pack(side="left", padx=6)
+        self.btn_cancel_export.pack(side="left", padx=(0,6))
+        self.status.set(f"{label}…"); th.start()
+        self.root.after(100, self._poll_export, label, done)
 
-        # ELEMENTY
-        room = self._cur_room()
-        for el in room.elements:
-            r=8
-            draw.ellipse([el.x-r, el.y-r, el.x+r, el.y+r], outline=(0,0,0), fill=(255,255,255))
-            if el.label: draw.text((el.x+10, el.y-12), el.label, fill=(0,0,0))
-            if el.connections:
-                con = el.connections[0]
-                x_off = el.x + 14; y_off = el.y - 8
-                for k,used in con.conductors.items():
-                    if used:
-                        color = self._rgb(self._color_hex(k))
-                        draw.rectangle([x_off, y_off, x_off+22, y_off+14], outline=(34,34,34), fill=color)
-                        draw.text((x_off+5,y_off+2), k, fill=(255,255,255))
-                        x_off += 26
-            if el.max_current_a:
-                try:
-                    w = el.max_current_a * 230.0
-                    draw.text((el.x+10, el.y+10), f"{el.max_current_a:.0f}A ~{int(w)}W", fill=(80,80,80))
-                except: pass
-
-        # LINKI (połączenia)
-        for link in room.links:
-            a = next((e for e in room.elements if e.id == link.a_id), None)
-            b = next((e for e in room.elements if e.id == link.b_id), None)
-            if not a or not b: continue
-            col = self._rgb(self._circuit_color_hex(link.circuit_id))
-            draw.line([a.x, a.y, b.x, b.y], fill=col, width=3)
-
-        # LEGENDA OBWODÓW
-        lx, ly = W-360, 40
-        draw.rectangle([lx-10, ly-10, W-30, ly+430], outline=(120,120,120), fill=(245,245,245))
-        draw.text((lx, ly-24), "Legenda obwodów", fill=(0,0,0))
-        yy = ly
-        for c in self.project.circuits:
-            col = self._rgb(self.settings["colors"]["circuit_palette"].get(c.color, "#000000"))
-            draw.rectangle([lx, yy, lx+26, yy+14], outline=(34,34,34), fill=col)
-            draw.text((lx+34, yy), f"{c.id}  {c.name}  ({c.breaker or '-'})", fill=(0,0,0))
-            yy += 18
+    def _start_export(self, label: str, path: str, work):
+        """Uruchom ``work(tmp_path, progress, cancel) -> opis`` w wątku; plik docelowy podmieniany dopiero po sukcesie."""
+        tmp = path + ".part"
 
-        # LEGENDA UKŁADU
-        draw.text((lx, yy+8), "Układ pokoju:", fill=(0,0,0))
-        yy2 = yy + 26
-        for name, col in [("Ściana", (43,43,43)), ("Okno", (26,115,232)), ("Drzwi", (165,42,42)), ("Przejście", (154,205,50))]:
-            draw.line([lx, yy2, lx+28, yy2], fill=col, width=4 if name=="Ściana" else 3)
-            draw.text((lx+36, yy2-8), name, fill=(0,0,0))
-            yy2 += 18
+        def task(progress, cancel):
+            try:
+                info = work(tmp, progress, cancel)
+                os.replace(tmp, path)
+                return info
+            finally:
+                if os.path.exists(tmp):
+                    try: os.remove(tmp)
+                    except OSError: pass
+        self._start_task(label, task, lambda info, secs: f"{label}: {path} ({secs:.1f} s){info or ''}")
+
+    def _poll_export(self, label: str, done):
+        if self._export is None: return
+        th, cancel, q = self._export
+        while True:
+            try: msg = q.get_nowait()
+            except queue.Empty: break
+            if msg[0] == "progress":
+                self.export_progress.config(maximum=max(1, msg[2]), value=msg[1])
+                if not cancel.is_set(): self.status.set(f"{label}: {msg[1]}/{msg[2]}")
+            else:
+                self._export = None
+                self.export_progress.pack_forget(); self.btn_cancel_export.pack_forget()
+                self.status.set(done(msg[1], msg[2]) if msg[0] == "done" else msg[1])
+                if msg[0] == "error": messagebox.showwarning(label, msg[1])
+                return
+        self.root.after(100, self._poll_export, label, done)
 
-        base.save(path, "PDF"); self.status.set(f"Wyeksportowano PDF: {path}")
+    def _cancel_export(self):
+        if self._export is not None:
+            self._export[1].set(); self.status.set("Anulowanie…")
 
-    def _rgb(self, h):
-        h=h.lstrip("#"); return tuple(int(h[i:i+2],16) for i in (0,2,4))
+    def export_pdf(self):
+        if not PIL_AVAILABLE:
+            messagebox.showinfo("Brak Pillow", "Zainstaluj Pillow: pip install pillow"); return
+        path = filedialog.asksaveasfilename(title="Eksport PDF", defaultextension=".pdf", filetypes=[("PDF","*.pdf")])
+        if not path: return
+        room = copy.deepcopy(self._cur_room()); circuits = copy.deepcopy(self.project.circuits)
+        settings = self.cfg; bg = self.bg_pil   # obraz tła nie jest modyfikowany w miejscu
+        targets = self.index.directory(self._cur_house().name); check = self._loop_check()
+
+        def work(tmp, progress, cancel):
+            loop = {cid: cp.summary for cid, cp in check().items()}   # legenda: stan pętli zwarcia obwodów
+            base = render_room(room, circuits, settings, bg, targets=targets, loop=loop)
+            if cancel.is_set(): raise ExportCancelled()
+            with open(tmp, "wb") as f: base.save(f, "PDF")
+            progress(1, 1)
+        self._start_export("Eksport PDF", path, work)
+
+    def export_pdf_all(self, scope: str = "house"):
+        """Wielostronicowy PDF: strona na pokój (dom lub cały projekt), strony renderowane w procesach."""
+        if not PIL_AVAILABLE:
+            messagebox.showinfo("Brak Pillow", "Zainstaluj Pillow: pip install pillow"); return
+        path = filedialog.asksaveasfilename(title="Eksport PDF", defaultextension=".pdf", filetypes=[("PDF","*.pdf")])
+        if not path: return
+        houses = [self._cur_house()] if scope == "house" else list(self.project.houses)
+        names = [f"{h.name} / {r.name}" for h in houses for r in h.rooms]
+        archive_path = self._archive.path if self._archive is not None else None
+        circuits = copy.deepcopy(self.project.circuits); settings = self.cfg
+        targets = {h.name: self.index.directory(h.name) for h in houses}; check = self._loop_check()
+        jobs = [(src, circuits, settings, archive_path, targets[h.name])
+                for h, src in zip([h for h in houses for _ in h.rooms],
+                                  self._export_snapshot([r for h in houses for r in h.rooms]))]
+        workers = int(self.settings.get("export", {}).get("workers", 0)) or None
+
+        def work(tmp, progress, cancel):
+            loop = {cid: cp.summary for cid, cp in check().items()}
+            timings = export_pages_pdf(tmp, [job + (loop,) for job in jobs], workers, progress, cancel)
+            slow = ", ".join(f"{n} {dt*1000:.0f} ms" for dt, n in sorted(zip(timings, names), reverse=True)[:3])
+            return f", {len(jobs)} str., śr. {sum(timings)/max(1,len(timings))*1000:.0f} ms/str.; najdłuższe: {slow}"
+        self._start_export("Eksport PDF", path, work)
+
+    def export_vector(self, scope: str = "room"):
+        """Eksport wektorowy (linie, okręgi, tekst); tło osadzone raz — bez Pillow dla teł JPG."""
+        types = [("PDF","*.pdf"), ("SVG","*.svg")] if scope == "room" else [("PDF","*.pdf")]
+        path = filedialog.asksaveasfilename(title="Eksport wektorowy", defaultextension=".pdf", filetypes=types)
+        if not path: return
+        archive_path = self._archive.path if self._archive is not None else None
+        rooms = self._export_snapshot([self._cur_room()] if scope == "room" else self._cur_house().rooms)
+        circuits = copy.deepcopy(self.project.circuits); settings = self.cfg
+        targets = self.index.directory(self._cur_house().name); check = self._loop_check()
+
+        def work(tmp, progress, cancel):
+            loop = {cid: cp.summary for cid, cp in check().items()}
+            if path.lower().endswith(".svg"):
+                export_room_svg(tmp, rooms[0], circuits, settings, archive_path, targets=targets, loop=loop)
+            else:
+                export_rooms_pdf(tmp, rooms, circuits, settings, archive_path, progress=progress, cancel=cancel,
+                                 targets=targets, loop=loop)
+            return f", {os.path.getsize(tmp)//1024} kB"
+        self._start_export("Eksport wektorowy", path, work)
 
 # ================== main ==================
 def main():
@@ -1070,9 +1899,12 @@ def main():
         try:
             with open(PROJECT_FILE_DEFAULT,"r",encoding="utf-8") as f:
                 data = json.load(f)
-            app._load_project_from_data(data)
+            app._load_project_from_data(data); app.project_path = PROJECT_FILE_DEFAULT
         except Exception:
             pass
+    app.offer_autosave_recovery()
+    app.start_autosave()
+    app.watch_settings()
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+"""
+Jednoplikowe archiwum projektu Elektryka (``.elk``, kontener ZIP).
+
+Zawartość::
+
+    project.json              # projekt jak w zapisie JSON
+    images/<sha256>.<ext>     # tła pokoi, nazwane skrótem zawartości
+
+Pokój wskazuje tło odwołaniem ``elk:images/<sha256>.<ext>`` zamiast ścieżki
+bezwzględnej, więc archiwum można przenosić między stanowiskami, a ten sam
+skan użyty w wielu pokojach jest zapisany (i dekodowany) tylko raz.
+
+Obrazy są zapisywane bez kompresji (JPG/PNG i tak są skompresowane): odczyt
+to losowy dostęp do jednego członu archiwum, a ponowny zapis kopiuje
+niezmienione człony bajt w bajt, bez ponownej kompresji.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zipfile
+from typing import Dict, Optional
+
+ELK_SUFFIX = ".elk"
+PROJECT_MEMBER = "project.json"
+IMAGES_PREFIX = "images/"
+REF_PREFIX = "elk:"
+
+
+def is_archive_ref(value: str) -> bool:
+    return bool(value) and value.startswith(REF_PREFIX)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ElkArchive:
+    """Otwarte archiwum — człony czytane leniwie, na żądanie."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zf = zipfile.ZipFile(path, "r")
+        self._names = set(self._zf.namelist())
+        self._lock = threading.Lock()   # ZipFile nie jest bezpieczny wątkowo
+
+    def read_project(self) -> dict:
+        with self._lock:
+            return json.loads(self._zf.read(PROJECT_MEMBER).decode("utf-8"))
+
+    def has(self, ref: str) -> bool:
+        return is_archive_ref(ref) and ref[len(REF_PREFIX):] in self._names
+
+    def read_member(self, ref: str) -> bytes:
+        with self._lock:
+            return self._zf.read(ref[len(REF_PREFIX):])
+
+    def copy_member(self, ref: str, zout: zipfile.ZipFile) -> None:
+        """Skopiuj człon do innego archiwum strumieniowo, bez ponownej kompresji."""
+        name = ref[len(REF_PREFIX):]
+        with self._lock:
+            info = self._zf.getinfo(name)
+            with self._zf.open(info) as src, zout.open(_stored_info(name), "w") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+
+    def extract(self, ref: str, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        dst = os.path.join(directory, os.path.basename(ref[len(REF_PREFIX):]))
+        if not os.path.exists(dst):
+            with self._lock, self._zf.open(ref[len(REF_PREFIX):]) as src, open(dst, "wb") as f:
+                shutil.copyfileobj(src, f, 1 << 20)
+        return os.path.abspath(dst)
+
+    def close(self) -> None:
+        self._zf.close()
+
+
+def _stored_info(name: str) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+def save_archive(data: dict, path: str, archive: Optional[ElkArchive] = None) -> Dict[str, str]:
+    """Zapisz projekt (słownik jak w JSON) do archiwum ``.elk``.
+
+    Tła będące ścieżkami są haszowane i dołączane raz na zawartość; odwołania
+    do bieżącego archiwum są kopiowane bez dekompresji. Zwraca mapę
+    ``stara wartość background_image -> odwołanie elk:``; ``data`` jest
+    aktualizowane w miejscu. Obrazy, których nie da się odczytać, są pomijane
+    (pokój zachowuje dotychczasową wartość).
+    """
+    members: Dict[str, tuple] = {}      # ref -> ("archive", ref) | ("file", path)
+    mapping: Dict[str, str] = {}
+    for h in data.get("houses", []):
+        for r in h.get("rooms", []):
+            bg = r.get("background_image") or ""
+            if not bg:
+                continue
+            if bg not in mapping:
+                if archive is not None and archive.has(bg):
+                    mapping[bg] = bg
+                    members.setdefault(bg, ("archive", bg))
+                elif not is_archive_ref(bg) and os.path.isfile(bg):
+                    ext = os.path.splitext(bg)[1].lower() or ".img"
+                    ref = f"{REF_PREFIX}{IMAGES_PREFIX}{file_sha256(bg)}{ext}"
+                    mapping[bg] = ref
+                    members.setdefault(ref, ("file", bg))
+                else:
+                    continue
+            r["background_image"] = mapping[bg]
+
+    tmp = path + ".tmp"
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+        zout.writestr(PROJECT_MEMBER, json.dumps(data, ensure_ascii=False))
+        for ref, (kind, src) in members.items():
+            if kind == "archive":
+                archive.copy_member(src, zout)
+            else:
+                with open(src, "rb") as fsrc, zout.open(_stored_info(ref[len(REF_PREFIX):]), "w") as dst:
+                    shutil.copyfileobj(fsrc, dst, 1 << 20)
+    if archive is not None and os.path.abspath(archive.path) == os.path.abspath(path):
+        archive.close()   # Windows: nie można podmienić otwartego pliku
+    os.replace(tmp, path)
+    return mapping
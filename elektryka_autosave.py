@@ -0,0 +1,121 @@
+"""
+Przyrostowy autozapis projektu Elektryka do katalogu pobocznego (sidecar).
+
+Katalog ma układ projektu katalogowego (patrz :mod:`elektryka_shards`)::
+
+    .elektryka_autosave/
+        manifest.json        # domy (uid + nazwa pokoi), obwody, rozdzielnica, meta
+        rooms/<uid>.json     # fragment jednego pokoju
+
+Pokoje oznaczone w manifeście ``"source": "project"`` nie były zmieniane
+i przy odtwarzaniu są czytane z projektu katalogowego wskazanego przez
+``project_path``.
+
+Wątek Tk przygotowuje jedynie kopie *zmienionych* pokoi (patrz
+:func:`make_snapshot`); serializacja JSON i zapis na dysk odbywają się
+w wątku roboczym :class:`AutosaveWriter`.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import queue
+import threading
+import time
+from typing import Iterable, Optional, Set
+
+from elektryka_model import Project, Room, room_to_dict
+from elektryka_shards import (MANIFEST_NAME, ROOMS_DIR, build_manifest, prune_rooms,
+                              read_json, room_path, write_json)
+
+AUTOSAVE_DIR = ".elektryka_autosave"
+
+
+def make_snapshot(project: Project, dirty_rooms: Iterable[Room], project_path: Optional[str], clean: bool,
+                  from_project: Set[str] = frozenset()) -> dict:
+    """Niezmienna kopia stanu do zapisu w tle (wywoływać w wątku Tk).
+
+    ``from_project`` — uid pokoi niezmienionych względem projektu katalogowego
+    ``project_path``; ich fragmenty nie są potrzebne w autozapisie.
+    """
+    manifest = copy.deepcopy(build_manifest(project))
+    manifest.update(saved_at=time.time(), project_path=project_path, clean=clean)
+    for h in manifest["houses"]:
+        for rr in h["rooms"]:
+            rr["source"] = "project" if rr["uid"] in from_project else "autosave"
+    return {
+        "manifest": manifest,
+        "rooms": {r.uid: room_to_dict(r) for r in dirty_rooms if r.uid not in from_project},
+    }
+
+
+def write_snapshot(snapshot: dict, directory: str = AUTOSAVE_DIR) -> None:
+    """Zapisz fragmenty pokoi, potem manifest (atomowo), na końcu usuń zbędne fragmenty."""
+    os.makedirs(os.path.join(directory, ROOMS_DIR), exist_ok=True)
+    for uid, room in snapshot["rooms"].items():
+        write_json(room_path(directory, uid), room)
+    manifest = snapshot["manifest"]
+    write_json(os.path.join(directory, MANIFEST_NAME), manifest)
+    prune_rooms(directory, {rr["uid"] for h in manifest["houses"] for rr in h["rooms"]
+                            if rr.get("source") != "project"})
+
+
+def read_manifest(directory: str = AUTOSAVE_DIR) -> Optional[dict]:
+    try:
+        return read_json(os.path.join(directory, MANIFEST_NAME))
+    except Exception:
+        return None
+
+
+def load_recovery(directory: str = AUTOSAVE_DIR) -> Optional[dict]:
+    """Złóż dane projektu (format jak w pliku JSON) z manifestu i fragmentów pokoi."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    houses = []
+    for h in manifest.get("houses", []):
+        rooms = []
+        for rr in h.get("rooms", []):
+            src = manifest.get("project_path") if rr.get("source") == "project" else directory
+            try:
+                rooms.append(read_json(room_path(src, rr["uid"])))
+            except Exception:
+                continue  # brak fragmentu — pokój pominięty
+        houses.append({"name": h.get("name", ""), "rooms": rooms})
+    return {
+        "version": manifest.get("version", "0.7.0"),
+        "houses": houses,
+        "circuits": manifest.get("circuits", []),
+        "distribution_board": manifest.get("distribution_board", {"free_leads": []}),
+        "meta": manifest.get("meta", {}),
+    }
+
+
+class AutosaveWriter:
+    """Wątek roboczy zapisujący kolejne migawki w kolejności zgłoszeń."""
+
+    def __init__(self, directory: str = AUTOSAVE_DIR):
+        self.directory = directory
+        self.last_error: Optional[str] = None
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="elektryka-autosave", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot: dict) -> None:
+        self._queue.put(snapshot)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            snap = self._queue.get()
+            if snap is None:
+                return
+            try:
+                write_snapshot(snap, self.directory)
+                self.last_error = None
+            except Exception as e:  # zapis w tle nie może zabić aplikacji
+                self.last_error = str(e)
@@ -0,0 +1,239 @@
+"""
+Ciągi elementów (``Element.chain_prev``, „Ciąg dalszy z”) — np. gniazda
+łączone jedno za drugim.
+
+Odcinek ``prev → element`` niesie prąd elementu i wszystkiego dalej w ciągu,
+więc pierwsze gniazdo długiego ciągu jest obciążone sumą. Dla każdego pokoju
+budowany jest las ciągów (rodzic = ``chain_prev``); :class:`ChainEngine`
+wykrywa cykle, liczy prąd skumulowany każdego odcinka (od końca ciągu)
+i spadek napięcia narastająco od zasilania początku ciągu (połączenie
+„do rozdz.” z :class:`elektryka_loads.LoadEngine`, liczone dla prądu
+całego ciągu) — oba przejścia raz na element, O(liczba elementów).
+
+Po zmianie pokoju :meth:`ChainEngine.update_rooms` porównuje odciski
+elementów i przelicza tylko ciągi, których dotknęła zmiana (stary i nowy
+początek ciągu zmienionego elementu).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from elektryka_model import Element, Project, Room
+from elektryka_loads import cross_section, drop_coefficient, element_current, is_three_phase, status_of
+from elektryka_settings import compiled
+
+CYCLE = "\0cykl"          # znacznik początku ciągu dla elementów w cyklu (lub za nim)
+
+
+@dataclass
+class ChainLink:
+    """Element w ciągu i odcinek ``prev → element``."""
+    element_id: str
+    prev: Optional[str]                  # poprzedni element ciągu; None — początek
+    root: Optional[str]                  # początek ciągu; None — cykl
+    depth: int = 0
+    own_current_a: float = 0.0
+    current_a: float = 0.0               # prąd odcinka: element i wszystko dalej
+    downstream: int = 0                  # elementy dalej w ciągu
+    length_m: Optional[float] = None     # odcinek prev → element (dla początku: zasilanie)
+    section_mm2: Optional[float] = None
+    drop_pct: Optional[float] = None     # spadek na odcinku
+    total_drop_pct: Optional[float] = None   # od rozdzielnicy do elementu
+    path_ls: Optional[float] = None      # Σ L/S od rozdzielnicy do elementu [m/mm²] — rezystancja toru
+    worst_drop_pct: Optional[float] = None   # najgorszy od tego elementu do końca ciągu
+    limit_pct: float = 5.0
+    status: str = ""
+
+    @property
+    def in_cycle(self) -> bool:
+        return self.root is None
+
+
+def would_cycle(room: Room, element_id: str, prev: Optional[str]) -> bool:
+    """Czy ustawienie ``chain_prev = prev`` zamknie ciąg w pętlę."""
+    parent = {e.id: e.chain_prev for e in room.elements}
+    seen = {element_id}
+    while prev is not None:
+        if prev in seen:
+            return True
+        seen.add(prev); prev = parent.get(prev)
+    return False
+
+
+class ChainEngine:
+    """Ciągi wszystkich pokoi projektu (patrz opis modułu).
+
+    ``link_length(room, a, b)`` — długość odcinka między elementami [m] lub None;
+    ``loads`` — silnik obciążeń, z którego bierze się zasilanie początku ciągu.
+    """
+
+    def __init__(self, settings, link_length: Optional[Callable[[Room, Element, Element], Optional[float]]] = None,
+                 loads=None):
+        self.cfg = compiled(settings)
+        self.link_length = link_length or self._manhattan
+        self.loads = loads
+        self.room_view: Callable[[Room], Room] = lambda r: r
+        self._parent: Dict[str, Dict[str, Optional[str]]] = {}    # room uid -> id -> chain_prev (istniejący)
+        self._sig: Dict[str, Dict[str, tuple]] = {}
+        self._links: Dict[str, Dict[str, ChainLink]] = {}
+
+    def _manhattan(self, room: Room, a: Element, b: Element) -> Optional[float]:
+        ppm = float(self.cfg.ui.get("px_per_meter", 50))
+        return (abs(a.x - b.x) + abs(a.y - b.y)) / ppm if ppm > 0 else None
+
+    # --- budowa ---
+    def rebuild(self, project: Project, room_view: Optional[Callable[[Room], Room]] = None, settings=None) -> None:
+        if settings is not None:
+            self.cfg = compiled(settings)
+        if room_view is not None:
+            self.room_view = room_view
+        self._parent.clear(); self._sig.clear(); self._links.clear()
+        for h in project.houses:
+            self.update_rooms(h.rooms, force=True)
+
+    def update_rooms(self, rooms: Iterable[Room], force: bool = False) -> int:
+        """Przelicz ciągi zmienionych elementów wskazanych pokoi; zwraca liczbę przeliczonych elementów."""
+        n = 0
+        for r in rooms:
+            view = self.room_view(r)
+            els = {e.id: e for e in view.elements}
+            old_sig = self._sig.get(r.uid, {})
+            sig = {eid: self._signature(e) for eid, e in els.items()}
+            changed = set(els) if force else {eid for eid in set(sig) | set(old_sig) if sig.get(eid) != old_sig.get(eid)}
+            self._sig[r.uid] = sig
+            if not changed:
+                continue
+            parent = {eid: (e.chain_prev if e.chain_prev in els and e.chain_prev != eid else None) for eid, e in els.items()}
+            old_parent = self._parent.get(r.uid, {})
+            changed |= {eid for eid in parent if old_parent.get(eid, CYCLE) != parent[eid]}   # np. usunięty poprzednik
+            self._parent[r.uid] = parent
+            links = self._links.setdefault(r.uid, {})
+            roots = self._roots(parent)
+            # ciągi do przeliczenia: stary i nowy początek każdego zmienionego elementu
+            affected = {roots[eid] for eid in changed if eid in roots}
+            affected |= {links[eid].root if links[eid].root is not None else CYCLE for eid in changed if eid in links}
+            for eid in [eid for eid in links if eid not in els]:
+                del links[eid]
+            members = [eid for eid, root in roots.items() if root in affected]
+            n += self._compute(view, els, parent, roots, members, links)
+        return n
+
+    def remove_rooms(self, room_uids: Iterable[str]) -> None:
+        for uid in room_uids:
+            self._parent.pop(uid, None); self._sig.pop(uid, None); self._links.pop(uid, None)
+
+    @staticmethod
+    def _signature(el: Element) -> tuple:
+        return (el.type, el.x, el.y, el.chain_prev, el.power_w, el.max_current_a,
+                tuple((c.cable_type, c.length_m, c.to_distribution, tuple(sorted(c.conductors.items())))
+                      for c in el.connections))
+
+    @staticmethod
+    def _roots(parent: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """Początek ciągu każdego elementu (``CYCLE`` — w cyklu lub za nim); każdy element odwiedzany raz."""
+        roots: Dict[str, str] = {}
+        for start in parent:
+            path, on_path = [], set()
+            node = start
+            while node not in roots:
+                if node in on_path:           # zamknięta pętla
+                    root = CYCLE; break
+                path.append(node); on_path.add(node)
+                p = parent[node]
+                if p is None:
+                    root = node; break
+                node = p
+            else:
+                root = roots[node]
+            for v in path:
+                roots[v] = root
+        return roots
+
+    def _compute(self, room: Room, els: Dict[str, Element], parent, roots, members: List[str],
+                 links: Dict[str, ChainLink]) -> int:
+        children: Dict[str, List[str]] = {}
+        for eid in members:
+            if parent[eid] is not None:
+                children.setdefault(parent[eid], []).append(eid)
+        warn = self.cfg.limit("load_warning", 0.8)
+        sock_a = self.cfg.limit("socket_default_current_a", 16.0)
+        for eid in members:
+            el = els[eid]; root = roots[eid]
+            links[eid] = ChainLink(eid, parent[eid], None if root == CYCLE else root,
+                                   own_current_a=element_current(el, any(is_three_phase(c) for c in el.connections)),
+                                   limit_pct=self.cfg.limit("voltage_drop_lighting" if el.type.startswith("lampa")
+                                                            else "voltage_drop_general", 5.0))
+        # kolejność od początków ciągów w dół (pre-order), potem odwrotnie — prądy od końca
+        order = [eid for eid in members if parent[eid] is None]
+        for eid in order:                      # lista rośnie w trakcie pętli
+            for c in children.get(eid, ()):
+                links[c].depth = links[eid].depth + 1; order.append(c)
+        for eid in reversed(order):
+            lk = links[eid]
+            lk.current_a += lk.own_current_a
+            if lk.prev is not None:
+                up = links[lk.prev]; up.current_a += lk.current_a; up.downstream += lk.downstream + 1
+        for eid in order:
+            lk, el = links[eid], els[eid]
+            if lk.prev is None:
+                lk.length_m, lk.section_mm2, lk.drop_pct = self._feed(room, el, lk.current_a)
+                lk.total_drop_pct = lk.drop_pct
+                lk.path_ls = lk.length_m / lk.section_mm2 if lk.length_m is not None and lk.section_mm2 else None
+            else:
+                prev_el = els[lk.prev]
+                con = (el.connections or prev_el.connections or [None])[0]
+                lk.length_m = self.link_length(room, prev_el, el)
+                lk.section_mm2 = cross_section(con.cable_type) if con is not None else None
+                if lk.length_m is not None and lk.section_mm2:
+                    lk.drop_pct = drop_coefficient(is_three_phase(con)) * lk.length_m * lk.current_a / lk.section_mm2
+                up = links[lk.prev].total_drop_pct
+                lk.total_drop_pct = up + lk.drop_pct if up is not None and lk.drop_pct is not None else None
+                up = links[lk.prev].path_ls
+                lk.path_ls = up + lk.length_m / lk.section_mm2 if up is not None and lk.drop_pct is not None else None
+        for eid in reversed(order):
+            lk = links[eid]
+            if lk.total_drop_pct is not None:
+                lk.worst_drop_pct = max(lk.worst_drop_pct or 0.0, lk.total_drop_pct)
+            if lk.prev is not None and lk.worst_drop_pct is not None:
+                up = links[lk.prev]; up.worst_drop_pct = max(up.worst_drop_pct or 0.0, lk.worst_drop_pct)
+        order_st = {"": 0, "ok": 1, "warn": 2, "error": 3}
+        for eid in members:
+            lk = links[eid]
+            if lk.in_cycle:
+                lk.status = "error"; continue
+            st = status_of(lk.total_drop_pct, lk.limit_pct, warn)
+            if lk.downstream and els[eid].type.startswith("gniazdko"):   # zaciski gniazda przenoszą prąd dalej
+                st = max(st, status_of(lk.current_a, sock_a, warn), key=order_st.get)
+            lk.status = st
+        return len(members)
+
+    def _feed(self, room: Room, el: Element, current: float) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """Zasilanie początku ciągu (pierwsze połączenie „do rozdz.”) dla prądu całego ciągu."""
+        if self.loads is None:
+            return None, None, None
+        for idx, con in enumerate(el.connections):
+            if not con.to_distribution:
+                continue
+            cl = self.loads.connection(room.uid, el.id, idx)
+            if cl is None or cl.length_m is None or not cl.section_mm2:
+                return (cl.length_m if cl else None), (cl.section_mm2 if cl else None), None
+            return cl.length_m, cl.section_mm2, drop_coefficient(is_three_phase(con)) * cl.length_m * current / cl.section_mm2
+        return None, None, None
+
+    # --- wyniki ---
+    def link(self, room_uid: str, element_id: str) -> Optional[ChainLink]:
+        return self._links.get(room_uid, {}).get(element_id)
+
+    def element_status(self, room_uid: str, element_id: str) -> str:
+        lk = self.link(room_uid, element_id)
+        return lk.status if lk is not None and (lk.prev is not None or lk.downstream or lk.in_cycle) else ""
+
+    def cycles(self, room_uid: str) -> List[str]:
+        """Elementy pokoju w cyklu lub za nim."""
+        return sorted(eid for eid, lk in self._links.get(room_uid, {}).items() if lk.in_cycle)
+
+    def chained(self, room_uid: str) -> List[ChainLink]:
+        """Odcinki ciągów pokoju (elementy z ``prev``) — do rysowania."""
+        return [lk for lk in self._links.get(room_uid, {}).values() if lk.prev is not None]
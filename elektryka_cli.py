@@ -0,0 +1,179 @@
+"""
+Wsadowy eksport projektów Elektryka bez interfejsu graficznego (bez Tk).
+
+Przykłady::
+
+    python -m elektryka_cli export projekt.json -o wyniki/
+    python -m elektryka_cli export *.json dom.elk biuro.elkproj -o wyniki/ --format png -j 8
+
+Obsługiwane wejścia: projekt JSON, archiwum ``.elk`` i projekt katalogowy
+``.elkproj``. Formaty wyjścia:
+
+* ``pdf``    — wielostronicowy PDF rastrowy (jak „Eksport PDF domu/projektu”),
+* ``vector`` — wielostronicowy PDF wektorowy,
+* ``png``    — obraz na pokój, w podkatalogu ``<nazwa projektu>/``,
+* ``svg``    — plik SVG na pokój, jak wyżej.
+
+Rysowanie to ten sam kod co w aplikacji (:mod:`elektryka_render`,
+:mod:`elektryka_vector`), legenda obwodów ze stanem pętli zwarcia
+(:func:`elektryka_protection.check_project`). Przy wielu plikach każdy projekt trafia do
+osobnego procesu; pojedynczy projekt renderuje strony równolegle.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Sequence, Tuple
+
+from elektryka_archive import ELK_SUFFIX, ElkArchive
+from elektryka_index import ElementIndex
+from elektryka_model import Project, project_from_dict
+from elektryka_protection import check_project
+from elektryka_render import PIL_AVAILABLE, export_pages_pdf, open_background, render_room, resolve_room
+from elektryka_settings import SETTINGS_FILE, compile_settings, load_settings
+from elektryka_shards import open_project_dir, read_json, room_path
+from elektryka_vector import export_room_svg, export_rooms_pdf
+
+FORMATS = ("pdf", "vector", "png", "svg")
+
+
+def load_project_file(path: str) -> Tuple[Project, List[Tuple[str, str, object, dict]], Optional[str]]:
+    """Wczytaj projekt z pliku/katalogu.
+
+    Zwraca ``(projekt, [(dom, pokój, Room | ścieżka pliku pokoju, cele linków domu)], archive_path)``;
+    pokoje projektu katalogowego nie są parsowane z góry — dopiero przy renderowaniu
+    (cele linków między pokojami są czytane z plików pokoi przez :class:`ElementIndex`).
+    """
+    archive_path = None
+    if os.path.isdir(path):
+        project, store = open_project_dir(path)
+        index = ElementIndex(project, store.view)
+        targets = {h.name: index.directory(h.name) for h in project.houses}
+        rooms = [(h.name, r.name, room_path(path, r.uid), targets[h.name]) for h in project.houses for r in h.rooms]
+        return project, rooms, None
+    if path.lower().endswith(ELK_SUFFIX):
+        arch = ElkArchive(path)
+        try:
+            data = arch.read_project()
+        finally:
+            arch.close()
+        archive_path = path
+    else:
+        data = read_json(path)
+    project = project_from_dict(data)
+    index = ElementIndex(project)
+    targets = {h.name: index.directory(h.name) for h in project.houses}
+    return project, [(h.name, r.name, r, targets[h.name]) for h in project.houses for r in h.rooms], archive_path
+
+
+def safe_name(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text, flags=re.UNICODE).strip("_") or "bez_nazwy"
+
+
+def export_file(task: tuple) -> dict:
+    """Eksport jednego projektu (w procesie roboczym). ``task = (ścieżka, katalog wyjścia, format, settings, procesy stron)``."""
+    path, out_dir, fmt, settings, page_workers = task
+    t0 = time.perf_counter()
+    result = {"path": path, "outputs": [], "pages": 0, "bytes": 0, "secs": 0.0, "error": None}
+    try:
+        project, rooms, archive_path = load_project_file(path)
+        sources = dict(zip((r.uid for h in project.houses for r in h.rooms), (src for _, _, src, _ in rooms)))
+        # legenda obwodów ze stanem pętli zwarcia — jak w eksporcie z aplikacji
+        loop = {cid: cp.summary for cid, cp in check_project(project, settings, lambda r: resolve_room(sources[r.uid])).items()}
+        stem = safe_name(os.path.splitext(os.path.basename(os.path.normpath(path)))[0])
+        if fmt in ("pdf", "vector"):
+            out = os.path.join(out_dir, f"{stem}.pdf")
+            if fmt == "pdf":
+                jobs = [(src, project.circuits, settings, archive_path, targets, loop) for _, _, src, targets in rooms]
+                export_pages_pdf(out, jobs, page_workers)
+            else:
+                export_rooms_pdf(out, [src for _, _, src, _ in rooms], project.circuits, settings, archive_path,
+                                 targets=[targets for _, _, _, targets in rooms], loop=loop)
+            result["outputs"].append(out)
+        else:
+            sub = os.path.join(out_dir, stem)
+            os.makedirs(sub, exist_ok=True)
+            for i, (house, name, src, targets) in enumerate(rooms):
+                room = resolve_room(src)
+                out = os.path.join(sub, f"{i+1:03d}_{safe_name(house)}_{safe_name(name)}.{fmt}")
+                if fmt == "svg":
+                    export_room_svg(out, room, project.circuits, settings, archive_path, targets=targets, loop=loop)
+                else:
+                    try:
+                        bg = open_background(room.background_image, archive_path)
+                    except Exception:
+                        bg = None
+                    render_room(room, project.circuits, settings, bg, targets=targets, loop=loop).save(out, "PNG")
+                result["outputs"].append(out)
+        result["pages"] = len(rooms)
+        result["bytes"] = sum(os.path.getsize(o) for o in result["outputs"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["secs"] = time.perf_counter() - t0
+    return result
+
+
+def run_export(paths: Sequence[str], out_dir: str, fmt: str, settings, workers: Optional[int] = None,
+               report=print) -> List[dict]:
+    """Eksportuj pliki; przy wielu plikach — po jednym procesie na plik. Wyniki w kolejności zakończenia."""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if len(paths) == 1 or workers <= 1:
+        page_workers = workers if len(paths) == 1 else 1
+        results = []
+        for p in paths:
+            results.append(export_file((p, out_dir, fmt, settings, page_workers))); report_result(results[-1], report)
+        return results
+    tasks = [(p, out_dir, fmt, settings, 1) for p in paths]
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        for f in as_completed([pool.submit(export_file, t) for t in tasks]):
+            results.append(f.result()); report_result(results[-1], report)
+    return results
+
+
+def report_result(r: dict, report=print) -> None:
+    if r["error"]:
+        report(f"BŁĄD {r['path']}: {r['error']}")
+    else:
+        report(f"OK   {r['path']}: {r['pages']} str., {r['bytes']//1024} kB, {r['secs']:.2f} s")
+
+
+def summary(results: Sequence[dict], wall: float) -> str:
+    ok = [r for r in results if not r["error"]]
+    pages = sum(r["pages"] for r in ok)
+    mb = sum(r["bytes"] for r in ok) / (1 << 20)
+    return (f"Pliki: {len(ok)}/{len(results)}, strony: {pages}, {mb:.1f} MB w {wall:.2f} s — "
+            f"{pages / wall if wall > 0 else 0:.1f} str./s, {len(ok) / wall if wall > 0 else 0:.2f} plików/s")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="elektryka_cli", description="Elektryka — narzędzia wsadowe bez GUI")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ex = sub.add_parser("export", help="eksport rzutów pokoi do PDF/PNG/SVG")
+    ex.add_argument("inputs", nargs="+", help="projekty: .json, .elk lub katalogi .elkproj")
+    ex.add_argument("-o", "--out", default=".", help="katalog wyjściowy (domyślnie bieżący)")
+    ex.add_argument("-f", "--format", choices=FORMATS, default="pdf")
+    ex.add_argument("-j", "--workers", type=int, default=0, help="liczba procesów (domyślnie liczba rdzeni)")
+    ex.add_argument("--settings", default=SETTINGS_FILE, help="plik ustawień (kolory żył i obwodów)")
+    args = ap.parse_args(argv)
+
+    if args.format in ("pdf", "png") and not PIL_AVAILABLE:
+        print("Format wymaga Pillow: pip install pillow (bez Pillow: --format vector lub svg)", file=sys.stderr)
+        return 2
+    settings, err = load_settings(args.settings)
+    if err:
+        print(f"Uwaga: nie wczytano {args.settings} ({err}) — używam ustawień domyślnych.", file=sys.stderr)
+    t0 = time.perf_counter()
+    results = run_export(args.inputs, args.out, args.format, compile_settings(settings), args.workers or None)
+    print(summary(results, time.perf_counter() - t0))
+    return 1 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
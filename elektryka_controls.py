@@ -0,0 +1,117 @@
+"""
+Graf sterowania: łącznik ↔ sterowane elementy (lampy, rolety) całego projektu.
+
+``Element.controls`` to lista odwołań do sterowanych elementów: samo id
+(ten sam pokój) albo ``"Pokój:id"`` (inny pokój tego samego domu).
+:class:`ControlGraph` trzyma krawędzie w obie strony — „czym steruje
+łącznik W-03” i „które łączniki sterują tą lampą” to odczyt słownika,
+bez przeglądania elementów. Krawędzie pokoju są przepisywane przez
+:meth:`ControlGraph.update_rooms` (aplikacja woła je z ``_mark_dirty``),
+a pokoje niewczytane czytane są przez ``room_view`` — jak w
+:class:`elektryka_index.ElementIndex`.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from elektryka_model import Element, Project, Room
+
+SEP = ":"
+
+Key = Tuple[str, str, str]        # (dom, pokój, id elementu)
+
+
+def parse_ref(ref: str, room: str) -> Tuple[str, str]:
+    """``"id"`` → ``(room, id)``, ``"Pokój:id"`` → ``("Pokój", id)`` (nazwa pokoju może zawierać ``:``)."""
+    name, sep, eid = ref.strip().rpartition(SEP)
+    return (name.strip(), eid.strip()) if sep and name.strip() else (room, eid.strip())
+
+
+def format_ref(room: str, element_id: str, from_room: str) -> str:
+    return element_id if room == from_room else f"{room}{SEP}{element_id}"
+
+
+class ControlGraph:
+    def __init__(self, project: Optional[Project] = None, room_view: Callable[[Room], Room] = lambda r: r):
+        self.project = project
+        self.room_view = room_view
+        self._out: Dict[Key, List[Key]] = {}          # łącznik -> sterowane
+        self._in: Dict[Key, Set[Key]] = {}            # sterowany -> łączniki
+        self._room_keys: Dict[str, List[Key]] = {}    # room uid -> łączniki pokoju (do przepisania)
+        self._house_of: Dict[str, str] = {}
+
+    def rebuild(self, project: Project, room_view: Optional[Callable[[Room], Room]] = None) -> None:
+        self.project = project
+        if room_view is not None:
+            self.room_view = room_view
+        self._out.clear(); self._in.clear(); self._room_keys.clear(); self._house_of.clear()
+        for h in project.houses:
+            for r in h.rooms:
+                self._house_of[r.uid] = h.name
+                self._add_room(h.name, self.room_view(r))
+
+    def update_rooms(self, rooms: Iterable[Room]) -> None:
+        """Przepisz krawędzie wskazanych pokoi (zmiana elementów, ``controls`` albo nazwy pokoju)."""
+        rooms = list(rooms)
+        if not rooms or self.project is None:
+            return
+        if any(r.uid not in self._house_of for r in rooms):     # nowy pokój
+            self._house_of = {r.uid: h.name for h in self.project.houses for r in h.rooms}
+        for r in rooms:
+            self._drop_room(r.uid)
+            house = self._house_of.get(r.uid)
+            if house is not None:
+                self._add_room(house, self.room_view(r))
+
+    def remove_rooms(self, room_uids: Iterable[str]) -> None:
+        for uid in room_uids:
+            self._drop_room(uid); self._house_of.pop(uid, None)
+
+    def rename_house(self, old: str, new: str) -> None:
+        """Przepisz klucze domu po zmianie nazwy — bez ponownego czytania pokoi."""
+        if old == new:
+            return
+        key = lambda k: (new, k[1], k[2]) if k[0] == old else k
+        self._out = {key(s): [key(d) for d in ds] for s, ds in self._out.items()}
+        self._in = {key(d): {key(s) for s in ss} for d, ss in self._in.items()}
+        self._room_keys = {uid: [key(k) for k in ks] for uid, ks in self._room_keys.items()}
+        self._house_of = {uid: (new if h == old else h) for uid, h in self._house_of.items()}
+
+    def _drop_room(self, uid: str) -> None:
+        for src in self._room_keys.pop(uid, ()):
+            for dst in self._out.pop(src, ()):
+                s = self._in.get(dst)
+                if s is not None:
+                    s.discard(src)
+                    if not s: del self._in[dst]
+
+    def _add_room(self, house: str, room: Room) -> None:
+        keys = []
+        for el in room.elements:
+            if not el.controls:
+                continue
+            src = (house, room.name, el.id)
+            dsts = []
+            for ref in el.controls:
+                rn, eid = parse_ref(ref, room.name)
+                if eid and (house, rn, eid) != src and (house, rn, eid) not in dsts:
+                    dsts.append((house, rn, eid))
+            if dsts:
+                self._out.setdefault(src, []).extend(dsts); keys.append(src)
+                for dst in dsts:
+                    self._in.setdefault(dst, set()).add(src)
+        self._room_keys[room.uid] = keys
+
+    # --- odczyt ---
+    def controls(self, house: str, room: str, element_id: str) -> List[Key]:
+        """Czym steruje element (łącznik)."""
+        return list(self._out.get((house, room, element_id), ()))
+
+    def controlled_by(self, house: str, room: str, element_id: str) -> List[Key]:
+        """Łączniki sterujące elementem."""
+        return sorted(self._in.get((house, room, element_id), ()))
+
+    def dangling(self, resolve: Callable[[str, str, str], Optional[Element]]) -> List[Tuple[Key, Key]]:
+        """Odwołania ``controls`` bez celu (``resolve`` — np. :meth:`ElementIndex.get`)."""
+        return [(s, d) for s, ds in self._out.items() for d in ds if resolve(*d) is None]
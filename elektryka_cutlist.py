@@ -0,0 +1,167 @@
+"""
+Wykaz cięć przewodów z bębnów (krążków) — np. YDYp po 50/100 m.
+
+Dla każdego typu kabla odcinki (długość przewodu + zapas na każdy koniec,
+``cables.slack_per_termination_m``) są pakowane do jak najmniejszej liczby
+bębnów o rozmiarach ``cables.drums_m``: heurystyka „najlepsze dopasowanie
+malejąco” (BFD) do największego bębna — wolne miejsca trzymane są na
+posortowanej liście i przeszukiwane ``bisect``, więc tysiące cięć to
+ułamek sekundy — a na koniec każdy bęben zastępowany jest najmniejszym
+rozmiarem, który mieści jego cięcia (albo kilkoma mniejszymi, jeśli to
+mniej metrów). Odcinki dłuższe niż największy bęben
+trafiają do ``oversize`` (trzeba je kupić z metra).
+
+Źródła odcinków: połączenia projektu :mod:`elektryka_model` (``cable_type``
+i długość) albo przewody ``Cable`` z :mod:`app.models` (``kind`` i łamana).
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from elektryka_model import Connection, Element, Project, Room
+from elektryka_settings import number, section
+
+DRUMS_M = (50.0, 100.0)
+SLACK_PER_TERMINATION_M = 0.3
+TERMINATIONS = 2
+
+
+@dataclass
+class Cut:
+    label: str
+    length_m: float                      # z zapasem
+
+
+@dataclass
+class Drum:
+    size_m: float
+    cuts: List[Cut] = field(default_factory=list)
+    used_m: float = 0.0
+
+    @property
+    def waste_m(self) -> float:
+        return self.size_m - self.used_m
+
+
+@dataclass
+class CutPlan:
+    cable_type: str
+    drums: List[Drum] = field(default_factory=list)
+    oversize: List[Cut] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)   # połączenia bez długości
+
+    @property
+    def required_m(self) -> float:
+        return sum(d.used_m for d in self.drums) + sum(c.length_m for c in self.oversize)
+
+    @property
+    def bought_m(self) -> float:
+        return sum(d.size_m for d in self.drums) + sum(c.length_m for c in self.oversize)
+
+    @property
+    def waste_m(self) -> float:
+        return sum(d.waste_m for d in self.drums)
+
+    def drum_counts(self) -> Dict[float, int]:
+        out: Dict[float, int] = {}
+        for d in self.drums:
+            out[d.size_m] = out.get(d.size_m, 0) + 1
+        return out
+
+
+def options(settings) -> Tuple[Tuple[float, ...], float]:
+    """``(rozmiary bębnów, zapas na koniec)`` z sekcji ``cables`` ustawień (słownik lub CompiledSettings)."""
+    sec = section(settings, "cables")
+    try:
+        drums = tuple(sorted(float(x) for x in sec.get("drums_m", DRUMS_M) if float(x) > 0)) or DRUMS_M
+    except (TypeError, ValueError):
+        drums = DRUMS_M
+    return drums, number(sec, "slack_per_termination_m", SLACK_PER_TERMINATION_M, 0.0)
+
+
+def pack(cuts: Iterable[Cut], drums: Sequence[float] = DRUMS_M, cable_type: str = "") -> CutPlan:
+    """Rozmieść cięcia jednego typu kabla na bębnach (patrz opis modułu)."""
+    sizes = sorted(drums)
+    big = sizes[-1]
+    plan = CutPlan(cable_type)
+    order = sorted(cuts, key=lambda c: c.length_m, reverse=True)
+    free: List[Tuple[float, int]] = []          # (wolne m, indeks bębna) — posortowane
+    for c in order:
+        if c.length_m > big:
+            plan.oversize.append(c); continue
+        k = bisect.bisect_left(free, (c.length_m - 1e-9, -1))
+        if k < len(free):
+            rem, i = free.pop(k)
+        else:
+            plan.drums.append(Drum(big)); rem, i = big, len(plan.drums) - 1
+        d = plan.drums[i]
+        d.cuts.append(c); d.used_m += c.length_m
+        bisect.insort(free, (rem - c.length_m, i))
+    drums_out = []
+    for d in plan.drums:                        # mniejszy bęben, jeśli wystarczy…
+        k = bisect.bisect_left(sizes, d.used_m - 1e-9)
+        d.size_m = sizes[k]
+        if k > 0 and d.cuts[0].length_m <= sizes[k-1]:
+            # …albo kilka mniejszych, jeśli kosztują mniej metrów (zwykle ostatni, niepełny bęben)
+            alt = pack(d.cuts, sizes[:k])
+            if sum(x.size_m for x in alt.drums) < d.size_m:
+                drums_out.extend(alt.drums); continue
+        drums_out.append(d)
+    plan.drums = drums_out
+    plan.drums.sort(key=lambda d: (-d.size_m, d.waste_m))
+    return plan
+
+
+def plan_cuts(items: Iterable[Tuple[str, Optional[float], str]], drums: Sequence[float] = DRUMS_M,
+              slack_per_termination: float = SLACK_PER_TERMINATION_M,
+              terminations: int = TERMINATIONS) -> Dict[str, CutPlan]:
+    """Plany wg typu kabla z ``(typ kabla, długość [m] lub None, opis)``."""
+    groups: Dict[str, List[Cut]] = {}
+    missing: Dict[str, List[str]] = {}
+    for kind, length, label in items:
+        kind = (kind or "").strip() or "?"
+        if length is None or not math.isfinite(length) or length <= 0:
+            missing.setdefault(kind, []).append(label); groups.setdefault(kind, []); continue
+        groups.setdefault(kind, []).append(Cut(label, round(length + terminations * slack_per_termination, 2)))
+    out = {}
+    for kind in sorted(groups):
+        out[kind] = pack(groups[kind], drums, kind)
+        out[kind].missing = missing.get(kind, [])
+    return out
+
+
+def project_items(project: Project, room_view: Callable[[Room], Room] = lambda r: r,
+                  length_of: Optional[Callable[[Room, Element, Connection], Optional[float]]] = None
+                  ) -> Iterable[Tuple[str, Optional[float], str]]:
+    """Odcinki połączeń projektu: ``(cable_type, długość, "Dom / Pokój / element #n")``."""
+    length_of = length_of or (lambda room, el, con: con.length_m)
+    for h in project.houses:
+        for r in h.rooms:
+            view = room_view(r)
+            for el in view.elements:
+                for i, con in enumerate(el.connections):
+                    yield con.cable_type, length_of(view, el, con), f"{h.name} / {view.name} / {el.label or el.id} #{i+1}"
+
+
+def polyline_m(points: Sequence[Tuple[float, float]], px_per_meter: float) -> float:
+    return sum(math.dist(p, q) for p, q in zip(points, points[1:])) / px_per_meter if px_per_meter > 0 else 0.0
+
+
+def format_plan(plans: Dict[str, CutPlan]) -> str:
+    """Wykaz tekstowy: bęben po bębnie."""
+    lines = []
+    for kind, p in plans.items():
+        counts = ", ".join(f"{n}×{s:g} m" for s, n in sorted(p.drum_counts().items(), reverse=True)) or "—"
+        lines.append(f"{kind}: {counts}; potrzeba {p.required_m:.1f} m, odpad {p.waste_m:.1f} m")
+        for n, d in enumerate(p.drums, 1):
+            cuts = ", ".join(f"{c.length_m:g} ({c.label})" for c in d.cuts)
+            lines.append(f"  bęben {n} ({d.size_m:g} m, reszta {d.waste_m:.1f} m): {cuts}")
+        for c in p.oversize:
+            lines.append(f"  z metra: {c.length_m:g} m ({c.label}) — dłuższy niż bęben")
+        if p.missing:
+            lines.append(f"  bez długości ({len(p.missing)}): " + ", ".join(p.missing[:10]) + (" …" if len(p.missing) > 10 else ""))
+    return "\n".join(lines)
@@ -0,0 +1,218 @@
+"""
+Import rzutu z pliku DXF (ASCII) do segmentów układu pokoju.
+
+Plik jest czytany strumieniowo — para linii (kod grupy, wartość) naraz —
+więc rzuty z setkami tysięcy obiektów nie są wczytywane do pamięci
+w całości. Obsługiwane obiekty sekcji ENTITIES: ``LINE`` i ``LWPOLYLINE``
+(łuki polilinii jako cięciwy); warstwy przypisuje się rodzajom segmentów
+(``SCIANA``/``OKNO``/``DRZWI``). Bloki (``INSERT``) są pomijane.
+
+Współrzędne: jednostki rysunku wg ``$INSUNITS`` (domyślnie mm) → metry →
+piksele płótna wg ``ui.px_per_meter``; oś Y odwrócona (w DXF rośnie w górę),
+rzut przesunięty do ``origin``. Współliniowe kawałki tej samej ściany
+(typowe po eksporcie z CAD) są scalane w jeden segment.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from elektryka_model import Segment
+
+KINDS = ("SCIANA", "OKNO", "DRZWI")
+UNIT_METERS = {0: 0.001, 1: 0.0254, 2: 0.3048, 4: 0.001, 5: 0.01, 6: 1.0}   # $INSUNITS → m (0 = brak: mm)
+MERGE_TOL_PX = 0.5
+ANGLE_TOL = 1e-3
+
+# podpowiedź rodzaju po nazwie warstwy
+LAYER_HINTS = (("OKN", "OKNO"), ("WIN", "OKNO"), ("DRZW", "DRZWI"), ("DOOR", "DRZWI"),
+               ("SCIAN", "SCIANA"), ("ŚCIAN", "SCIANA"), ("WALL", "SCIANA"), ("MUR", "SCIANA"))
+
+Line = Tuple[float, float, float, float]
+
+
+class DxfError(ValueError):
+    pass
+
+
+def guess_kind(layer: str) -> str:
+    up = layer.upper()
+    return next((kind for hint, kind in LAYER_HINTS if hint in up), "")
+
+
+def iter_pairs(f: TextIO) -> Iterator[Tuple[int, str]]:
+    """Pary ``(kod grupy, wartość)`` pliku DXF ASCII."""
+    lineno = 0
+    while True:
+        code = f.readline()
+        if not code:
+            return
+        value = f.readline(); lineno += 2
+        try:
+            yield int(code), value.strip()
+        except ValueError:
+            raise DxfError(f"linia {lineno-1}: nieprawidłowy kod grupy {code.strip()!r} (czy to DXF ASCII?)") from None
+
+
+def _open(path: str) -> TextIO:
+    # DXF R2007+ jest w UTF-8, starsze w stronie kodowej ($DWGCODEPAGE); nazwy warstw zwykle ASCII
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def iter_entities(path: str, layers: Optional[set] = None) -> Iterator[Tuple[str, str, dict]]:
+    """Obiekty ``(typ, warstwa, kody)`` z sekcji HEADER (typ ``$INSUNITS``) i ENTITIES.
+
+    ``kody`` — słownik kod → lista wartości; ``layers`` (wielkie litery) ogranicza warstwy.
+    """
+    with _open(path) as f:
+        section = None; cur = None; expect_section = False; header_var = None
+        keep = lambda e: e is not None and (layers is None or e[1].upper() in layers)
+        for code, value in iter_pairs(f):
+            if code == 0:
+                if keep(cur):
+                    yield cur
+                cur = None
+                if value == "SECTION": expect_section = True
+                elif value == "ENDSEC": section = None
+                elif section == "ENTITIES" and value in ("LINE", "LWPOLYLINE"):
+                    cur = (value, "0", {})
+                continue
+            if expect_section and code == 2:
+                section = value; expect_section = False; continue
+            if section == "HEADER":
+                if code == 9: header_var = value
+                elif header_var == "$INSUNITS" and code == 70:
+                    yield ("$INSUNITS", "", {70: [value]})
+            elif cur is not None:
+                if code == 8:   # warstwa pominięta — dalszych kodów obiektu nie zbieramy
+                    cur = (cur[0], value, cur[2]) if layers is None or value.upper() in layers else None
+                else:
+                    cur[2].setdefault(code, []).append(value)
+        if keep(cur):
+            yield cur
+
+
+def scan_layers(path: str) -> Tuple[Dict[str, int], Optional[int]]:
+    """``({warstwa: liczba linii/polilinii}, $INSUNITS)`` — do wyboru warstw przed importem."""
+    counts: Dict[str, int] = {}; units = None
+    for kind, layer, codes in iter_entities(path):
+        if kind == "$INSUNITS":
+            units = int(codes[70][0])
+        else:
+            counts[layer] = counts.get(layer, 0) + 1
+    return counts, units
+
+
+def _lines(kind: str, codes: dict) -> Iterator[Line]:
+    f = lambda c: [float(v) for v in codes.get(c, ())]
+    if kind == "LINE":
+        x1, y1, x2, y2 = f(10), f(20), f(11), f(21)
+        if x1 and y1 and x2 and y2:
+            yield x1[0], y1[0], x2[0], y2[0]
+        return
+    xs, ys = f(10), f(20)
+    pts = list(zip(xs, ys))
+    closed = int(codes.get(70, ["0"])[0]) & 1
+    if closed and len(pts) > 2:
+        pts.append(pts[0])
+    for (x1, y1), (x2, y2) in zip(pts, pts[1:]):
+        yield x1, y1, x2, y2
+
+
+def merge_collinear(lines: List[Line], tol: float = MERGE_TOL_PX) -> List[Line]:
+    """Scal współliniowe, nakładające się lub stykające odcinki.
+
+    Kierunek prostej to kąt z ``[0, π)``, kubełki mają szerokość tolerancji (kąt ``ANGLE_TOL``,
+    odległość od początku układu ``tol``), a proste szukane są też w kubełkach sąsiednich —
+    z zawinięciem kąta π → 0 (kierunek i odległość ze zmienionym znakiem). Proste zgodne
+    w tolerancji łączone są w grupy; odcinki grupy rzutowane na najdłuższy z nich.
+    """
+    n_ang = math.ceil(math.pi / ANGLE_TOL)
+    items: List[Tuple[float, float, float, float, Line]] = []     # (kąt, ux, uy, odległość, odcinek)
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    parent: List[int] = []
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]; i = parent[i]
+        return i
+
+    for line in lines:
+        x1, y1, x2, y2 = line
+        if math.hypot(x2 - x1, y2 - y1) <= tol:
+            continue
+        theta = math.atan2(y2 - y1, x2 - x1) % math.pi
+        if theta >= math.pi:                            # -0.0 % π
+            theta = 0.0
+        ux, uy = math.cos(theta), math.sin(theta)
+        off = -uy * x1 + ux * y1                        # odległość prostej od początku układu
+        i = len(items); items.append((theta, ux, uy, off, line)); parent.append(i)
+        ka = min(int(theta / ANGLE_TOL), n_ang - 1)
+        for da in (-1, 0, 1):
+            a = ka + da; sign = 1.0
+            if not 0 <= a < n_ang:                      # po drugiej stronie π: kierunek przeciwny
+                a %= n_ang; sign = -1.0
+            ko = math.floor(sign * off / tol)
+            for o in (ko - 1, ko, ko + 1):
+                for j in buckets.get((a, o), ()):
+                    th, vx, vy, vo, _ = items[j]
+                    d = abs(theta - th)
+                    s = 1.0 if vx * ux + vy * uy >= 0 else -1.0
+                    if min(d, math.pi - d) <= ANGLE_TOL and abs(off - s * vo) <= tol:
+                        parent[root(j)] = root(i)
+        buckets.setdefault((ka, math.floor(off / tol)), []).append(i)
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(root(i), []).append(i)
+    out: List[Line] = []
+    for members in groups.values():
+        _, ux, uy, off, _ = max((items[i] for i in members), key=lambda it: math.hypot(it[4][2] - it[4][0], it[4][3] - it[4][1]))
+        spans = []
+        for i in members:
+            x1, y1, x2, y2 = items[i][4]
+            t1, t2 = ux * x1 + uy * y1, ux * x2 + uy * y2
+            spans.append((min(t1, t2), max(t1, t2)))
+        spans.sort()
+        lo, hi = spans[0]
+        for a, b in spans[1:]:
+            if a <= hi + tol:
+                hi = max(hi, b)
+            else:
+                out.append((ux*lo - uy*off, uy*lo + ux*off, ux*hi - uy*off, uy*hi + ux*off)); lo, hi = a, b
+        out.append((ux*lo - uy*off, uy*lo + ux*off, ux*hi - uy*off, uy*hi + ux*off))
+    return out
+
+
+def import_segments(path: str, layer_kinds: Dict[str, str], px_per_meter: float = 50.0,
+                    units: Optional[int] = None, origin: Tuple[int, int] = (40, 40),
+                    merge: bool = True) -> Tuple[List[Segment], dict]:
+    """Segmenty z warstw ``layer_kinds`` (warstwa → rodzaj). Zwraca ``(segmenty, statystyka)``.
+
+    ``units`` — kod ``$INSUNITS``; domyślnie z nagłówka pliku (brak → mm).
+    """
+    kinds = {k.upper(): v for k, v in layer_kinds.items() if v in KINDS}
+    raw: Dict[str, List[Line]] = {k: [] for k in KINDS}
+    n_entities = 0; file_units = None
+    x0, y1 = math.inf, -math.inf                       # lewa krawędź i góra rzutu
+    for kind, layer, codes in iter_entities(path, set(kinds)):
+        if kind == "$INSUNITS":
+            file_units = int(codes[70][0]); continue
+        n_entities += 1
+        for l in _lines(kind, codes):
+            raw[kinds[layer.upper()]].append(l)
+            x0 = min(x0, l[0], l[2]); y1 = max(y1, l[1], l[3])
+    units = units if units is not None else file_units
+    k = UNIT_METERS.get(units or 0, 0.001) * px_per_meter
+    pieces = sum(len(v) for v in raw.values())
+    if not pieces:
+        return [], {"entities": n_entities, "pieces": 0, "segments": 0}
+    segments: List[Segment] = []
+    for kind in KINDS:
+        scaled = [((ax-x0)*k + origin[0], (y1-ay)*k + origin[1], (bx-x0)*k + origin[0], (y1-by)*k + origin[1])
+                  for ax, ay, bx, by in raw[kind]]
+        for ax, ay, bx, by in (merge_collinear(scaled) if merge else scaled):
+            a, b = (round(ax), round(ay)), (round(bx), round(by))
+            if a != b:
+                segments.append(Segment(kind=kind, a=a, b=b))
+    return segments, {"entities": n_entities, "pieces": pieces, "segments": len(segments)}
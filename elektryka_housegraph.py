@@ -0,0 +1,261 @@
+"""
+Długości przewodów do rozdzielnicy przez przejścia między pokojami.
+
+Każdy pokój ma własny układ współrzędnych, a pokoje łączą przejścia
+(``PRZEJSCIE`` z ``portal_to_room``). :class:`HouseGraph` to graf domu,
+którego węzłami są przejścia (i rozdzielnica): krawędź wewnątrz pokoju
+ma wagę długości trasy między przejściami (:mod:`elektryka_routing`),
+a para przejść A→B / B→A to ten sam otwór (waga 0). Dijkstra od
+rozdzielnicy daje odległość każdego przejścia; w każdym pokoju pole
+odległości (:meth:`NavGrid.distance_field`) startuje z jego przejść,
+więc długość przewodu dowolnego elementu to odczyt jednej komórki.
+
+Rozdzielnica: pokój z ``distribution_board["room_uid"]``, pokój z elementem
+typu ``rozdzielnica`` (lub etykietą ``RG``) albo pokój o nazwie
+„Rozdzielnia”/„RG”; bez elementu przewód kończy się w środku pokoju.
+:class:`HouseGraphCache` trzyma grafy domów i odrzuca je tylko po zmianie
+segmentów, przejść lub położenia rozdzielnicy.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from elektryka_model import Element, House, Project, Room
+from elektryka_routing import RouteCache
+
+BOARD_TYPES = ("rozdzielnica", "rg")
+BOARD_ROOM_RE = re.compile(r"rozdzielni|^rg\b", re.I)
+
+Point = Tuple[float, float]
+Node = Tuple[str, int]           # (uid pokoju, indeks segmentu przejścia); rozdzielnica: ("", -1)
+BOARD: Node = ("", -1)
+
+
+def is_board(el: Element) -> bool:
+    t = (el.type or "").lower()
+    return t.startswith(BOARD_TYPES[0]) or t == "rg" or bool(re.match(r"rg\b", el.label or "", re.I))
+
+
+def _portals(room: Room) -> List[Tuple[int, str, Point]]:
+    return [(i, s.portal_to_room, ((s.a[0]+s.b[0]) / 2, (s.a[1]+s.b[1]) / 2))
+            for i, s in enumerate(room.segments) if s.kind == "PRZEJSCIE" and s.portal_to_room]
+
+
+def _center(room: Room) -> Optional[Point]:
+    pts = [p for s in room.segments for p in (s.a, s.b)] or [(e.x, e.y) for e in room.elements]
+    if not pts:
+        return None
+    return ((min(p[0] for p in pts) + max(p[0] for p in pts)) / 2,
+            (min(p[1] for p in pts) + max(p[1] for p in pts)) / 2)
+
+
+def fingerprint(room: Room) -> tuple:
+    """To, od czego zależy graf: nazwa, segmenty (z przejściami) i położenie rozdzielnicy."""
+    return (room.name, tuple((s.kind, tuple(s.a), tuple(s.b), s.portal_to_room) for s in room.segments),
+            tuple((e.x, e.y) for e in room.elements if is_board(e)))
+
+
+def board_location(house: House, project: Optional[Project] = None,
+                   room_view: Callable[[Room], Room] = lambda r: r) -> Tuple[Optional[Room], Optional[Point]]:
+    """``(pokój, punkt)`` rozdzielnicy w domu; punkt ``None`` — środek pokoju."""
+    uid = (project.distribution_board.get("room_uid") if project is not None else None)
+    views = [(r, room_view(r)) for r in house.rooms]
+    for r, v in views:
+        if uid and r.uid != uid:
+            continue
+        el = next((e for e in v.elements if is_board(e)), None)
+        if el is not None:
+            return r, (el.x, el.y)
+    if uid:
+        r = next((r for r, _ in views if r.uid == uid), None)
+        if r is not None:
+            return r, None
+    r = next((r for r, v in views if BOARD_ROOM_RE.search(v.name)), None)
+    return (r, None) if r is not None else (None, None)
+
+
+@dataclass
+class CableRun:
+    """Przewód od elementu do rozdzielnicy."""
+    length_px: float
+    rooms: List[str] = field(default_factory=list)     # pokoje na trasie (od elementu do rozdzielnicy)
+
+    def length_m(self, px_per_meter: float) -> float:
+        return self.length_px / px_per_meter if px_per_meter > 0 else 0.0
+
+
+class HouseGraph:
+    """Graf przejść domu i odległości do rozdzielnicy (Dijkstra)."""
+
+    def __init__(self, house: House, routes: RouteCache, project: Optional[Project] = None,
+                 room_view: Callable[[Room], Room] = lambda r: r):
+        self.routes = routes
+        self.room_view = room_view
+        self.uids: Set[str] = {r.uid for r in house.rooms}
+        board_room, board_pt = board_location(house, project, room_view)
+        self.board_uid = board_room.uid if board_room is not None else None
+        self.dist: Dict[Node, float] = {}
+        self.prev: Dict[Node, Node] = {}
+        self._names: Dict[str, str] = {}
+        self._sources: Dict[str, List[Tuple[Node, Point, float]]] = {}   # pokój -> (węzeł, punkt, odległość)
+        self._fields: Dict[str, tuple] = {}
+        if board_room is None:
+            return
+        views = {r.uid: room_view(r) for r in house.rooms}
+        by_name: Dict[str, str] = {}
+        for uid, v in views.items():
+            self._names[uid] = v.name; by_name.setdefault(v.name, uid)
+        if board_pt is None:
+            board_pt = _center(views[self.board_uid])
+        portals = {uid: _portals(v) for uid, v in views.items()}
+        adj: Dict[Node, List[Tuple[Node, float]]] = {}
+
+        def edge(a: Node, b: Node, w: float):
+            adj.setdefault(a, []).append((b, w)); adj.setdefault(b, []).append((a, w))
+
+        for uid, ps in portals.items():
+            room = views[uid]
+            for k, (i, _, p) in enumerate(ps):
+                for j, _, q in ps[k+1:]:
+                    r = routes.route(room, p, q)
+                    edge((uid, i), (uid, j), r.length_px if r is not None else abs(p[0]-q[0]) + abs(p[1]-q[1]))
+                if uid == self.board_uid and board_pt is not None:
+                    r = routes.route(room, p, board_pt)
+                    edge((uid, i), BOARD, r.length_px if r is not None else abs(p[0]-board_pt[0]) + abs(p[1]-board_pt[1]))
+            # ten sam otwór widziany z drugiego pokoju: k-te przejście A→B z k-tym B→A
+            for to in {t for _, t, _ in ps}:
+                other = by_name.get(to)
+                if other is None or other == uid:
+                    continue
+                mine = [i for i, t, _ in ps if t == to]
+                theirs = [i for i, t, _ in portals[other] if t == room.name]
+                for i, j in zip(mine, theirs):
+                    edge((uid, i), (other, j), 0.0)
+        self.dist[BOARD] = 0.0
+        heap = [(0.0, BOARD)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > self.dist.get(u, math.inf):
+                continue
+            for v, w in adj.get(u, ()):
+                if d + w < self.dist.get(v, math.inf):
+                    self.dist[v] = d + w; self.prev[v] = u
+                    heapq.heappush(heap, (d + w, v))
+        if board_pt is not None:
+            self._sources[self.board_uid] = [(BOARD, board_pt, 0.0)]
+        for uid, ps in portals.items():
+            if uid != self.board_uid:
+                self._sources[uid] = [((uid, i), p, self.dist[(uid, i)]) for i, _, p in ps if (uid, i) in self.dist]
+
+    def run(self, room: Room, el: Element) -> Optional[CableRun]:
+        """Najkrótszy przewód od elementu do rozdzielnicy (``None`` — brak drogi)."""
+        sources = self._sources.get(room.uid)
+        if not sources:
+            return None
+        grid = self.routes.grid(room)
+        f = self._fields.get(room.uid)
+        if f is None or f[0] is not grid:
+            f = (grid, grid.distance_field([(p, d) for _, p, d in sources])); self._fields[room.uid] = f
+        length, k = grid.field_length(f[1], (el.x, el.y))
+        if length == math.inf:
+            return None
+        return CableRun(length, self._path(sources[k][0]))
+
+    def _path(self, node: Node) -> List[str]:
+        names: List[str] = []
+        while node != BOARD:
+            name = self._names.get(node[0])
+            if name and (not names or names[-1] != name):
+                names.append(name)
+            node = self.prev[node]
+        name = self._names.get(self.board_uid)
+        return names + [name] if name and (not names or names[-1] != name) else names
+
+
+class HouseGraphCache:
+    """Grafy domów wg nazwy; :meth:`invalidate` (z ``_mark_dirty``) odrzuca graf tylko po zmianie odcisku pokoju.
+
+    Odrzucony graf zostaje do porównania: :meth:`rerouted` buduje nowy i zwraca tylko pokoje, w których
+    zmieniły się odległości przejść do rozdzielnicy — tylko tam trzeba przeliczyć przewody. Pokoje
+    niewczytane (``room_view`` czyta plik) są czytane raz i trzymane do zmiany pokoju.
+    """
+
+    def __init__(self, routes: RouteCache, project: Optional[Project] = None,
+                 room_view: Callable[[Room], Room] = lambda r: r):
+        self.routes = routes
+        self.project = project
+        self.room_view = room_view
+        self._graphs: Dict[str, HouseGraph] = {}
+        self._previous: Dict[str, HouseGraph] = {}   # dom -> graf, wg którego policzono obecne długości
+        self._fp: Dict[str, tuple] = {}
+        self._views: Dict[str, Room] = {}
+
+    def reset(self, project: Project, room_view: Callable[[Room], Room] = lambda r: r) -> None:
+        self.project = project; self.room_view = room_view
+        self.clear()
+
+    def clear(self) -> None:
+        self._graphs.clear(); self._previous.clear(); self._fp.clear(); self._views.clear()
+
+    def _view(self, room: Room) -> Room:
+        v = self._views.get(room.uid)
+        if v is None:
+            v = self.room_view(room)
+            if v is not room:
+                self._views[room.uid] = v
+        return v
+
+    def invalidate(self, rooms: Iterable[Room] = ()) -> Tuple[List[str], List[Room]]:
+        """``(domy, których graf odrzucono, pokoje ze zmienioną geometrią)``."""
+        dropped, reshaped = [], []
+        for r in rooms:
+            self._views.pop(r.uid, None)
+            fp = fingerprint(r)
+            if self._fp.get(r.uid) == fp:
+                continue
+            self._fp[r.uid] = fp; reshaped.append(r)
+            # nowy pokój nie należy do żadnego grafu — get() wykryje zmianę listy pokoi
+            for h in [h for h, g in self._graphs.items() if r.uid in g.uids]:
+                self._previous.setdefault(h, self._graphs.pop(h)); dropped.append(h)
+        return dropped, reshaped
+
+    def drop(self, house: str) -> bool:
+        g = self._graphs.pop(house, None)
+        if g is not None:
+            self._previous.setdefault(house, g)
+        return g is not None
+
+    def rename_house(self, old: str, new: str) -> None:
+        """Dom przemianowany — grafy pod nową nazwą, bez ponownego liczenia tras."""
+        for graphs in (self._graphs, self._previous):
+            if old in graphs:
+                graphs[new] = graphs.pop(old)
+
+    def forget(self, house: str) -> None:
+        """Dom usunięty z projektu."""
+        self._graphs.pop(house, None); self._previous.pop(house, None)
+
+    def get(self, house: House) -> HouseGraph:
+        g = self._graphs.get(house.name)
+        if g is None or g.uids != {r.uid for r in house.rooms}:
+            g = HouseGraph(house, self.routes, self.project, self._view)
+            self._graphs[house.name] = g
+            for r in house.rooms:
+                self._fp.setdefault(r.uid, fingerprint(self._view(r)))
+        return g
+
+    def rerouted(self, house: House) -> Set[str]:
+        """Zbuduj graf domu od nowa; uid pokoi, w których zmieniły się źródła (przejścia i ich odległości)."""
+        old = self._previous.pop(house.name, None)
+        new = self.get(house)
+        if old is None or old.board_uid != new.board_uid:
+            return set(new.uids)
+        return {uid for uid in new.uids if new._sources.get(uid) != old._sources.get(uid)}
+
+    def run(self, house: House, room: Room, el: Element) -> Optional[CableRun]:
+        return self.get(house).run(room, el)
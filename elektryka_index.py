@@ -0,0 +1,115 @@
+"""
+Indeks elementów całego projektu: ``(dom, pokój, id elementu) → element``.
+
+Linki między pokojami (``Link.b_room``) wskazują cel nazwą pokoju i id
+elementu; indeks rozwiązuje je w O(1) zamiast przeszukiwania pokoi domu
+i ich elementów. Mapa nazw oraz mapy elementów pokoi są budowane leniwie
+i unieważniane przez :meth:`ElementIndex.invalidate` (aplikacja woła je
+z ``_mark_dirty``), więc indeks nadąża za zmianą nazwy, usunięciem
+i wczytaniem projektu.
+
+Pokoje niewczytane (projekt katalogowy) są czytane przez ``room_view`` —
+funkcję zwracającą pokój do odczytu bez dołączania go do projektu.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from elektryka_controls import parse_ref
+from elektryka_model import Element, Link, Project, Room
+
+Key = Tuple[str, str]          # (dom, pokój)
+
+
+class ElementIndex:
+    def __init__(self, project: Project, room_view: Callable[[Room], Room] = lambda r: r):
+        self.project = project
+        self.room_view = room_view
+        self._rooms: Optional[Dict[Key, Room]] = None           # (dom, pokój) -> Room (pierwszy o tej nazwie)
+        self._house_of: Dict[str, str] = {}                     # room uid -> nazwa domu
+        self._elements: Dict[str, Dict[str, Element]] = {}      # room uid -> id -> Element
+        self._referrers: Optional[Dict[Key, List[Room]]] = None # pokoje z linkami do (dom, pokój)
+
+    # --- unieważnianie ---
+    def invalidate(self, rooms: Iterable[Room] = ()) -> None:
+        """Zmiana w projekcie: nazwy (zawsze) i elementy/linki wskazanych pokoi."""
+        self._rooms = None; self._referrers = None
+        for r in rooms:
+            self._elements.pop(r.uid, None)
+
+    def reset(self, project: Project) -> None:
+        self.project = project
+        self._rooms = None; self._elements.clear(); self._referrers = None
+
+    # --- odczyt ---
+    def _names(self) -> Dict[Key, Room]:
+        if self._rooms is None:
+            self._rooms = {}; self._house_of = {}
+            for h in self.project.houses:
+                for r in h.rooms:
+                    self._rooms.setdefault((h.name, r.name), r)
+                    self._house_of[r.uid] = h.name
+        return self._rooms
+
+    def room(self, house: str, room: str) -> Optional[Room]:
+        return self._names().get((house, room))
+
+    def house_of(self, room: Room) -> Optional[str]:
+        self._names()
+        return self._house_of.get(room.uid)
+
+    def elements(self, room: Room) -> Dict[str, Element]:
+        m = self._elements.get(room.uid)
+        if m is None:
+            m = {e.id: e for e in self.room_view(room).elements}
+            self._elements[room.uid] = m
+        return m
+
+    def get(self, house: str, room: str, element_id: str) -> Optional[Element]:
+        r = self.room(house, room)
+        return self.elements(r).get(element_id) if r is not None else None
+
+    def resolve(self, house: str, src: Room, link: Link) -> Optional[Element]:
+        """Cel linku (lokalny albo w innym pokoju tego samego domu)."""
+        if link.b_room and link.b_room != src.name:
+            return self.get(house, link.b_room, link.b_id)
+        return self.elements(src).get(link.b_id)
+
+    def directory(self, house: str) -> Dict[Tuple[str, str], str]:
+        """``(pokój, id elementu) → etykieta`` dla domu — cele linków dla eksportu (poza wątkiem Tk)."""
+        out: Dict[Tuple[str, str], str] = {}
+        for (h, rn), r in self._names().items():
+            if h == house:
+                for eid, e in self.elements(r).items():
+                    out[(rn, eid)] = e.label or eid
+        return out
+
+    def referrers(self, house: str, room: str) -> List[Room]:
+        """Pokoje domu, których linki, przejścia lub ``controls`` wskazują pokój ``room`` (np. do poprawy po zmianie nazwy)."""
+        if self._referrers is None:
+            self._referrers = {}
+            for h in self.project.houses:
+                for r in h.rooms:
+                    view = self.room_view(r)
+                    names = {l.b_room for l in view.links if l.b_room}
+                    names |= {s.portal_to_room for s in view.segments if s.portal_to_room}
+                    names |= {parse_ref(c, "")[0] for e in view.elements for c in e.controls} - {""}
+                    for n in names:
+                        self._referrers.setdefault((h.name, n), []).append(r)
+        return list(self._referrers.get((house, room), ()))
+
+    def dangling(self) -> List[Tuple[str, str, Link, str]]:
+        """Linki bez celu: ``(dom, pokój, link, powód)``."""
+        out = []
+        for h in self.project.houses:
+            for r in h.rooms:
+                local = self.elements(r)
+                for l in self.room_view(r).links:
+                    if l.a_id not in local:
+                        out.append((h.name, r.name, l, f"brak elementu źródłowego {l.a_id}"))
+                    elif l.b_room and l.b_room != r.name and self.room(h.name, l.b_room) is None:
+                        out.append((h.name, r.name, l, f"brak pokoju „{l.b_room}”"))
+                    elif self.resolve(h.name, r, l) is None:
+                        out.append((h.name, r.name, l, f"brak elementu {l.b_id}" + (f" w „{l.b_room}”" if l.b_room else "")))
+        return out
@@ -0,0 +1,266 @@
+"""
+Rejestr przewodów rozdzielnicy: wolne przewody i przypisania do obwodów.
+
+Każde połączenie ma stały identyfikator ``Connection.lead_id`` — nie zależy
+od pozycji połączenia na liście elementu, więc usunięcie połączenia nie
+przesuwa identyfikatorów pozostałych. Starsze projekty (identyfikatory
+``"<element>:<indeks>"`` liczone w locie) są naprawiane przy wczytaniu
+(:func:`build_registry`).
+
+Format zapisu bez zmian: ``distribution_board["free_leads"]`` (lista opisów)
+i ``Circuit.assigned_leads`` (lista identyfikatorów). :class:`LeadRegistry`
+trzyma słowniki/zbiory (operacje O(1) i odwrotny indeks przewód → obwód),
+a listy w projekcie odtwarza :meth:`LeadRegistry.flush` — tylko po zmianie.
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from elektryka_model import Connection, Element, Project, Room
+
+
+def new_lead_id(element_id: str) -> str:
+    return f"{element_id}:{uuid.uuid4().hex[:6]}"
+
+
+def lead_info(room: Room, el: Element, con: Connection) -> dict:
+    return {"lead_id": con.lead_id, "room": room.name, "room_uid": room.uid,
+            "element_id": el.id, "cable_type": con.cable_type}
+
+
+class LeadRegistry:
+    """Przewody rozdzielnicy wg stałych identyfikatorów."""
+
+    def __init__(self):
+        self._info: Dict[str, dict] = {}                  # lead_id -> opis (jak w free_leads)
+        self._free: Dict[str, None] = {}                  # uporządkowany zbiór wolnych
+        self._circuit_of: Dict[str, str] = {}             # lead_id -> id obwodu
+        self._by_circuit: Dict[str, Dict[str, None]] = {} # id obwodu -> uporządkowany zbiór
+        self._by_room: Dict[str, Set[str]] = {}           # room_uid -> lead_id
+        self.changed = False
+
+    # --- odczyt ---
+    def __contains__(self, lead_id: str) -> bool:
+        return lead_id in self._info
+
+    def __len__(self) -> int:
+        return len(self._info)
+
+    def info(self, lead_id: str) -> Optional[dict]:
+        return self._info.get(lead_id)
+
+    def free_leads(self) -> Iterator[dict]:
+        return (self._info[i] for i in self._free)
+
+    def is_free(self, lead_id: str) -> bool:
+        return lead_id in self._free
+
+    def circuit_of(self, lead_id: str) -> Optional[str]:
+        return self._circuit_of.get(lead_id)
+
+    def assigned(self, circuit_id: str) -> List[str]:
+        return list(self._by_circuit.get(circuit_id, ()))
+
+    # --- zmiany ---
+    def add(self, info: dict, circuit_id: Optional[str] = None) -> None:
+        """Nowy przewód (wolny albo od razu przypisany); istniejący — aktualizacja opisu."""
+        lid = info["lead_id"]
+        old = self._info.get(lid)
+        if old is not None and old.get("room_uid") != info.get("room_uid"):
+            self._by_room.get(old.get("room_uid"), set()).discard(lid)
+        self._info[lid] = dict(info)
+        if info.get("room_uid"):
+            self._by_room.setdefault(info["room_uid"], set()).add(lid)
+        if old is None:
+            if circuit_id: self._link(lid, circuit_id)
+            else: self._free[lid] = None
+        self.changed = True
+
+    def assign(self, lead_ids: Iterable[str], circuit_id: str) -> int:
+        n = 0
+        for lid in lead_ids:
+            if lid not in self._info or self._circuit_of.get(lid) == circuit_id:
+                continue
+            self._unlink(lid)
+            self._free.pop(lid, None)
+            self._link(lid, circuit_id); n += 1
+        self.changed |= bool(n)
+        return n
+
+    def unassign(self, lead_ids: Iterable[str]) -> int:
+        """Zwolnij przewody z obwodów (wracają na listę wolnych)."""
+        n = 0
+        for lid in lead_ids:
+            if lid in self._circuit_of:
+                self._unlink(lid); self._free[lid] = None; n += 1
+        self.changed |= bool(n)
+        return n
+
+    def remove(self, lead_id: str) -> None:
+        info = self._info.pop(lead_id, None)
+        if info is None:
+            return
+        self._free.pop(lead_id, None)
+        self._unlink(lead_id)
+        self._by_room.get(info.get("room_uid"), set()).discard(lead_id)
+        self.changed = True
+
+    def remove_rooms(self, room_uids: Iterable[str]) -> None:
+        for uid in room_uids:
+            for lid in list(self._by_room.pop(uid, ())):
+                self.remove(lid)
+
+    def rename_room(self, room_uid: str, name: str) -> None:
+        for lid in self._by_room.get(room_uid, ()):
+            self._info[lid]["room"] = name
+        self.changed = True
+
+    def rename_circuit(self, old: str, new: str) -> None:
+        if old == new or old not in self._by_circuit:
+            return
+        leads = self._by_circuit.pop(old)
+        self._by_circuit.setdefault(new, {}).update(leads)
+        for lid in leads:
+            self._circuit_of[lid] = new
+        self.changed = True
+
+    def drop_circuit(self, circuit_id: str) -> None:
+        """Usunięty obwód — jego przewody wracają na listę wolnych."""
+        self.unassign(list(self._by_circuit.get(circuit_id, ())))
+        self._by_circuit.pop(circuit_id, None)
+
+    def _link(self, lid: str, circuit_id: str) -> None:
+        self._circuit_of[lid] = circuit_id
+        self._by_circuit.setdefault(circuit_id, {})[lid] = None
+
+    def _unlink(self, lid: str) -> None:
+        cid = self._circuit_of.pop(lid, None)
+        if cid is not None:
+            self._by_circuit.get(cid, {}).pop(lid, None)
+
+    # --- zapis ---
+    def flush(self, project: Project) -> None:
+        """Odtwórz listy zapisywane w projekcie (po zmianach w rejestrze)."""
+        project.distribution_board["free_leads"] = [dict(self._info[i]) for i in self._free]
+        for c in project.circuits:
+            c.assigned_leads = list(self._by_circuit.get(c.id, ()))
+        self.changed = False
+
+    def adopt_room(self, room: Room) -> bool:
+        """Doczytany pokój (projekt katalogowy): nadaj brakujące identyfikatory, dopisz nieznane przewody.
+
+        Zwraca True, jeśli pokój został zmieniony.
+        """
+        changed = False
+        for el in room.elements:
+            for idx, con in enumerate(el.connections):
+                if not con.lead_id:
+                    legacy = f"{el.id}:{idx}"
+                    known = self._info.get(legacy)
+                    ok = known is not None and known.get("room_uid", room.uid) == room.uid \
+                        and known.get("room", room.name) == room.name
+                    con.lead_id = legacy if ok else new_lead_id(el.id); changed = True
+                if con.to_distribution or con.lead_id in self._info:
+                    self.add(lead_info(room, el, con), None)
+        return changed
+
+
+def _room_gone_or_loaded(uid: Optional[str], rooms: Dict[str, Room], loaded) -> bool:
+    if not uid:
+        return False
+    return uid not in rooms or loaded(rooms[uid])
+
+
+def build_registry(project: Project, loaded: Callable[[Room], bool] = lambda r: True) -> Tuple[LeadRegistry, List[str]]:
+    """Zbuduj rejestr z projektu, sprawdzając i naprawiając spójność.
+
+    Naprawy: brakujące/zdublowane ``lead_id`` połączeń, zdublowane wpisy
+    wolnych przewodów, przewód wolny i jednocześnie przypisany albo
+    przypisany do kilku obwodów, przypisania do nieistniejących obwodów,
+    przewody bez połączenia (po usuniętych pokojach i połączeniach) oraz
+    połączenia „do rozdzielnicy” bez przewodu. Przewody pokoi niewczytanych
+    (``loaded``) nie są sprawdzane względem połączeń. Zwraca
+    ``(rejestr, opisy napraw)``; po naprawach listy w projekcie są odtworzone.
+    """
+    notes: List[str] = []
+    board = project.distribution_board
+    board.setdefault("free_leads", [])
+    free_rooms = {(f.get("lead_id"), f.get("room")) for f in board["free_leads"]}
+    circuit_ids = {c.id for c in project.circuits}
+
+    # 1) połączenia: stałe, unikalne identyfikatory
+    conns: Dict[str, Tuple[Room, Element, Connection]] = {}
+    legacy: List[Tuple[bool, Room, Element, int, Connection]] = []
+    complete = True
+    rooms: Dict[str, Room] = {}
+    for h in project.houses:
+        for r in h.rooms:
+            rooms[r.uid] = r
+            if not loaded(r):
+                complete = False; continue
+            for el in r.elements:
+                for idx, con in enumerate(el.connections):
+                    if not con.lead_id:
+                        # stary identyfikator zostaje temu pokojowi, do którego odnosi się wpis rozdzielnicy
+                        legacy.append(((f"{el.id}:{idx}", r.name) not in free_rooms, r, el, idx, con))
+                    elif con.lead_id in conns:
+                        con.lead_id = new_lead_id(el.id)
+                        notes.append(f"{r.name}/{el.id}: zdublowany identyfikator przewodu — nadano nowy")
+                        conns[con.lead_id] = (r, el, con)
+                    else:
+                        conns[con.lead_id] = (r, el, con)
+    legacy.sort(key=lambda t: t[0])
+    for _, r, el, idx, con in legacy:
+        lid = f"{el.id}:{idx}"
+        con.lead_id = lid if lid not in conns else new_lead_id(el.id)
+        conns[con.lead_id] = (r, el, con)
+
+    # 2) przypisania do obwodów (pierwsze wygrywa)
+    reg = LeadRegistry()
+    for c in project.circuits:
+        seen: Set[str] = set()
+        for lid in c.assigned_leads:
+            if lid in seen:
+                continue
+            seen.add(lid)
+            if lid in reg:
+                notes.append(f"{lid}: przypisany do kilku obwodów — zostaje w {reg.circuit_of(lid)}"); continue
+            if complete and lid not in conns:
+                notes.append(f"{lid}: przewód obwodu {c.id} bez połączenia — usunięty"); continue
+            info = lead_info(*conns[lid]) if lid in conns else {"lead_id": lid}
+            reg.add(info, c.id)
+        if len(seen) != len(c.assigned_leads):
+            notes.append(f"{c.id}: zdublowane przypisania przewodów")
+
+    # 3) wolne przewody
+    for f in board["free_leads"]:
+        lid = f.get("lead_id")
+        if not lid:
+            notes.append("wpis wolnego przewodu bez identyfikatora — usunięty"); continue
+        if lid in reg:
+            if reg.is_free(lid) or reg.circuit_of(lid):
+                notes.append(f"{lid}: zdublowany wpis wolnego przewodu" if reg.is_free(lid)
+                             else f"{lid}: wolny i przypisany do {reg.circuit_of(lid)} — zostaje przypisany")
+            continue
+        if lid in conns:
+            reg.add(lead_info(*conns[lid]))
+        elif complete or _room_gone_or_loaded(f.get("room_uid"), rooms, loaded):
+            notes.append(f"{lid}: wolny przewód bez połączenia — usunięty")
+        else:
+            reg.add(f)
+
+    # 4) połączenia do rozdzielnicy bez przewodu
+    for lid, (r, el, con) in conns.items():
+        if lid in reg:
+            reg.add(lead_info(r, el, con))          # odśwież opis (pokój, kabel)
+        elif con.to_distribution:
+            reg.add(lead_info(r, el, con))
+            notes.append(f"{r.name}/{el.id}: połączenie do rozdzielnicy bez przewodu — dodano jako wolny")
+
+    for cid in [cid for cid in reg._by_circuit if cid not in circuit_ids]:
+        notes.append(f"obwód {cid} nie istnieje — jego przewody wracają do wolnych")
+        reg.drop_circuit(cid)
+    reg.flush(project)
+    return reg, notes
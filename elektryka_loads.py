@@ -0,0 +1,310 @@
+"""
+Obciążenia obwodów i spadki napięcia całego projektu.
+
+Dla każdego połączenia (przewodu elementu) liczony jest prąd odbiornika,
+spadek napięcia z rzeczywistego przekroju (``cable_type`` „3x2.5” → 2,5 mm²)
+i długości przewodu, a dla każdego obwodu — suma ``power_w``/``max_current_a``
+elementów, prąd i stosunek do zabezpieczenia (``Circuit.breaker``, np. „B16”)
+w odniesieniu do ``limits`` z ustawień.
+
+Pełne przeliczenie to jedna operacja na tablicach NumPy dla wszystkich
+połączeń naraz (bez NumPy — pętla w czystym Pythonie). Po zmianie pokoju
+:meth:`LoadEngine.update_rooms` porównuje odciski elementów i przelicza
+tylko zmienione: ich wiersze i wkład w sumy obwodów, więc kolorowanie na
+płótnie nie zależy od wielkości projektu.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from elektryka_model import Connection, Element, Project, Room
+from elektryka_settings import compiled
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+    np = None
+
+RHO_CU = 0.0175           # Ω·mm²/m
+U_1F = 230.0
+U_3F = 400.0
+PHASES_3F = ("L1", "L2", "L3")
+
+_SECTION_RE = re.compile(r"(\d+)\s*[x×X*]\s*(\d+(?:[.,]\d+)?)")
+_BREAKER_RE = re.compile(r"(\d+(?:[.,]\d+)?)")
+
+ElementKey = Tuple[str, str]          # (room uid, id elementu)
+
+
+def cross_section(cable_type: str) -> Optional[float]:
+    """Przekrój żyły [mm²] z opisu kabla: ``"3x2.5"`` → 2.5, ``"YDYp 3×1,5"`` → 1.5."""
+    m = _SECTION_RE.search(cable_type or "")
+    return float(m.group(2).replace(",", ".")) if m else None
+
+
+def breaker_current(breaker: str) -> Optional[float]:
+    """Prąd znamionowy zabezpieczenia: ``"B16"`` → 16.0; brak liczby → None."""
+    m = _BREAKER_RE.search(breaker or "")
+    return float(m.group(1).replace(",", ".")) if m else None
+
+
+def is_three_phase(con: Connection) -> bool:
+    return all(con.conductors.get(k) for k in PHASES_3F)
+
+
+def element_current(el: Element, three_phase: bool = False) -> float:
+    """Prąd odbiornika [A]: z mocy, a bez niej — ``max_current_a``."""
+    if el.power_w:
+        return el.power_w / (math.sqrt(3) * U_3F if three_phase else U_1F)
+    return el.max_current_a or 0.0
+
+
+def drop_coefficient(three_phase: bool, voltage: Optional[float] = None) -> float:
+    """ΔU% = współczynnik · L · I / S (1f: 2·ρ/U, 3f: √3·ρ/U, w procentach); ``voltage`` — inne niż U_1F/U_3F."""
+    u = voltage or (U_3F if three_phase else U_1F)
+    return 100.0 * (math.sqrt(3) if three_phase else 2.0) / u * RHO_CU
+
+
+def status_of(value: Optional[float], limit: float, warn_ratio: float) -> str:
+    if value is None or not limit:
+        return ""
+    return "error" if value > limit else ("warn" if value > limit * warn_ratio else "ok")
+
+
+@dataclass
+class ConnectionLoad:
+    room_uid: str
+    element_id: str
+    index: int
+    circuit_id: Optional[str]
+    current_a: float
+    length_m: Optional[float]
+    section_mm2: Optional[float]
+    drop_pct: Optional[float]
+    limit_pct: float
+    status: str
+
+
+@dataclass
+class CircuitLoad:
+    id: str
+    elements: int = 0
+    power_w: float = 0.0
+    max_current_a: float = 0.0
+    current_a: float = 0.0
+    breaker_a: Optional[float] = None
+    ratio: Optional[float] = None
+    worst_drop_pct: Optional[float] = None
+    status: str = ""
+
+
+class LoadEngine:
+    """Obciążenia projektu z przeliczaniem przyrostowym (patrz opis modułu).
+
+    ``circuit_of(lead_id)`` — obwód przewodu z rozdzielnicy (dla połączeń bez
+    ``circuit_id``); ``length_of(room, el, con)`` — długość przewodu [m] lub None.
+    """
+
+    def __init__(self, settings, circuit_of: Callable[[str], Optional[str]] = lambda lid: None,
+                 length_of: Optional[Callable[[Room, Element, Connection], Optional[float]]] = None):
+        self.cfg = compiled(settings)
+        self.circuit_of = circuit_of
+        self.length_of = length_of or (lambda room, el, con: con.length_m)
+        self.project: Optional[Project] = None
+        self._breakers: Dict[str, Optional[float]] = {}
+        self.room_view: Callable[[Room], Room] = lambda r: r
+        self._clear()
+
+    def _clear(self) -> None:
+        # kolumny wierszy (połączeń); wolne wiersze wracają do _free
+        self._key: List[Optional[Tuple[str, str, int]]] = []
+        self._cid: List[Optional[str]] = []
+        self._src: List[Optional[Tuple[Optional[str], str]]] = []   # (Connection.circuit_id, lead_id)
+        self._cur: List[float] = []
+        self._len: List[float] = []
+        self._sec: List[float] = []
+        self._coef: List[float] = []
+        self._lim: List[float] = []
+        self._drop: List[float] = []
+        self._free: List[int] = []
+        self._rows: Dict[ElementKey, List[int]] = {}
+        self._sig: Dict[ElementKey, tuple] = {}
+        self._contrib: Dict[ElementKey, Tuple[Tuple[str, ...], float, float, float]] = {}
+        self._room_elements: Dict[str, Set[str]] = {}
+        self._sums: Dict[str, List[float]] = {}             # id obwodu -> [elementy, moc, max prąd, prąd]
+        self._circ_rows: Dict[str, Set[int]] = {}
+
+    # --- budowa ---
+    def rebuild(self, project: Project, room_view: Optional[Callable[[Room], Room]] = None, settings=None) -> None:
+        """Pełne przeliczenie (wczytanie projektu, zmiana obwodów/rozdzielnicy lub ustawień)."""
+        if settings is not None:
+            self.cfg = compiled(settings)
+        self.project = project
+        self._breakers = {c.id: breaker_current(c.breaker) for c in project.circuits}
+        if room_view is not None:
+            self.room_view = room_view
+        self._clear()
+        for h in project.houses:
+            for r in h.rooms:
+                view = self.room_view(r)
+                self._room_elements[r.uid] = set()
+                for el in view.elements:
+                    self._add_element(r.uid, view, el, compute=False)
+        self._compute_all()
+
+    def update_rooms(self, rooms: Iterable[Room], force: bool = False) -> int:
+        """Przelicz tylko zmienione elementy wskazanych pokoi (``force`` — wszystkie, np. po zmianie tras); zwraca liczbę przeliczonych."""
+        n = 0
+        for r in rooms:
+            view = self.room_view(r)
+            seen = set()
+            for el in view.elements:
+                key = (r.uid, el.id); seen.add(el.id)
+                if force or self._sig.get(key) != self._signature(el):
+                    self._remove_element(key); self._add_element(r.uid, view, el); n += 1
+            for eid in self._room_elements.get(r.uid, set()) - seen:
+                self._remove_element((r.uid, eid)); n += 1
+            self._room_elements[r.uid] = seen
+        return n
+
+    def remove_rooms(self, room_uids: Iterable[str]) -> None:
+        for uid in room_uids:
+            for eid in self._room_elements.pop(uid, ()):
+                self._remove_element((uid, eid))
+
+    def refresh_circuits(self) -> None:
+        """Zmiana obwodów lub przypisań przewodów w rozdzielnicy — bez ponownego czytania pokoi."""
+        if self.project is not None:
+            self._breakers = {c.id: breaker_current(c.breaker) for c in self.project.circuits}
+        self._sums.clear(); self._circ_rows.clear()
+        for key, rows in self._rows.items():
+            cids = []
+            for i in rows:
+                own, lead = self._src[i]
+                cid = self._cid[i] = own or self.circuit_of(lead)
+                if cid:
+                    self._circ_rows.setdefault(cid, set()).add(i)
+                    if cid not in cids: cids.append(cid)
+            _, p, a, cur = self._contrib[key]
+            self._contrib[key] = (tuple(cids), p, a, cur)
+            self._apply(self._contrib[key], +1)
+
+    @staticmethod
+    def _signature(el: Element) -> tuple:
+        # położenie: długość przewodu może wynikać z trasy (length_of)
+        return (el.type, el.x, el.y, el.power_w, el.max_current_a,
+                tuple((c.cable_type, c.circuit_id, c.lead_id, c.length_m, c.to_distribution, tuple(sorted(c.conductors.items())))
+                      for c in el.connections))
+
+    def _alloc(self) -> int:
+        if self._free:
+            return self._free.pop()
+        for col in (self._key, self._cid, self._src, self._cur, self._len, self._sec, self._coef, self._lim, self._drop):
+            col.append(None)
+        return len(self._key) - 1
+
+    def _add_element(self, room_uid: str, room: Room, el: Element, compute: bool = True) -> None:
+        key = (room_uid, el.id)
+        self._remove_element(key)              # zdublowany id w pokoju — liczony raz
+        self._room_elements.setdefault(room_uid, set()).add(el.id)
+        lim = self.cfg.limit("voltage_drop_lighting" if el.type.startswith("lampa") else "voltage_drop_general", 5.0)
+        three = any(is_three_phase(c) for c in el.connections)
+        current = element_current(el, three)
+        rows, cids = [], []
+        for idx, con in enumerate(el.connections):
+            i = self._alloc(); rows.append(i)
+            cid = con.circuit_id or self.circuit_of(con.lead_id)
+            length, sec = self.length_of(room, el, con), cross_section(con.cable_type)
+            self._key[i] = (room_uid, el.id, idx); self._cid[i] = cid; self._src[i] = (con.circuit_id, con.lead_id)
+            self._cur[i] = current
+            self._len[i] = length if length is not None else math.nan
+            self._sec[i] = sec or math.nan
+            self._coef[i] = drop_coefficient(is_three_phase(con)); self._lim[i] = lim
+            self._drop[i] = self._coef[i] * self._len[i] * current / self._sec[i] if compute else math.nan
+            if cid:
+                self._circ_rows.setdefault(cid, set()).add(i)
+                if cid not in cids: cids.append(cid)
+        self._rows[key] = rows
+        self._sig[key] = self._signature(el)
+        contrib = (tuple(cids), el.power_w or 0.0, el.max_current_a or 0.0, current)
+        self._contrib[key] = contrib
+        self._apply(contrib, +1)
+
+    def _remove_element(self, key: ElementKey) -> None:
+        for i in self._rows.pop(key, ()):
+            if self._cid[i]: self._circ_rows.get(self._cid[i], set()).discard(i)
+            self._key[i] = self._cid[i] = self._src[i] = None
+            self._free.append(i)
+        self._sig.pop(key, None)
+        contrib = self._contrib.pop(key, None)
+        if contrib: self._apply(contrib, -1)
+
+    def _apply(self, contrib, sign: int) -> None:
+        cids, p, a, cur = contrib
+        for cid in cids:
+            s = self._sums.setdefault(cid, [0, 0.0, 0.0, 0.0])
+            s[0] += sign; s[1] += sign * p; s[2] += sign * a; s[3] += sign * cur
+
+    def _compute_all(self) -> None:
+        """Spadki napięcia wszystkich połączeń naraz (NaN: brak długości lub przekroju)."""
+        if not self._key:
+            return
+        if NUMPY_AVAILABLE:
+            cur, length, sec, coef = (np.asarray(c, dtype=float) for c in (self._cur, self._len, self._sec, self._coef))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self._drop = (coef * length * cur / sec).tolist()
+        else:
+            self._drop = [c * l * i / s if s == s else math.nan
+                          for c, l, i, s in zip(self._coef, self._len, self._cur, self._sec)]
+
+    # --- wyniki ---
+    def connection(self, room_uid: str, element_id: str, index: int) -> Optional[ConnectionLoad]:
+        rows = self._rows.get((room_uid, element_id))
+        if not rows or index >= len(rows):
+            return None
+        i = rows[index]
+        drop = self._drop[i] if self._drop[i] == self._drop[i] else None
+        return ConnectionLoad(room_uid, element_id, index, self._cid[i], self._cur[i],
+                              None if math.isnan(self._len[i]) else self._len[i],
+                              None if math.isnan(self._sec[i]) else self._sec[i],
+                              drop, self._lim[i], status_of(drop, self._lim[i], self.cfg.limit("load_warning", 0.8)))
+
+    def element_status(self, room_uid: str, element_id: str) -> str:
+        """Najgorszy stan połączeń elementu i obciążenia jego obwodów: ``""``/``ok``/``warn``/``error``."""
+        order = {"": 0, "ok": 1, "warn": 2, "error": 3}
+        worst = ""
+        warn = self.cfg.limit("load_warning", 0.8)
+        for i in self._rows.get((room_uid, element_id), ()):
+            d = self._drop[i]
+            st = status_of(d if d == d else None, self._lim[i], warn)
+            if self._cid[i]:
+                st = max(st, self._load_status(self._cid[i])[1], key=order.get)
+            worst = max(worst, st, key=order.get)
+        return worst
+
+    def _load_status(self, circuit_id: str) -> Tuple[Optional[float], str]:
+        """``(prąd / prąd zabezpieczenia, stan)`` — O(1), bez przeglądania połączeń obwodu."""
+        In = self._breakers.get(circuit_id)
+        if not In:
+            return None, ""
+        ratio = self._sums.get(circuit_id, (0, 0.0, 0.0, 0.0))[3] / In
+        err, warn = self.cfg.limit("load_error", 1.0), self.cfg.limit("load_warning", 0.8)
+        return ratio, "error" if ratio >= err else ("warn" if ratio >= warn else "ok")
+
+    def circuit(self, circuit_id: str) -> CircuitLoad:
+        s = self._sums.get(circuit_id, [0, 0.0, 0.0, 0.0])
+        out = CircuitLoad(circuit_id, int(s[0]), s[1], s[2], s[3])
+        out.breaker_a = self._breakers.get(circuit_id)
+        out.ratio, out.status = self._load_status(circuit_id)
+        drops = [self._drop[i] for i in self._circ_rows.get(circuit_id, ()) if self._drop[i] == self._drop[i]]
+        out.worst_drop_pct = max(drops) if drops else None
+        return out
+
+    def circuits(self) -> Dict[str, CircuitLoad]:
+        return {c.id: self.circuit(c.id) for c in (self.project.circuits if self.project else ())}
@@ -0,0 +1,154 @@
+"""
+Model danych projektu Elektryka (dom → pokoje → elementy) oraz jego
+serializacja do słowników JSON.
+
+Moduł nie zależy od Tkintera — korzystają z niego aplikacja `elektryka.py`
+oraz zapis w tle (autozapis).
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Tuple
+
+
+def new_room_uid() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+# ================== DANE ==================
+@dataclass
+class Connection:
+    cable_type: str
+    conductors: Dict[str, bool]
+    to_distribution: bool = True
+    note: str = ""
+    circuit_id: Optional[str] = None
+    lead_id: str = ""      # stały identyfikator przewodu w rozdzielnicy (patrz elektryka_leads)
+    length_m: Optional[float] = None   # długość przewodu (spadek napięcia, patrz elektryka_loads)
+
+@dataclass
+class Element:
+    id: str
+    type: str
+    x: int
+    y: int
+    label: str = ""
+    variant: str = ""
+    power_w: Optional[float] = None
+    chain_prev: Optional[str] = None
+    controls: List[str] = field(default_factory=list)
+    connections: List[Connection] = field(default_factory=list)
+    max_current_a: Optional[float] = None
+
+# --- układ pokoju (origami) ---
+@dataclass
+class Segment:
+    kind: str              # "SCIANA" | "OKNO" | "DRZWI" | "PRZEJSCIE"
+    a: Tuple[int,int]      # (x1,y1)
+    b: Tuple[int,int]      # (x2,y2)
+    label: str = ""        # np. N/E/S/W
+    portal_to_room: Optional[str] = None   # jeśli PRZEJSCIE łączy inny pokój
+    portal_side: Optional[str] = None      # "N"|"E"|"S"|"W"
+
+@dataclass
+class Link:
+    a_id: str              # element id źródło
+    b_id: str              # element id cel
+    circuit_id: Optional[str] = None
+    note: str = ""
+    b_room: Optional[str] = None           # jeśli cel w innym pokoju
+
+@dataclass
+class Room:
+    name: str
+    background_image: str = ""
+    elements: List[Element] = field(default_factory=list)
+    segments: List[Segment] = field(default_factory=list)
+    links: List[Link] = field(default_factory=list)
+    # stały identyfikator pokoju (nazwy mogą się powtarzać i zmieniać)
+    uid: str = field(default_factory=new_room_uid, compare=False)
+
+@dataclass
+class House:
+    name: str
+    rooms: List[Room] = field(default_factory=list)
+
+@dataclass
+class Circuit:
+    id: str
+    name: str
+    color: str = "czarny"
+    breaker: str = ""
+    desc: str = ""
+    assigned_leads: List[str] = field(default_factory=list)
+    phase: str = ""                # L1/L2/L3, "3F" (trójfazowy) albo "" (nieprzypisany)
+    phase_pinned: bool = False     # rozkład faz nie zmienia przypisania
+
+@dataclass
+class Project:
+    version: str = "0.7.2-pre"
+    houses: List[House] = field(default_factory=list)
+    circuits: List[Circuit] = field(default_factory=list)
+    distribution_board: dict = field(default_factory=lambda: {"free_leads": []})
+    meta: dict = field(default_factory=dict)
+
+
+# ================== SERIALIZACJA ==================
+def element_to_dict(e: Element) -> dict:
+    return {
+        "id": e.id, "type": e.type, "x": e.x, "y": e.y, "label": e.label,
+        "variant": e.variant, "power_w": e.power_w, "chain_prev": e.chain_prev,
+        "controls": list(e.controls), "max_current_a": e.max_current_a,
+        "connections": [asdict(c) for c in e.connections]
+    }
+
+def room_to_dict(r: Room) -> dict:
+    """Pełna (głęboka) kopia pokoju — bezpieczna do zapisu poza wątkiem Tk."""
+    return {
+        "name": r.name,
+        "uid": r.uid,
+        "background_image": r.background_image,
+        "elements": [element_to_dict(e) for e in r.elements],
+        "segments": [asdict(s) for s in r.segments],
+        "links": [asdict(l) for l in r.links],
+    }
+
+def project_to_dict(p: Project) -> dict:
+    return {
+        "version": p.version,
+        "houses": [{"name": h.name, "rooms": [room_to_dict(r) for r in h.rooms]} for h in p.houses],
+        "circuits": [asdict(c) for c in p.circuits],
+        "distribution_board": p.distribution_board,
+        "meta": p.meta
+    }
+
+def element_from_dict(e: dict) -> Element:
+    conns = [Connection(**c) for c in e.get("connections", [])]
+    return Element(
+        id=e.get("id",""), type=e.get("type",""), x=e.get("x",0), y=e.get("y",0),
+        label=e.get("label",""), variant=e.get("variant",""),
+        power_w=e.get("power_w", None), chain_prev=e.get("chain_prev", None),
+        controls=e.get("controls", []), connections=conns, max_current_a=e.get("max_current_a", None)
+    )
+
+def room_from_dict(r: dict) -> Room:
+    return Room(
+        name=r.get("name",""), background_image=r.get("background_image",""),
+        elements=[element_from_dict(e) for e in r.get("elements", [])],
+        segments=[Segment(**s) for s in r.get("segments", [])],
+        links=[Link(**l) for l in r.get("links", [])],
+        uid=r.get("uid") or new_room_uid()
+    )
+
+def project_from_dict(data: dict) -> Project:
+    houses = [House(name=h.get("name",""), rooms=[room_from_dict(r) for r in h.get("rooms", [])])
+              for h in data.get("houses", [])]
+    return Project(
+        version=data.get("version","0.7.0"),
+        houses=houses,
+        circuits=[Circuit(**c) for c in data.get("circuits", [])],
+        distribution_board=data.get("distribution_board", {"free_leads": []}),
+        meta=data.get("meta", {})
+    )
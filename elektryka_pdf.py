@@ -0,0 +1,152 @@
+"""
+Minimalny zapis PDF bez zewnętrznych bibliotek.
+
+:class:`PdfWriter` dopisuje strony strumieniowo (każda strona trafia do pliku
+od razu), więc wielostronicowy eksport nie trzyma wszystkich stron w pamięci.
+Strona rastrowa to gotowy JPEG osadzony bez ponownego kodowania (DCTDecode);
+strona wektorowa to strumień operatorów PDF z fontem Helvetica (z polskimi
+znakami) i opcjonalnymi obrazami osadzonymi raz na dokument.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import BinaryIO, Dict, List, Optional
+
+# Znaki spoza ASCII dostępne w fontach standardowych — kody 128+ (kodowanie /Differences)
+_EXTRA_GLYPHS = [
+    ("ą", "aogonek"), ("ć", "cacute"), ("ę", "eogonek"), ("ł", "lslash"), ("ń", "nacute"),
+    ("ó", "oacute"), ("ś", "sacute"), ("ź", "zacute"), ("ż", "zdotaccent"),
+    ("Ą", "Aogonek"), ("Ć", "Cacute"), ("Ę", "Eogonek"), ("Ł", "Lslash"), ("Ń", "Nacute"),
+    ("Ó", "Oacute"), ("Ś", "Sacute"), ("Ź", "Zacute"), ("Ż", "Zdotaccent"),
+    ("²", "twosuperior"), ("°", "degree"), ("×", "multiply"), ("–", "endash"),
+]
+_CHAR_CODES = {ch: 128 + i for i, (ch, _) in enumerate(_EXTRA_GLYPHS)}
+_SUBST = {"→": "->", "≈": "~", "—": "-"}
+
+
+def pdf_text(text: str) -> bytes:
+    """Napis jako literał PDF ``( ... )`` w kodowaniu fontu :meth:`PdfWriter.font`."""
+    out = bytearray(b"(")
+    for ch in text:
+        ch = _SUBST.get(ch, ch)
+        for c in ch:
+            if c in "()\\":
+                out += b"\\" + c.encode("ascii")
+            elif " " <= c <= "~":
+                out += c.encode("ascii")
+            elif c in _CHAR_CODES:
+                out += b"\\%03o" % _CHAR_CODES[c]
+            else:
+                out += b"?"
+    out += b")"
+    return bytes(out)
+
+
+def jpeg_info(data: bytes) -> Optional[tuple]:
+    """``(szer., wys., liczba składowych)`` z nagłówka SOF pliku JPEG, bez dekodowania."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1; continue
+        marker = data[i+1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2; continue
+        length = int.from_bytes(data[i+2:i+4], "big")
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h = int.from_bytes(data[i+5:i+7], "big"); w = int.from_bytes(data[i+7:i+9], "big")
+            return w, h, data[i+9]
+        i += 2 + length
+    return None
+
+
+class PdfWriter:
+    def __init__(self, path: str):
+        self._f: BinaryIO = open(path, "wb")
+        self._offsets = {}
+        self._next = 3              # 1 = Catalog, 2 = Pages
+        self._pages: List[int] = []
+        self._font: Optional[int] = None
+        self._f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _obj(self, num: int, body: bytes, stream: bytes = None) -> None:
+        self._offsets[num] = self._f.tell()
+        self._f.write(b"%d 0 obj\n" % num)
+        self._f.write(body)
+        if stream is not None:
+            self._f.write(b"\nstream\n")
+            self._f.write(stream)
+            self._f.write(b"\nendstream")
+        self._f.write(b"\nendobj\n")
+
+    def _alloc(self, n: int = 1) -> range:
+        first = self._next
+        self._next += n
+        return range(first, first + n)
+
+    def add_jpeg(self, jpeg: bytes, width: int, height: int, components: int = 3) -> int:
+        """Osadź JPEG bez dekodowania; zwraca numer obiektu (do wielokrotnego użycia na stronach)."""
+        (num,) = self._alloc()
+        space = {1: b"/DeviceGray", 4: b"/DeviceCMYK"}.get(components, b"/DeviceRGB")
+        self._obj(num, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s "
+                       b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>" % (width, height, space, len(jpeg)), jpeg)
+        return num
+
+    def add_rgb(self, raw: bytes, width: int, height: int) -> int:
+        """Osadź surowe piksele RGB (kompresja Flate)."""
+        (num,) = self._alloc()
+        data = zlib.compress(raw, 6)
+        self._obj(num, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                       b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>" % (width, height, len(data)), data)
+        return num
+
+    def font(self) -> int:
+        """Helvetica z polskimi znakami (patrz :func:`pdf_text`) — zasób /F1."""
+        if self._font is None:
+            (enc, self._font) = self._alloc(2)
+            diffs = b" ".join(b"/" + name.encode("ascii") for _, name in _EXTRA_GLYPHS)
+            self._obj(enc, b"<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [128 %s] >>" % diffs)
+            self._obj(self._font, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding %d 0 R >>" % enc)
+        return self._font
+
+    def add_page(self, width: int, height: int, content: bytes, images: Dict[str, int] = None, text: bool = False) -> None:
+        """Strona z gotowym strumieniem operatorów; ``images`` — nazwa zasobu → numer obiektu."""
+        cnum, page = self._alloc(2)
+        data = zlib.compress(content, 6)
+        self._obj(cnum, b"<< /Length %d /Filter /FlateDecode >>" % len(data), data)
+        res = b""
+        if images:
+            res += b"/XObject << %s >> " % b" ".join(b"/%s %d 0 R" % (k.encode("ascii"), v) for k, v in images.items())
+        if text:
+            res += b"/Font << /F1 %d 0 R >> " % self.font()
+        self._obj(page, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << %s>> /Contents %d 0 R >>"
+                        % (width, height, res, cnum))
+        self._pages.append(page)
+
+    def add_jpeg_page(self, jpeg: bytes, width: int, height: int) -> None:
+        """Strona rastrowa o rozmiarze obrazu (1 px = 1 pt, jak w eksporcie Pillow)."""
+        img = self.add_jpeg(jpeg, width, height)
+        self.add_page(width, height, b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (width, height), {"Im0": img})
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % p for p in self._pages)
+        self._obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self._f.tell()
+        self._f.write(b"xref\n0 %d\n" % self._next)
+        self._f.write(b"0000000000 65535 f \n")
+        for num in range(1, self._next):
+            self._f.write(b"%010d 00000 n \n" % self._offsets.get(num, 0))
+        self._f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self._next, xref))
+        self._f.close()
+
+    def __enter__(self) -> "PdfWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
@@ -0,0 +1,156 @@
+"""
+Rozkład obwodów jednofazowych na fazy L1/L2/L3 — jak najmniejsza asymetria.
+
+Obwody przypięte (``Circuit.phase_pinned``) zostają na swojej fazie,
+obwody trójfazowe obciążają wszystkie trzy fazy i też się nie ruszają.
+Pozostałe przydziela najpierw zachłanny LPT (od największego obciążenia,
+zawsze na najmniej obciążoną fazę), a potem poprawia przeszukiwanie
+lokalne: przeniesienie obwodu albo zamiana dwóch obwodów między parą faz,
+najlepsza z kandydatów znalezionych ``bisect`` w posortowanych listach
+obciążeń — kryterium to (max − min, max) obciążeń faz. Setki obwodów to
+ułamek sekundy.
+
+Obciążenie obwodu to dowolna wielkość na fazę — prąd z
+:class:`elektryka_loads.LoadEngine` albo moc ``load_va`` z :mod:`app.models`.
+"""
+
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from elektryka_loads import PHASES_3F, is_three_phase
+from elektryka_model import Project, Room
+
+PHASES = PHASES_3F
+THREE_PHASE = "3F"
+EPS = 1e-9
+
+
+@dataclass
+class CircuitPhase:
+    id: str
+    load: float                          # na fazę (obwód 3f — na każdą)
+    phase: str = ""                      # obecne przypisanie: L1/L2/L3, 3F albo ""
+    pinned: bool = False
+    three_phase: bool = False
+
+
+@dataclass
+class PhasePlan:
+    assignment: Dict[str, str] = field(default_factory=dict)    # id obwodu -> L1/L2/L3/3F
+    loads: Dict[str, float] = field(default_factory=dict)       # faza -> suma
+    moved: List[str] = field(default_factory=list)              # obwody ze zmienioną fazą
+    greedy_imbalance: float = 0.0
+
+    @property
+    def imbalance(self) -> float:
+        return max(self.loads.values()) - min(self.loads.values()) if self.loads else 0.0
+
+    @property
+    def imbalance_pct(self) -> float:
+        """Asymetria względem najbardziej obciążonej fazy [%]."""
+        top = max(self.loads.values(), default=0.0)
+        return 100.0 * self.imbalance / top if top > 0 else 0.0
+
+
+def phase_loads(items: Iterable[CircuitPhase]) -> Dict[str, float]:
+    """Obciążenie faz z obecnych przypisań (obwody bez fazy są pomijane)."""
+    out = {p: 0.0 for p in PHASES}
+    for c in items:
+        if c.three_phase or c.phase == THREE_PHASE:
+            for p in PHASES: out[p] += c.load
+        elif c.phase in out:
+            out[c.phase] += c.load
+    return out
+
+
+def _objective(loads: Dict[str, float]) -> Tuple[float, float]:
+    top = max(loads.values())
+    return top - min(loads.values()), top
+
+
+def balance_phases(items: Iterable[CircuitPhase], max_rounds: Optional[int] = None) -> PhasePlan:
+    """Przydział faz (patrz opis modułu); obwody przypięte bez fazy traktowane są jak wolne."""
+    items = list(items)
+    plan = PhasePlan()
+    loads = {p: 0.0 for p in PHASES}
+    free: List[CircuitPhase] = []
+    for c in items:
+        if c.three_phase or c.phase == THREE_PHASE:
+            plan.assignment[c.id] = THREE_PHASE
+            for p in PHASES: loads[p] += c.load
+        elif c.pinned and c.phase in loads:
+            plan.assignment[c.id] = c.phase; loads[c.phase] += c.load
+        else:
+            free.append(c)
+    # zachłannie: największe najpierw; remis faz — obecna faza obwodu, potem kolejność L1, L2, L3
+    on: Dict[str, List[Tuple[float, str]]] = {p: [] for p in PHASES}
+    for c in sorted(free, key=lambda c: (-c.load, c.id)):
+        p = min(PHASES, key=lambda p: (loads[p], p != c.phase, p))
+        plan.assignment[c.id] = p; loads[p] += c.load
+        bisect.insort(on[p], (c.load, c.id))
+    plan.greedy_imbalance = _objective(loads)[0]
+    rounds = max_rounds if max_rounds is not None else 20 * len(free) + 10
+    for _ in range(rounds):
+        step = _best_step(loads, on)
+        if step is None:
+            break
+        p, q, x, y = step                # x: p -> q, y (opcjonalnie): q -> p
+        on[p].remove(x); bisect.insort(on[q], x); plan.assignment[x[1]] = q
+        loads[p] -= x[0]; loads[q] += x[0]
+        if y is not None:
+            on[q].remove(y); bisect.insort(on[p], y); plan.assignment[y[1]] = p
+            loads[q] -= y[0]; loads[p] += y[0]
+    plan.loads = loads
+    plan.moved = [c.id for c in items if plan.assignment.get(c.id) != c.phase]
+    return plan
+
+
+def _best_step(loads: Dict[str, float], on: Dict[str, List[Tuple[float, str]]]):
+    """Najlepsze poprawiające przeniesienie lub zamianę między parą faz albo None."""
+    best, best_obj = None, _objective(loads)
+    best_obj = (best_obj[0] - EPS, best_obj[1])
+    for p in PHASES:
+        for q in PHASES:
+            gap = loads[p] - loads[q]
+            if gap <= EPS:
+                continue
+            # przeniesienie: obciążenie jak najbliższe gap/2 (i mniejsze niż gap)
+            xs = on[p]
+            k = bisect.bisect_left(xs, (gap / 2.0, ""))
+            cands = [(xs[i], None) for i in (k - 1, k) if 0 <= i < len(xs) and xs[i][0] < gap]
+            # zamiana: x z p na y z q, różnica x − y jak najbliższa gap/2
+            ys = on[q]
+            if ys:
+                for x in xs:
+                    k = bisect.bisect_left(ys, (x[0] - gap / 2.0, ""))
+                    cands += [(x, ys[i]) for i in (k - 1, k) if 0 <= i < len(ys) and 0 < x[0] - ys[i][0] < gap]
+            for x, y in cands:
+                d = x[0] - (y[0] if y is not None else 0.0)
+                trial = dict(loads); trial[p] -= d; trial[q] += d
+                obj = _objective(trial)
+                if obj < best_obj:
+                    best, best_obj = (p, q, x, y), obj
+    return best
+
+
+def three_phase_circuits(project: Project, circuit_of: Callable[[str], Optional[str]] = lambda lead_id: None,
+                         room_view: Callable[[Room], Room] = lambda r: r) -> Set[str]:
+    """Obwody z przewodem pięciożyłowym (L1, L2 i L3 w połączeniu) — obciążają wszystkie fazy."""
+    out: Set[str] = set()
+    for h in project.houses:
+        for r in h.rooms:
+            for el in room_view(r).elements:
+                for con in el.connections:
+                    if is_three_phase(con):
+                        cid = con.circuit_id or circuit_of(con.lead_id)
+                        if cid: out.add(cid)
+    return out
+
+
+def format_loads(loads: Dict[str, float], unit: str = "A") -> str:
+    top = max(loads.values(), default=0.0)
+    asym = 100.0 * (top - min(loads.values(), default=0.0)) / top if top > 0 else 0.0
+    return "  ".join(f"{p} {loads.get(p, 0.0):.1f} {unit}" for p in PHASES) + f"  (asymetria {asym:.0f}%)"
@@ -0,0 +1,393 @@
+"""
+Dobowy profil obciążenia instalacji — symulacja Monte Carlo do doboru
+zabezpieczenia głównego (moduł ``MAIN`` rozdzielnicy) i mocy przyłączeniowej.
+
+Każdy typ elementu ma profil: moc typowego odbiornika, średni czas
+jednego włączenia (``on_min``) i dla każdej godziny doby udział czasu, przez
+jaki odbiornik jest włączony (``hours``, 24 liczby 0…1 albo jedna na całą
+dobę). Profile domyślne obejmują typy z ``element_types`` ustawień i typy
+z ``elektryk_icons.ICON_MAP`` (Pompa, Bufor, Czujnik…); ``element_types.<typ>.profile``
+w ``settings.json`` nadpisuje dowolne pola. Moc elementu z projektu
+(``power_w``) ma pierwszeństwo przed mocą z profilu.
+
+Elementy tego samego typu, mocy i obwodu tworzą grupę. Włączenia grupy to
+proces Poissona o intensywności ``n·udział/on_min`` na minutę, każde trwa
+czas wykładniczy o średniej ``on_min`` — średnio włączonych jest więc
+``n·udział`` odbiorników, a jednocześnie nigdy więcej niż ``n``. Doba ma
+rozdzielczość minuty; z NumPy wszystkie zdarzenia paczki dni wpisywane są
+naraz do tablicy różnicowej (``np.add.at`` + ``cumsum``), obwód po
+obwodzie, więc 1000 dób to kilka sekund i kilka MB pamięci. Bez NumPy obwód
+liczony jest tylko w minutach zmian obciążenia, a minuta po minucie jedynie
+suma instalacji — czas rośnie z liczbą włączeń (ok. 8 s na 1000 dób przy
+200 grupach), dlatego do tej funkcji NumPy jest zalecany. Wynik: szczyt,
+percentyle szczytu dobowego i energia — dla obwodów i całej instalacji.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import random
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from elektryka_loads import U_1F, U_3F
+from elektryka_model import Project, Room
+from elektryka_render import check_cancel
+from elektryka_settings import section
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+    np = None
+
+MINUTES = 24 * 60
+DAYS = 1000
+BATCH_DAYS = 100
+PERCENTILES = (50.0, 95.0, 99.0)
+MAIN_RATINGS = (16, 20, 25, 32, 40, 50, 63, 80, 100, 125)
+
+
+def _hours(night: float, morning: float, day: float, evening: float) -> List[float]:
+    """Doba z czterech pór: 0–5 i 23 noc, 6–8 rano, 9–16 dzień, 17–22 wieczór."""
+    return [night] * 6 + [morning] * 3 + [day] * 8 + [evening] * 6 + [night]
+
+
+# typ (małe litery, bez polskich znaków) -> profil; typy spoza tablicy — bez poboru mocy
+DEFAULT_PROFILES: Dict[str, dict] = {
+    "gniazdko": {"power_w": 400.0, "on_min": 30.0, "hours": _hours(0.02, 0.12, 0.06, 0.15)},
+    "lampa": {"power_w": 40.0, "on_min": 45.0, "hours": _hours(0.02, 0.30, 0.05, 0.60)},
+    "roleta": {"power_w": 150.0, "on_min": 1.0, "hours": _hours(0.0, 0.02, 0.0, 0.02)},
+    "wylacznik": {"power_w": 0.0, "on_min": 1.0, "hours": 0.0},
+    "rozdzielnica": {"power_w": 0.0, "on_min": 1.0, "hours": 0.0},
+    # typy z elektryk_icons.ICON_MAP
+    "czujnik": {"power_w": 2.0, "on_min": 60.0, "hours": 1.0},
+    "wlacznik": {"power_w": 0.0, "on_min": 1.0, "hours": 0.0},
+    "pompa": {"power_w": 1500.0, "on_min": 20.0, "hours": _hours(0.15, 0.35, 0.20, 0.35)},
+    "bufor": {"power_w": 3000.0, "on_min": 60.0, "hours": _hours(0.40, 0.05, 0.05, 0.10)},
+}
+
+
+@dataclass
+class Profile:
+    power_w: float
+    on_min: float
+    hours: Tuple[float, ...]             # 24 udziały czasu włączenia
+
+
+def type_key(element_type: str) -> str:
+    """``"Włącznik"`` → ``"wlacznik"``, ``"wylacznik_2"`` → ``"wylacznik"``."""
+    t = unicodedata.normalize("NFKD", (element_type or "").strip().lower().replace("ł", "l"))
+    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    return re.sub(r"_\d+$", "", t)
+
+
+def _profile(src: dict, base: Optional[Profile] = None) -> Profile:
+    base = base or Profile(0.0, 1.0, (0.0,) * 24)
+    try:
+        power = max(0.0, float(src.get("power_w", base.power_w)))
+    except (TypeError, ValueError):
+        power = base.power_w
+    try:
+        on_min = max(1.0, float(src.get("on_min", base.on_min)))
+    except (TypeError, ValueError):
+        on_min = base.on_min
+    hours = src.get("hours", base.hours)
+    try:
+        hours = [float(hours)] * 24 if isinstance(hours, (int, float)) else [float(x) for x in hours]
+    except (TypeError, ValueError):
+        hours = list(base.hours)
+    if len(hours) != 24:
+        hours = list(base.hours)
+    return Profile(power, on_min, tuple(min(1.0, max(0.0, x)) for x in hours))
+
+
+def profiles(settings=None) -> Dict[str, Profile]:
+    """Profile typów: domyślne, typy z ``element_types`` i ich ``profile`` z ustawień."""
+    out = {k: _profile(v) for k, v in DEFAULT_PROFILES.items()}
+    for name, spec in section(settings, "element_types").items():
+        own = spec.get("profile") if isinstance(spec, dict) else None
+        key = type_key(name)
+        base = out.get(key) or profile_for(out, key)
+        out[key] = _profile(own, base) if isinstance(own, dict) else base
+    return out
+
+
+def profile_for(table: Dict[str, Profile], element_type: str) -> Profile:
+    """Profil typu: dokładnie, potem najdłuższy pasujący początek (``lampa_led`` → ``lampa``); brak — zero."""
+    key = type_key(element_type)
+    if key in table:
+        return table[key]
+    best = max((k for k in table if key.startswith(k)), key=len, default=None)
+    return table[best] if best is not None else Profile(0.0, 1.0, (0.0,) * 24)
+
+
+@dataclass
+class Group:
+    circuit_id: str                      # "" — element bez obwodu
+    count: int
+    power_w: float
+    on_min: float
+    hours: Tuple[float, ...]
+
+
+def group_loads(items: Iterable[Tuple[str, str, Optional[float]]], table: Dict[str, Profile]) -> List[Group]:
+    """Grupy z ``(id obwodu, typ elementu, power_w lub None)``; odbiorniki bez mocy lub bez użycia są pomijane."""
+    groups: Dict[tuple, Group] = {}
+    for cid, etype, power in items:
+        prof = profile_for(table, etype)
+        p = float(power) if power else prof.power_w
+        if p <= 0 or not any(prof.hours):
+            continue
+        key = (cid or "", p, prof.on_min, prof.hours)
+        g = groups.get(key)
+        if g is None:
+            groups[key] = Group(cid or "", 1, p, prof.on_min, prof.hours)
+        else:
+            g.count += 1
+    return list(groups.values())
+
+
+@dataclass
+class LoadStats:
+    id: str
+    installed_w: float = 0.0
+    peak_w: float = 0.0                  # najwyższy szczyt ze wszystkich dób
+    percentiles_w: Dict[float, float] = field(default_factory=dict)   # percentyl szczytu dobowego
+    energy_kwh: float = 0.0              # średnia energia na dobę
+
+    def percentile(self, q: float) -> float:
+        return self.percentiles_w.get(q, 0.0)
+
+    @property
+    def simultaneity(self) -> Optional[float]:
+        """Współczynnik jednoczesności: P95 szczytu dobowego / moc zainstalowana."""
+        return self.percentile(95.0) / self.installed_w if self.installed_w else None
+
+
+@dataclass
+class ProfileResult:
+    days: int
+    circuits: Dict[str, LoadStats]
+    total: LoadStats
+    mean_w: List[float]                  # średnie obciążenie całej instalacji minuta po minucie
+
+    def main_breaker(self, phases: int = 3, q: float = 99.0) -> Tuple[float, Optional[int]]:
+        """``(prąd szczytu [A], najmniejsze In z MAIN_RATINGS)`` dla percentyla ``q`` szczytu instalacji."""
+        p = self.total.percentile(q)
+        current = p / (math.sqrt(3) * U_3F) if phases == 3 else p / U_1F
+        return current, next((r for r in MAIN_RATINGS if r >= current), None)
+
+
+def _quantiles(values: Sequence[float], qs: Sequence[float]) -> Dict[float, float]:
+    if NUMPY_AVAILABLE:
+        return dict(zip(qs, np.percentile(np.asarray(values, dtype=float), qs).tolist()))
+    s = sorted(values)
+    out = {}
+    for q in qs:                          # interpolacja liniowa — jak np.percentile
+        pos = (len(s) - 1) * q / 100.0
+        lo = int(math.floor(pos)); hi = min(lo + 1, len(s) - 1)
+        out[q] = s[lo] + (s[hi] - s[lo]) * (pos - lo)
+    return out
+
+
+def simulate(groups: Sequence[Group], days: int = DAYS, seed: Optional[int] = None,
+             percentiles: Sequence[float] = PERCENTILES, batch: int = BATCH_DAYS,
+             progress: Optional[Callable[[int, int], None]] = None, cancel=None) -> ProfileResult:
+    """Symulacja ``days`` losowych dób (patrz opis modułu); ``seed`` — powtarzalny wynik.
+
+    Paczka dni liczona jest obwód po obwodzie: w pamięci jest tylko obciążenie jednego
+    obwodu i suma instalacji (dni paczki × minuty). ``progress(dni, days)`` po każdej
+    paczce; ustawiony ``cancel`` (``threading.Event``) przerywa symulację :class:`ExportCancelled`.
+    """
+    days = max(1, int(days))
+    by_circuit: Dict[str, List[Group]] = {}
+    for g in groups:
+        by_circuit.setdefault(g.circuit_id, []).append(g)
+    cids = sorted(by_circuit)
+    peaks: Dict[str, List[float]] = {c: [] for c in cids}
+    energy: Dict[str, float] = {c: 0.0 for c in cids}
+    total_peaks: List[float] = []
+    total_energy = 0.0
+    mean = [0.0] * MINUTES
+    for start in range(0, days, batch):
+        n = min(batch, days - start)
+        batch_seed = None if seed is None else seed + start
+        if NUMPY_AVAILABLE:
+            rng = np.random.default_rng(batch_seed)
+            tot = np.zeros((n, MINUTES), dtype=float)
+            for cid in cids:
+                check_cancel(cancel)
+                load = _simulate_np(by_circuit[cid], n, rng)                 # (dni, minuty)
+                peaks[cid].extend(load.max(axis=1).tolist()); energy[cid] += float(load.sum())
+                tot += load
+            total_peaks.extend(tot.max(axis=1).tolist()); total_energy += float(tot.sum())
+            mean = (np.asarray(mean) + tot.sum(axis=0)).tolist()
+        else:
+            rng = random.Random(batch_seed)
+            tot = [[0.0] * (MINUTES + 1) for _ in range(n)]                 # tablice różnicowe instalacji
+            for cid in cids:
+                check_cancel(cancel)
+                for peak, wmin in _simulate_py(by_circuit[cid], n, rng, tot):
+                    peaks[cid].append(peak); energy[cid] += wmin
+            for diff in tot:
+                row = list(accumulate(diff[:MINUTES]))
+                total_peaks.append(max(row)); total_energy += sum(row)
+            mean = [m + x for m, x in zip(mean, accumulate(map(sum, zip(*tot))))]   # suma dób = cumsum sumy różnic
+        if progress: progress(start + n, days)
+    wh = 1.0 / 60.0 / 1000.0 / days        # W·min -> kWh na dobę
+    out = {}
+    for cid in cids:
+        st = LoadStats(cid, sum(g.count * g.power_w for g in by_circuit[cid]))
+        st.peak_w = max(peaks[cid], default=0.0)
+        st.percentiles_w = _quantiles(peaks[cid], percentiles)
+        st.energy_kwh = energy[cid] * wh
+        out[cid] = st
+    total = LoadStats("", sum(g.count * g.power_w for g in groups), max(total_peaks, default=0.0),
+                      _quantiles(total_peaks or [0.0], percentiles), total_energy * wh)
+    return ProfileResult(days, out, total, [m / days for m in mean])
+
+
+def _simulate_np(groups: Sequence[Group], days: int, rng):
+    """Obciążenie jednego obwodu (grupy tego obwodu) w ``days`` dobach: tablica (dni, minuty) [W]."""
+    load = np.zeros((days, MINUTES), dtype=float)
+    hour_start = np.arange(24) * 60
+    for g in groups:
+        # liczba włączeń w każdej godzinie każdej doby, potem początek i czas trwania każdego włączenia
+        rate = g.count * np.asarray(g.hours) * 60.0 / g.on_min
+        k = rng.poisson(rate, size=(days, 24))
+        total = int(k.sum())
+        if not total:
+            continue
+        day = np.repeat(np.repeat(np.arange(days), 24), k.ravel())
+        hour = np.repeat(np.tile(np.arange(24), days), k.ravel())
+        begin = hour_start[hour] + rng.integers(0, 60, size=total)
+        end = np.minimum(begin + np.maximum(1, np.rint(rng.exponential(g.on_min, size=total))).astype(int), MINUTES)
+        diff = np.zeros((days, MINUTES + 1), dtype=float)
+        np.add.at(diff, (day, begin), 1.0)
+        np.add.at(diff, (day, end), -1.0)
+        load += np.minimum(np.cumsum(diff[:, :MINUTES], axis=1), g.count) * g.power_w   # nie więcej niż n odbiorników
+    return load
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    if lam <= 0:
+        return 0
+    if lam > 30:                           # przybliżenie normalne — dokładność wystarczy do sumy godzin
+        return max(0, int(round(rng.gauss(lam, math.sqrt(lam)))))
+    k, p, limit = 0, rng.random(), math.exp(-lam)
+    while p > limit:
+        k += 1; p *= rng.random()
+    return k
+
+
+def _simulate_py(groups: Sequence[Group], days: int, rng: random.Random,
+                 total: List[List[float]]) -> List[Tuple[float, float]]:
+    """Jeden obwód w ``days`` dobach: ``(szczyt [W], energia [W·min])`` każdej doby; zmiany obciążenia
+    dopisywane są też do tablic różnicowych instalacji ``total`` (minuty + 1).
+
+    Liczba włączeń grupy w dobie losowana jest raz (Poisson z sumy godzin), godzina włączenia
+    proporcjonalnie do udziału godziny — ten sam proces co godzina po godzinie. Obwód liczony
+    jest tylko w minutach zmian obciążenia, bez przechodzenia całej doby.
+    """
+    changes: List[List[Tuple[int, float]]] = [[] for _ in range(days)]
+    rand, expo, find = rng.random, rng.expovariate, bisect.bisect_right
+    for g in groups:
+        rates = [g.count * h * 60.0 / g.on_min for h in g.hours]
+        cum = list(accumulate(rates)); lam = cum[-1]
+        start = [(c - r, 60.0 / r if r else 0.0) for c, r in zip(cum, rates)]   # początek godziny w skali λ, minuty na λ
+        inv, count, power = 1.0 / g.on_min, g.count, g.power_w
+        for d in range(days):
+            k = _poisson(rng, lam)
+            if not k:
+                continue
+            steps = []                      # 2·minuta + 1 włączenie, 2·minuta wyłączenie
+            for _ in range(k):
+                x = rand() * lam
+                hour = find(cum, x)
+                if hour > 23: hour = 23
+                lo, scale = start[hour]
+                b = hour * 60 + int((x - lo) * scale)
+                if b >= MINUTES: b = MINUTES - 1
+                e = b + (int(expo(inv) + 0.5) or 1)
+                steps.append(2 * b + 1); steps.append(2 * (e if e < MINUTES else MINUTES))
+            steps.sort()
+            out, day = changes[d], total[d]; on = level = 0
+            for s in steps:                 # nie więcej niż n odbiorników — zmiana tylko przy zmianie poziomu
+                on += 1 if s & 1 else -1
+                new = on if on < count else count
+                if new != level:
+                    w = (new - level) * power; t = s >> 1
+                    out.append((t, w)); day[t] += w; level = new
+    result = []
+    for day in changes:
+        day.sort()
+        load = peak = energy = 0.0; prev = 0
+        for t, w in day:
+            if t != prev:
+                if load > peak: peak = load
+                energy += load * (t - prev); prev = t
+            load += w
+        result.append((peak, energy))
+    return result
+
+
+def element_circuits(room: Room, circuit_of: Callable[[str], Optional[str]] = lambda lead_id: None) -> Dict[str, str]:
+    """id elementu → obwód z danych pokoju (bez silników obliczeń).
+
+    Obwód elementu to pierwsze połączenie „do rozdz.” z obwodem (``Connection.circuit_id`` albo
+    ``circuit_of(lead_id)``); element w ciągu „Ciąg dalszy z” bierze obwód początku ciągu.
+    """
+    by_id = {e.id: e for e in room.elements}
+    own: Dict[str, str] = {}
+    for el in room.elements:
+        for con in el.connections:
+            cid = (con.circuit_id or circuit_of(con.lead_id)) if con.to_distribution else None
+            if cid:
+                own[el.id] = cid; break
+    out: Dict[str, str] = {}
+    for el in room.elements:
+        node, seen = el, {el.id}
+        while node.chain_prev in by_id and node.chain_prev not in seen:   # cykl — zostaje ostatni element przed nim
+            node = by_id[node.chain_prev]; seen.add(node.id)
+        cid = own.get(node.id) or own.get(el.id)
+        if cid:
+            out[el.id] = cid
+    return out
+
+
+def project_items(project: Project, circuit_of: Callable[[str], Optional[str]] = lambda lead_id: None,
+                  room_view: Callable[[Room], Room] = lambda r: r) -> Iterable[Tuple[str, str, Optional[float]]]:
+    """Odbiorniki projektu: ``(id obwodu lub "", typ, power_w)`` — obwody z :func:`element_circuits`."""
+    for h in project.houses:
+        for r in h.rooms:
+            view = room_view(r)
+            circuits = element_circuits(view, circuit_of)
+            for el in view.elements:
+                yield circuits.get(el.id, ""), el.type, el.power_w
+
+
+def format_result(res: ProfileResult, names: Optional[Dict[str, str]] = None, phases: int = 3) -> str:
+    """Zestawienie tekstowe: obwody, instalacja i proponowane zabezpieczenie główne."""
+    names = names or {}
+    qs = sorted(res.total.percentiles_w)
+
+    def row(label: str, st: LoadStats) -> str:
+        pct = ", ".join(f"P{q:g} {st.percentile(q)/1000:.2f}" for q in qs)
+        k = f"; kj {st.simultaneity:.2f}" if st.simultaneity is not None else ""
+        return (f"{label}: zainst. {st.installed_w/1000:.2f} kW; szczyt dobowy [kW] {pct}, max {st.peak_w/1000:.2f}; "
+                f"{st.energy_kwh:.1f} kWh/dobę{k}")
+
+    lines = [f"Symulacja: {res.days} dób, rozdzielczość 1 min"]
+    for cid, st in res.circuits.items():
+        lines.append(row(f"{cid} {names.get(cid, '')}".strip() if cid else "(bez obwodu)", st))
+    lines.append(row("Instalacja", res.total))
+    current, rating = res.main_breaker(phases)
+    lines.append(f"Zabezpieczenie główne ({phases}f, P99 szczytu): {current:.1f} A → "
+                 + (f"{rating} A" if rating else "powyżej " + f"{MAIN_RATINGS[-1]} A"))
+    return "\n".join(lines)
@@ -0,0 +1,251 @@
+"""
+Samoczynne wyłączenie zasilania: impedancja pętli zwarcia a wyzwalanie
+zabezpieczeń nadprądowych (``Circuit.breaker`` — „B16”, „C20”, „D6”…).
+
+Wyłącznik zadziała w czasie wymaganym (wyzwalacz elektromagnetyczny), gdy
+prąd zwarcia na końcu obwodu osiągnie ``Ia = k·In`` (k = 5/10/20 dla
+charakterystyk B/C/D), czyli gdy ``Zs ≤ U0 / Ia``. Impedancja pętli to
+impedancja sieci przed rozdzielnicą (``protection.source_impedance_ohm``)
+plus rezystancja żyły fazowej i ochronnej od rozdzielnicy do elementu
+(``2·ρ·Σ L/S``, przeliczona na temperaturę pracy żył —
+``protection.conductor_factor``).
+
+Tor do elementu: połączenie „do rozdz.” z :class:`elektryka_loads.LoadEngine`
+albo — w ciągach „Ciąg dalszy z” — zasilanie początku ciągu i kolejne
+odcinki z :class:`elektryka_chains.ChainEngine`. Zebrane tory całego
+projektu są przeliczane jednym przejściem na tablicach (NumPy, bez niego
+pętla), a dla każdego obwodu zostaje element najdalszy (największe Zs).
+
+:func:`check_project` liczy wszystko od zera na własnych silnikach — ten sam
+wynik w eksporcie z aplikacji (w wątku, na kopii projektu) i w
+:mod:`elektryka_cli`.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from elektryka_chains import ChainEngine
+from elektryka_housegraph import HouseGraphCache
+from elektryka_loads import RHO_CU, U_1F, LoadEngine, breaker_current, status_of
+from elektryka_model import Circuit, Project, Room
+from elektryka_routing import RouteCache
+from elektryka_settings import compiled, number, section
+from elektryka_topology import TopologyCache
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+    np = None
+
+U0 = U_1F                          # napięcie faza–ziemia
+TRIP_MULTIPLIERS = {"B": 5.0, "C": 10.0, "D": 20.0}
+SOURCE_IMPEDANCE_OHM = 0.3
+CONDUCTOR_FACTOR = 1.2             # ≈ rezystancja żył przy 70 °C względem 20 °C
+DEFAULT_CURVE = "B"
+VERDICTS = {"ok": "OK", "warn": "na granicy", "error": "NIE WYZWOLI"}
+
+_CURVE_RE = re.compile(r"([A-Za-z]+)\s*(\d+(?:[.,]\d+)?)")
+
+
+def parse_breaker(breaker: str, default_curve: str = DEFAULT_CURVE) -> Tuple[Optional[str], Optional[float]]:
+    """``"B16"`` → ``("B", 16.0)``, ``"S301 C20"`` → ``("C", 20.0)``, ``"16"`` → ``(default_curve, 16.0)``.
+
+    Charakterystyka spoza B/C/D (np. wkładka „gG25”) daje ``(None, In)`` — bez sprawdzenia.
+    """
+    found = [(m.group(1).upper(), float(m.group(2).replace(",", "."))) for m in _CURVE_RE.finditer(breaker or "")]
+    for curve, In in found:
+        if curve in TRIP_MULTIPLIERS:
+            return curve, In
+    if found:
+        return None, found[-1][1]
+    return (default_curve or None), breaker_current(breaker)
+
+
+def trip_current(breaker: str, default_curve: str = DEFAULT_CURVE) -> Optional[float]:
+    """Prąd zadziałania wyzwalacza elektromagnetycznego ``Ia = k·In`` [A] lub None."""
+    curve, In = parse_breaker(breaker, default_curve)
+    return TRIP_MULTIPLIERS[curve] * In if curve in TRIP_MULTIPLIERS and In else None
+
+
+def options(settings) -> Tuple[float, float, str]:
+    """``(impedancja sieci [Ω], współczynnik żył, domyślna charakterystyka)`` z sekcji ``protection`` ustawień."""
+    sec = section(settings, "protection")
+    curve = str(sec.get("default_curve", DEFAULT_CURVE) or "").strip().upper()
+    return (number(sec, "source_impedance_ohm", SOURCE_IMPEDANCE_OHM, 0.0),
+            number(sec, "conductor_factor", CONDUCTOR_FACTOR, 1.0), (curve if curve in TRIP_MULTIPLIERS else ""))
+
+
+@dataclass
+class CircuitProtection:
+    id: str
+    curve: Optional[str] = None
+    breaker_a: Optional[float] = None
+    trip_a: Optional[float] = None           # Ia
+    max_zs_ohm: Optional[float] = None       # U0 / Ia
+    zs_ohm: Optional[float] = None           # najdalszy element
+    fault_a: Optional[float] = None          # U0 / Zs
+    farthest: str = ""                       # "Dom / Pokój / element"
+    paths: int = 0                           # tory z długością i przekrojem
+    unknown: int = 0                         # tory bez długości lub przekroju
+    violations: int = 0                      # tory z Zs > U0 / Ia
+    status: str = ""
+
+    @property
+    def text(self) -> str:
+        if self.zs_ohm is None:
+            return ""
+        return f"{self.zs_ohm:.2f}/{self.max_zs_ohm:.2f} Ω" if self.max_zs_ohm else f"{self.zs_ohm:.2f} Ω"
+
+    @property
+    def summary(self) -> str:
+        """Krótki wpis do legendy eksportu: ``"Zs 0.85/1.44 Ω OK"``."""
+        if self.zs_ohm is None:
+            return ""
+        return f"Zs {self.text} {VERDICTS.get(self.status, '')}".rstrip()
+
+
+def project_paths(project: Project, loads, chains=None,
+                  room_view: Callable[[Room], Room] = lambda r: r) -> Iterable[Tuple[str, Optional[float], str]]:
+    """Tory do elementów projektu: ``(id obwodu, Σ L/S [m/mm²] lub None, opis)``.
+
+    Element w ciągu bierze obwód i tor od zasilania początku ciągu; pozostałe — każde połączenie „do rozdz.”.
+    """
+    for h in project.houses:
+        for r in h.rooms:
+            view = room_view(r)
+            by_id = {e.id: e for e in view.elements}
+            for el in view.elements:
+                label = f"{h.name} / {view.name} / {el.label or el.id}"
+                lk = chains.link(r.uid, el.id) if chains is not None else None
+                if lk is not None and lk.prev is not None:
+                    if lk.in_cycle:
+                        continue
+                    cid = _feed_circuit(r.uid, by_id.get(lk.root), loads)
+                    if cid:
+                        yield cid, lk.path_ls, label
+                    continue
+                for idx, con in enumerate(el.connections):
+                    if not con.to_distribution:
+                        continue
+                    cl = loads.connection(r.uid, el.id, idx)
+                    if cl is None or not cl.circuit_id:
+                        continue
+                    ls = cl.length_m / cl.section_mm2 if cl.length_m is not None and cl.section_mm2 else None
+                    yield cl.circuit_id, ls, label
+
+
+def _feed_circuit(room_uid: str, el, loads) -> Optional[str]:
+    """Obwód zasilania początku ciągu (pierwsze połączenie „do rozdz.” z obwodem)."""
+    for idx, con in enumerate(el.connections if el is not None else ()):
+        cl = loads.connection(room_uid, el.id, idx) if con.to_distribution else None
+        if cl is not None and cl.circuit_id:
+            return cl.circuit_id
+    return None
+
+
+def check_circuits(circuits: Iterable[Circuit], paths: Iterable[Tuple[str, Optional[float], str]],
+                   settings=None, warn_ratio: float = 0.8) -> Dict[str, CircuitProtection]:
+    """Zs wszystkich torów naraz i wynik dla każdego obwodu (najdalszy element, liczba naruszeń)."""
+    zsrc, factor, curve = options(settings)
+    out: Dict[str, CircuitProtection] = {}
+    trip: Dict[str, Optional[float]] = {}
+    for c in circuits:
+        cv, In = parse_breaker(c.breaker, curve)
+        ia = TRIP_MULTIPLIERS[cv] * In if cv in TRIP_MULTIPLIERS and In else None
+        out[c.id] = CircuitProtection(c.id, cv, In, ia, U0 / ia if ia else None)
+        trip[c.id] = ia
+    cids, ls, labels = [], [], []
+    for cid, x, label in paths:
+        if cid not in out:
+            continue
+        if x is None or not math.isfinite(x):
+            out[cid].unknown += 1; continue
+        cids.append(cid); ls.append(x); labels.append(label)
+    if not cids:
+        return _finish(out, warn_ratio)
+    k = 2.0 * RHO_CU * factor                   # żyła fazowa + ochronna tego samego przekroju
+    if NUMPY_AVAILABLE:
+        zs = (zsrc + k * np.asarray(ls, dtype=float))
+        zmax = np.asarray([U0 / trip[c] if trip[c] else np.inf for c in cids], dtype=float)
+        bad = (zs > zmax).tolist(); zs = zs.tolist()
+    else:
+        zs = [zsrc + k * x for x in ls]
+        bad = [bool(trip[c]) and z > U0 / trip[c] for c, z in zip(cids, zs)]
+    for cid, z, b, label in zip(cids, zs, bad, labels):
+        cp = out[cid]
+        cp.paths += 1; cp.violations += int(b)
+        if cp.zs_ohm is None or z > cp.zs_ohm:
+            cp.zs_ohm, cp.farthest = z, label
+    return _finish(out, warn_ratio)
+
+
+def _finish(out: Dict[str, CircuitProtection], warn_ratio: float) -> Dict[str, CircuitProtection]:
+    for cp in out.values():
+        if cp.zs_ohm is not None:
+            cp.fault_a = U0 / cp.zs_ohm if cp.zs_ohm > 0 else math.inf
+        cp.status = status_of(cp.zs_ohm, cp.max_zs_ohm or 0.0, warn_ratio)
+    return out
+
+
+def check_project(project: Project, settings, room_view: Callable[[Room], Room] = lambda r: r,
+                  circuit_of: Optional[Callable[[str], Optional[str]]] = None) -> Dict[str, CircuitProtection]:
+    """Sprawdzenie całego projektu na własnych silnikach (trasy przez przejścia jak w aplikacji).
+
+    ``room_view`` — pokój z danymi (projekt katalogowy: czytany z pliku, raz na pokój);
+    ``circuit_of(lead_id)`` — obwód przewodu, domyślnie z ``Circuit.assigned_leads``.
+    """
+    cfg = compiled(settings)
+    ppm = float(cfg.ui.get("px_per_meter", 50))
+    views: Dict[str, Room] = {}
+    view = lambda r: views[r.uid] if r.uid in views else views.setdefault(r.uid, room_view(r))
+    if circuit_of is None:
+        leads = {lid: c.id for c in project.circuits for lid in c.assigned_leads}
+        circuit_of = leads.get
+    routes = RouteCache(TopologyCache())
+    houses = HouseGraphCache(routes, project, view)
+    house_of = {r.uid: h for h in project.houses for r in h.rooms}
+
+    def length_of(room, el, con):
+        if con.length_m is not None or not con.to_distribution:
+            return con.length_m
+        run = houses.run(house_of[room.uid], room, el)
+        return run.length_m(ppm) if run is not None else None
+
+    def link_length(room, a, b):
+        r = routes.route_elements(room, a, b)
+        return r.length_m(ppm) if r is not None else None
+
+    loads = LoadEngine(cfg, circuit_of=circuit_of, length_of=length_of)
+    loads.rebuild(project, view)
+    chains = ChainEngine(cfg, link_length=link_length, loads=loads)
+    chains.rebuild(project, view)
+    return check_circuits(project.circuits, project_paths(project, loads, chains, view), cfg,
+                          cfg.limit("load_warning", 0.8))
+
+
+def format_report(results: Dict[str, CircuitProtection], circuits: Iterable[Circuit]) -> str:
+    """Zestawienie tekstowe: obwód po obwodzie."""
+    lines = []
+    for c in circuits:
+        cp = results.get(c.id)
+        if cp is None:
+            continue
+        head = f"{c.id} {c.name} [{c.breaker or '—'}]"
+        if cp.trip_a is None:
+            lines.append(f"{head}: brak sprawdzenia — nieznana charakterystyka lub prąd zabezpieczenia")
+        elif cp.zs_ohm is None:
+            lines.append(f"{head}: Ia = {cp.trip_a:g} A, Zs max {cp.max_zs_ohm:.2f} Ω; brak torów z długością")
+        else:
+            verdict = VERDICTS.get(cp.status, "")
+            lines.append(f"{head}: Ia = {cp.trip_a:g} A, Zs max {cp.max_zs_ohm:.2f} Ω; najdalej {cp.farthest}: "
+                         f"Zs {cp.zs_ohm:.2f} Ω, Ik {cp.fault_a:.0f} A — {verdict}"
+                         + (f"; naruszeń: {cp.violations}/{cp.paths}" if cp.violations else ""))
+        if cp.unknown:
+            lines.append(f"  bez długości lub przekroju: {cp.unknown}")
+    return "\n".join(lines)
@@ -0,0 +1,278 @@
+"""
+Rastrowe renderowanie rzutu pokoju (segmenty, elementy, paski żył, linki,
+legenda) do obrazu Pillow — wspólne dla eksportu PDF pokoju i eksportu
+całego domu/projektu.
+
+Funkcje są na poziomie modułu i nie zależą od Tkintera, więc
+:func:`render_page_job` może działać w procesach roboczych
+(:func:`render_pages`), a całe eksporty — w wątku w tle. Długie operacje
+przyjmują ``progress(i, n)`` i ``cancel`` (``threading.Event``); po
+anulowaniu zgłaszają :class:`ExportCancelled`.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from PIL import Image, ImageDraw
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+    Image = ImageDraw = None
+
+from elektryka_controls import format_ref, parse_ref
+from elektryka_model import Circuit, Room, room_from_dict
+from elektryka_pdf import PdfWriter
+from elektryka_routing import RouteCache
+from elektryka_settings import CompiledSettings, compiled
+from elektryka_shards import read_json
+from elektryka_topology import TopologyCache
+
+PAGE_SIZE = (1600, 1000)
+
+
+class ExportCancelled(Exception):
+    """Eksport przerwany przez użytkownika."""
+
+
+def check_cancel(cancel) -> None:
+    if cancel is not None and cancel.is_set():
+        raise ExportCancelled()
+
+
+def resolve_room(room) -> Room:
+    """Pokój lub ścieżka pliku pokoju (niewczytany pokój projektu katalogowego)."""
+    return room_from_dict(read_json(room)) if isinstance(room, str) else room
+
+
+SEGMENT_RGB = {"SCIANA": (43,43,43), "OKNO": (26,115,232), "DRZWI": (165,42,42), "PRZEJSCIE": (154,205,50)}
+
+
+@lru_cache(maxsize=16)
+def _legend(cfg: CompiledSettings, circuits: Tuple[Tuple[str, str, str, str, str], ...], size) -> Tuple[tuple, ...]:
+    """Legenda obwodów i układu — taka sama na każdej stronie, więc liczona raz
+    na (ustawienia, obwody); nowe ustawienia to nowy klucz cache."""
+    W,H = size
+    out: List[tuple] = []
+    lx, ly = W-360, 40
+    out.append(("rect", lx-10, ly-10, W-30, ly+430, (120,120,120), (245,245,245)))
+    out.append(("text", lx, ly-24, "Legenda obwodów", (0,0,0)))
+    yy = ly
+    for cid, name, breaker, color, loop in circuits:
+        out.append(("rect", lx, yy, lx+26, yy+14, (34,34,34), cfg.palette_rgb.get(color, (0,0,0))))
+        out.append(("text", lx+34, yy, f"{cid}  {name}  ({breaker or '-'})" + (f"  {loop}" if loop else ""), (0,0,0)))
+        yy += 18
+
+    out.append(("text", lx, yy+8, "Układ pokoju:", (0,0,0)))
+    yy2 = yy + 26
+    for name, col in [("Ściana", (43,43,43)), ("Okno", (26,115,232)), ("Drzwi", (165,42,42)), ("Przejście", (154,205,50))]:
+        out.append(("line", lx, yy2, lx+28, yy2, col, 4 if name=="Ściana" else 3))
+        out.append(("text", lx+36, yy2-8, name, (0,0,0)))
+        yy2 += 18
+    return tuple(out)
+
+
+DANGLING_RGB = (200,0,0)
+CONTROL_RGB = (255,140,0)
+
+
+def room_primitives(room: Room, circuits: Sequence[Circuit], settings, size=PAGE_SIZE,
+                    targets: Optional[Dict[Tuple[str, str], str]] = None,
+                    loop: Optional[Dict[str, str]] = None) -> List[tuple]:
+    """Rzut pokoju z legendą jako lista prymitywów (współrzędne strony, początek w lewym górnym rogu).
+
+    ``("line", x1, y1, x2, y2, rgb, szer.)``, ``("ellipse", x1, y1, x2, y2, obrys, wypełn.)``,
+    ``("rect", x1, y1, x2, y2, obrys, wypełn.)``, ``("text", x, y, tekst, rgb)``.
+    Rysują je: raster (:func:`render_room`) oraz eksport wektorowy (PDF/SVG).
+    ``settings`` — :class:`CompiledSettings` (słownik jest kompilowany przy każdym wywołaniu).
+    ``targets`` — ``(pokój, id elementu) → etykieta`` dla domu (:meth:`ElementIndex.directory`):
+    linki do innych pokoi prowadzą wtedy do przejścia w stronę celu, a linki bez celu są
+    zaznaczane na czerwono; bez ``targets`` rysowane są tylko linki w obrębie pokoju.
+    Sterowanie (``Element.controls``) łączników pokoju jest wypisane pod legendą.
+    ``loop`` — id obwodu → stan pętli zwarcia (:attr:`elektryka_protection.CircuitProtection.summary`)
+    dopisywany w legendzie obwodów.
+    """
+    cfg = compiled(settings)
+    out: List[tuple] = []
+    conductors = cfg.conductor_rgb
+
+    # SEGMENTY (układ)
+    for s in room.segments:
+        col = SEGMENT_RGB.get(s.kind, (43,43,43))
+        out.append(("line", s.a[0], s.a[1], s.b[0], s.b[1], col, 4 if s.kind=="SCIANA" else 3))
+
+    # ELEMENTY
+    for el in room.elements:
+        r=8
+        out.append(("ellipse", el.x-r, el.y-r, el.x+r, el.y+r, (0,0,0), (255,255,255)))
+        if el.label: out.append(("text", el.x+10, el.y-12, el.label, (0,0,0)))
+        if el.connections:
+            con = el.connections[0]
+            x_off = el.x + 14; y_off = el.y - 8
+            for k,used in con.conductors.items():
+                if used:
+                    out.append(("rect", x_off, y_off, x_off+22, y_off+14, (34,34,34), conductors.get(k, (0,0,0))))
+                    out.append(("text", x_off+5, y_off+2, k, (255,255,255)))
+                    x_off += 26
+        if el.max_current_a:
+            try:
+                w = el.max_current_a * 230.0
+                out.append(("text", el.x+10, el.y+10, f"{el.max_current_a:.0f}A ~{int(w)}W", (80,80,80)))
+            except: pass
+
+    # LINKI (połączenia)
+    idx = {e.id: e for e in room.elements}
+    circ_rgb = cfg.circuit_rgb_map(circuits)
+    portals = {s.portal_to_room: ((s.a[0]+s.b[0])//2, (s.a[1]+s.b[1])//2)
+               for s in room.segments if s.kind == "PRZEJSCIE" and s.portal_to_room}
+    router = RouteCache(TopologyCache())   # siatka budowana dopiero przy pierwszej trasie
+
+    def polyline(p, q, col, width):
+        r = router.route(room, p, q)
+        pts = r.points if r is not None else [p, q]
+        out.extend(("line", *u, *v, col, width) for u, v in zip(pts, pts[1:]))
+
+    for link in room.links:
+        a = idx.get(link.a_id)
+        if not a: continue
+        col = circ_rgb.get(link.circuit_id, (85,85,85)) if link.circuit_id else (85,85,85)
+        remote = bool(link.b_room) and link.b_room != room.name
+        b = None if remote else idx.get(link.b_id)
+        if b is not None:
+            polyline((a.x, a.y), (b.x, b.y), col, 3); continue
+        if targets is None: continue
+        if remote:
+            label = targets.get((link.b_room, link.b_id))
+            tx, ty = portals.get(link.b_room, (a.x+40, a.y-40))
+            text = f"→ {link.b_room}: {label}" if label is not None else f"{link.b_room}:{link.b_id} (brak celu)"
+        else:
+            label = None; tx, ty = a.x+40, a.y-40; text = f"{link.b_id} (brak celu)"
+        if label is None: col = DANGLING_RGB
+        if link.b_room in portals and label is not None: polyline((a.x, a.y), (tx, ty), col, 2)
+        else: out.append(("line", a.x, a.y, tx, ty, col, 2))
+        out.append(("text", tx+4, ty-14, text, col))
+
+    # STEROWANIE (łącznik → sterowane; w pokoju — cienka linia, lista pod legendą)
+    rows = []
+    for el in room.elements:
+        names = []
+        for ref in el.controls:
+            rn, tid = parse_ref(ref, room.name)
+            t = idx.get(tid) if rn == room.name else None
+            if t is not None:
+                out.append(("line", el.x, el.y, t.x, t.y, CONTROL_RGB, 1))
+                names.append(t.label or t.id)
+            else:
+                label = targets.get((rn, tid)) if targets is not None else tid
+                names.append(f"{rn}: {label}" if rn != room.name and label is not None
+                             else f"{format_ref(rn, tid, room.name)} (brak celu)")
+        if names:
+            rows.append(f"{el.label or el.id} → " + ", ".join(names))
+    if rows:
+        W = size[0]
+        out.append(("text", W-360, 490, "Sterowanie:", (0,0,0)))
+        out.extend(("text", W-360, 508 + 16*i, row, CONTROL_RGB) for i, row in enumerate(rows))
+
+    # LEGENDY
+    loop = loop or {}
+    out.extend(_legend(cfg, tuple((c.id, c.name, c.breaker, c.color, loop.get(c.id, "")) for c in circuits), tuple(size)))
+    return out
+
+
+def render_room(room: Room, circuits: Sequence[Circuit], settings, background=None, size=PAGE_SIZE, targets=None,
+                loop=None):
+    """Rzut pokoju z legendą jako obraz RGB (``background`` — obraz PIL lub None)."""
+    W,H = size
+    if background is not None:
+        base = background.copy().convert("RGB"); base = base.resize((W,H))
+    else:
+        base = Image.new("RGB",(W,H),"white")
+    draw = ImageDraw.Draw(base)
+    for p in room_primitives(room, circuits, settings, size, targets, loop):
+        kind = p[0]
+        if kind == "line": draw.line(list(p[1:5]), fill=p[5], width=p[6])
+        elif kind == "ellipse": draw.ellipse(list(p[1:5]), outline=p[5], fill=p[6])
+        elif kind == "rect": draw.rectangle(list(p[1:5]), outline=p[5], fill=p[6])
+        elif kind == "text": draw.text((p[1], p[2]), p[3], fill=p[4])
+    return base
+
+
+def open_background(src: str, archive_path: Optional[str] = None):
+    """Tło z pliku lub z archiwum ``.elk`` (odwołanie ``elk:...``); None, gdy brak."""
+    if not src: return None
+    if src.startswith("elk:"):
+        if not archive_path: return None
+        with zipfile.ZipFile(archive_path) as zf:
+            return Image.open(io.BytesIO(zf.read(src[4:]))).convert("RGB")
+    if os.path.exists(src):
+        return Image.open(src).convert("RGB")
+    return None
+
+
+def render_page_job(job: tuple) -> Tuple[bytes, int, int, float]:
+    """Jedna strona w procesie roboczym → ``(jpeg, szer., wys., czas [s])``.
+
+    ``job = (room | ścieżka pliku pokoju, circuits, settings, archive_path[, targets[, loop]])``.
+    """
+    t0 = time.perf_counter()
+    room, circuits, settings, archive_path, *rest = job
+    targets = rest[0] if rest else None
+    loop = rest[1] if len(rest) > 1 else None
+    room = resolve_room(room); settings = compiled(settings)
+    try:
+        bg = open_background(room.background_image, archive_path)
+    except Exception:
+        bg = None
+    img = render_room(room, circuits, settings, bg, targets=targets, loop=loop)
+    buf = io.BytesIO(); img.save(buf, "JPEG", quality=90)
+    return buf.getvalue(), img.width, img.height, time.perf_counter() - t0
+
+
+def render_pages(jobs: Sequence[tuple], workers: Optional[int] = None) -> Iterator[Tuple[bytes, int, int, float]]:
+    """Renderuj strony równolegle w procesach; wyniki w kolejności ``jobs``.
+
+    Przy jednym procesie (lub gdy pula nie może wystartować) strony powstają
+    kolejno w bieżącym procesie.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield render_page_job(job)
+        return
+    try:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    except Exception:
+        for job in jobs:
+            yield render_page_job(job)
+        return
+    with pool:
+        futures = [pool.submit(render_page_job, job) for job in jobs]
+        try:
+            for f in futures:
+                yield f.result()
+        finally:  # przerwany odbiór (anulowanie) — nie czekaj na resztę stron
+            for f in futures:
+                f.cancel()
+
+
+def export_pages_pdf(path: str, jobs: Sequence[tuple], workers: Optional[int] = None,
+                     progress=None, cancel=None) -> List[float]:
+    """Wielostronicowy rastrowy PDF z zadań :func:`render_page_job`; zwraca czasy stron [s]."""
+    timings: List[float] = []
+    pages = render_pages(jobs, workers)
+    try:
+        with PdfWriter(path) as pdf:
+            for i, (jpeg, w, h, dt) in enumerate(pages):
+                check_cancel(cancel)
+                pdf.add_jpeg_page(jpeg, w, h); timings.append(dt)
+                if progress: progress(i+1, len(jobs))
+    finally:
+        pages.close()
+    return timings
@@ -0,0 +1,257 @@
+"""
+Trasy kabli w pokoju — wzdłuż ścian, z omijaniem okien i drzwi.
+
+Pokój jest dzielony na siatkę nawigacyjną (:class:`NavGrid`, oczko
+``cell`` px). Komórki w pasie instalacyjnym przy ścianach (``SCIANA``)
+mają koszt 1, pozostała część pokoju — ``off_wall_cost`` (kabel biegnie
+przez środek pokoju tylko wtedy, gdy nie ma innej drogi), a komórki przy
+oknach i drzwiach są zablokowane; przy zamkniętym obrysie
+(:mod:`elektryka_topology`) zablokowane jest też wszystko poza pokojem. Trasę wyznacza A* (ruchy poziome
+i pionowe — jak prowadzi się przewody), a wynik to łamana z uproszczonymi
+odcinkami współliniowymi i jej długość w metrach wg ``ui.px_per_meter``.
+
+Siatka jest budowana raz na pokój i trzymana w :class:`RouteCache`
+(przebudowa tylko po zmianie segmentów), więc wyznaczenie tras wszystkich
+połączeń pokoju to pojedyncze milisekundy.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from elektryka_model import Element, Room, Segment
+
+CELL_PX = 10
+WALL_BAND_PX = 15
+OPENING_CLEARANCE_PX = 20
+OFF_WALL_COST = 5
+PAD_CELLS = 3
+
+Point = Tuple[float, float]
+
+
+@dataclass
+class Route:
+    points: List[Point] = field(default_factory=list)
+    length_px: float = 0.0
+
+    def length_m(self, px_per_meter: float) -> float:
+        return self.length_px / px_per_meter if px_per_meter > 0 else 0.0
+
+    def flat(self) -> List[float]:
+        """Współrzędne dla ``Canvas.create_line``: ``[x1, y1, x2, y2, …]``."""
+        return [c for p in self.points for c in p]
+
+
+def _seg_dist(px: float, py: float, s: Segment) -> float:
+    (x1, y1), (x2, y2) = s.a, s.b
+    dx, dy = x2 - x1, y2 - y1
+    L2 = dx*dx + dy*dy
+    t = 0.0 if L2 == 0 else max(0.0, min(1.0, ((px-x1)*dx + (py-y1)*dy) / L2))
+    return math.hypot(px - (x1 + t*dx), py - (y1 + t*dy))
+
+
+class NavGrid:
+    """Siatka kosztów pokoju (0 = zablokowane)."""
+
+    def __init__(self, segments: Iterable[Segment], extra_points: Iterable[Point] = (), cell: int = CELL_PX,
+                 band: float = WALL_BAND_PX, clearance: float = OPENING_CLEARANCE_PX, off_wall_cost: int = OFF_WALL_COST,
+                 polygons: Optional[List[List[Point]]] = None):
+        segments = list(segments)
+        pts = [p for s in segments for p in (s.a, s.b)] + list(extra_points)
+        self.cell = cell
+        if not pts:
+            pts = [(0, 0)]
+        self.x0 = min(p[0] for p in pts) - PAD_CELLS * cell
+        self.y0 = min(p[1] for p in pts) - PAD_CELLS * cell
+        self.w = int((max(p[0] for p in pts) - self.x0) // cell) + PAD_CELLS + 1
+        self.h = int((max(p[1] for p in pts) - self.y0) // cell) + PAD_CELLS + 1
+        cost = bytearray([off_wall_cost]) * (self.w * self.h)
+        # pas przy ścianach, potem otwory (mają pierwszeństwo)
+        for kinds, radius, value in ((("SCIANA",), band, 1), (("OKNO", "DRZWI"), clearance, 0)):
+            for s in segments:
+                if s.kind not in kinds:
+                    continue
+                i0, j0 = self.cell_of((min(s.a[0], s.b[0]) - radius, min(s.a[1], s.b[1]) - radius))
+                i1, j1 = self.cell_of((max(s.a[0], s.b[0]) + radius, max(s.a[1], s.b[1]) + radius))
+                for j in range(j0, j1 + 1):
+                    for i in range(i0, i1 + 1):
+                        cx, cy = self.center(i, j)
+                        if _seg_dist(cx, cy, s) <= radius:
+                            cost[j * self.w + i] = value
+        if polygons:
+            self._block_outside(cost, polygons)
+        self.cost = cost
+
+    def _block_outside(self, cost: bytearray, polygons: List[List[Point]]) -> None:
+        """Komórki, których środek leży poza wszystkimi wielokątami pokoju → 0 (wiersz po wierszu)."""
+        edges = [(p, q) for poly in polygons for p, q in zip(poly, poly[1:] + poly[:1])]
+        for j in range(self.h):
+            cy = self.y0 + (j + 0.5) * self.cell
+            xs = sorted(p[0] + (cy - p[1]) * (q[0] - p[0]) / (q[1] - p[1])
+                        for p, q in edges if (p[1] <= cy) != (q[1] <= cy))
+            row = bytearray(self.w)
+            for x1, x2 in zip(xs[0::2], xs[1::2]):
+                i1 = max(0, int(math.ceil((x1 - self.x0) / self.cell - 0.5)))
+                i2 = min(self.w - 1, int(math.floor((x2 - self.x0) / self.cell - 0.5)))
+                for i in range(i1, i2 + 1):
+                    row[i] = 1
+            base = j * self.w
+            for i in range(self.w):
+                if not row[i]:
+                    cost[base + i] = 0
+
+    def cell_of(self, p: Point) -> Tuple[int, int]:
+        i = int((p[0] - self.x0) // self.cell); j = int((p[1] - self.y0) // self.cell)
+        return min(max(i, 0), self.w - 1), min(max(j, 0), self.h - 1)
+
+    def center(self, i: int, j: int) -> Point:
+        return self.x0 + (i + 0.5) * self.cell, self.y0 + (j + 0.5) * self.cell
+
+    def contains(self, p: Point) -> bool:
+        return self.x0 <= p[0] < self.x0 + self.w * self.cell and self.y0 <= p[1] < self.y0 + self.h * self.cell
+
+    def astar(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
+        """Najtańsza droga komórek (4-sąsiedztwo); start i cel dostępne nawet w otworze."""
+        w, cost = self.w, self.cost
+        s, g = start[1] * w + start[0], goal[1] * w + goal[0]
+        gx, gy = goal
+        best = {s: 0}; came = {}
+        heap = [(abs(start[0]-gx) + abs(start[1]-gy), 0, s)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == g:
+                path = [u]
+                while u in came:
+                    u = came[u]; path.append(u)
+                return [(v % w, v // w) for v in reversed(path)]
+            if d > best.get(u, math.inf):
+                continue
+            ui, uj = u % w, u // w
+            for v, vi, vj in ((u-1, ui-1, uj), (u+1, ui+1, uj), (u-w, ui, uj-1), (u+w, ui, uj+1)):
+                if not (0 <= vi < w and 0 <= vj < self.h):
+                    continue
+                c = cost[v] or (1 if v == g else 0)
+                if not c:
+                    continue
+                nd = d + c
+                if nd < best.get(v, math.inf):
+                    best[v] = nd; came[v] = u
+                    heapq.heappush(heap, (nd + abs(vi-gx) + abs(vj-gy), nd, v))
+        return None
+
+    def distance_field(self, sources: Iterable[Tuple[Point, float]]) -> Tuple[List[float], List[int]]:
+        """Długość trasy [px] z każdej komórki do najbliższego źródła (Dijkstra wielu źródeł).
+
+        ``sources`` — ``(punkt, długość początkowa)``; trasy wybierane wg kosztu siatki,
+        jak w :meth:`astar`. Zwraca ``(długości, indeks źródła)``; nieosiągalne — ``inf`` i -1.
+        """
+        w, h, cost, cell = self.w, self.h, self.cost, self.cell
+        best = [math.inf] * (w * h); length = [math.inf] * (w * h); origin = [-1] * (w * h)
+        heap = []
+        for k, (p, d0) in enumerate(sources):
+            i, j = self.cell_of(p); u = j * w + i
+            d = d0 / cell                         # koszt w krokach siatki
+            if d < best[u]:
+                best[u] = d; length[u] = d0 + math.dist(p, self.center(i, j)); origin[u] = k
+                heapq.heappush(heap, (d, u))
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > best[u]:
+                continue
+            ui, uj = u % w, u // w
+            for v, vi, vj in ((u-1, ui-1, uj), (u+1, ui+1, uj), (u-w, ui, uj-1), (u+w, ui, uj+1)):
+                if 0 <= vi < w and 0 <= vj < h and cost[v] and d + cost[v] < best[v]:
+                    best[v] = d + cost[v]; length[v] = length[u] + cell; origin[v] = origin[u]
+                    heapq.heappush(heap, (best[v], v))
+        return length, origin
+
+    def field_length(self, field: Tuple[List[float], List[int]], p: Point) -> Tuple[float, int]:
+        """``(długość, indeks źródła)`` z pola :meth:`distance_field` dla punktu (element może stać w otworze)."""
+        length, origin = field
+        i, j = self.cell_of(p); u = j * self.w + i
+        best, k = length[u], origin[u]
+        if best == math.inf:   # komórka zablokowana — najbliższy dostępny sąsiad
+            for di, dj in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                if 0 <= i+di < self.w and 0 <= j+dj < self.h:
+                    v = (j+dj) * self.w + i+di
+                    if length[v] + self.cell < best:
+                        best, k = length[v] + self.cell, origin[v]
+        return (best + math.dist(p, self.center(i, j)), k) if best < math.inf else (math.inf, -1)
+
+    def route(self, a: Point, b: Point) -> Optional[Route]:
+        cells = self.astar(self.cell_of(a), self.cell_of(b))
+        if cells is None:
+            return None
+        pts = [tuple(a)] + [self.center(i, j) for i, j in cells[1:-1]] + [tuple(b)]
+        pts = _simplify(pts)
+        return Route(pts, sum(math.dist(p, q) for p, q in zip(pts, pts[1:])))
+
+
+def _simplify(pts: List[Point]) -> List[Point]:
+    """Usuń punkty pośrednie leżące na prostej między sąsiadami (i powtórzone)."""
+    out: List[Point] = []
+    for p in pts:
+        if out and math.dist(out[-1], p) < 1e-9:
+            continue
+        if len(out) >= 2:
+            (x1, y1), (x2, y2) = out[-2], out[-1]
+            if abs((x2-x1)*(p[1]-y1) - (y2-y1)*(p[0]-x1)) < 1e-6:
+                out[-1] = p; continue
+        out.append(p)
+    return out
+
+
+def portal_point(room: Room, to_room: Optional[str] = None) -> Optional[Point]:
+    """Środek przejścia (``PRZEJSCIE``) do pokoju ``to_room`` (albo pierwszego przejścia)."""
+    for s in room.segments:
+        if s.kind == "PRZEJSCIE" and (to_room is None or s.portal_to_room == to_room):
+            return ((s.a[0]+s.b[0]) / 2, (s.a[1]+s.b[1]) / 2)
+    return None
+
+
+class RouteCache:
+    """Siatki nawigacyjne pokoi wg ``uid`` — jak :class:`elektryka_topology.TopologyCache`."""
+
+    def __init__(self, topology=None, cell: int = CELL_PX):
+        self.topology = topology          # TopologyCache: obrys pokoju ogranicza siatkę
+        self.cell = cell
+        self._cache: Dict[str, Tuple[tuple, NavGrid]] = {}
+        self._stale: set = set()
+
+    def invalidate(self, rooms: Iterable[Room] = ()) -> None:
+        self._stale.update(r.uid for r in rooms)
+
+    def clear(self) -> None:
+        self._cache.clear(); self._stale.clear()
+
+    def grid(self, room: Room) -> NavGrid:
+        hit = self._cache.get(room.uid)
+        fits = hit is not None and all(hit[1].contains((e.x, e.y)) for e in room.elements)
+        if fits and room.uid not in self._stale:
+            return hit[1]
+        key = tuple((s.kind, tuple(s.a), tuple(s.b)) for s in room.segments)
+        self._stale.discard(room.uid)
+        if not fits or hit[0] != key:
+            # elementy poza obrysem (np. przed narysowaniem ścian) poszerzają siatkę
+            polys = None
+            if self.topology is not None:
+                topo = self.topology.get(room)
+                if topo.closed:
+                    polys = [[topo.vertices[v] for v in poly] for poly in topo.polygons]
+            hit = (key, NavGrid(room.segments, [(e.x, e.y) for e in room.elements], self.cell, polygons=polys))
+            self._cache[room.uid] = hit
+        return hit[1]
+
+    def route(self, room: Room, a: Point, b: Point) -> Optional[Route]:
+        return self.grid(room).route(a, b)
+
+    def route_elements(self, room: Room, a: Element, b: Element) -> Optional[Route]:
+        return self.route(room, (a.x, a.y), (b.x, b.y))
+
+    def route_to_portal(self, room: Room, el: Element, to_room: Optional[str] = None) -> Optional[Route]:
+        p = portal_point(room, to_room)
+        return self.route(room, (el.x, el.y), p) if p is not None else None
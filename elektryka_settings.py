@@ -0,0 +1,132 @@
+"""
+Ustawienia programu Elektryka (``settings.json``) bez zależności od Tkintera.
+
+Wspólne dla aplikacji okienkowej i narzędzi wsadowych (:mod:`elektryka_cli`):
+gdy pliku brak lub jest uszkodzony, używane są :data:`DEFAULT_SETTINGS`.
+
+Rysowanie korzysta z :class:`CompiledSettings` — ustawień skompilowanych raz
+po wczytaniu pliku (kolory jako gotowe krotki RGB, limity jako liczby).
+Obiekt jest niezmienny: przeładowanie ``settings.json`` tworzy nowy, więc
+cache zależne od ustawień wystarczy kluczować tożsamością obiektu.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+RGB = Tuple[int, int, int]
+
+SETTINGS_FILE = "settings.json"
+
+DEFAULT_SETTINGS = {
+    "ui":{"show_grid":True,"snap_to_grid":True,"default_grid_size":20,"show_conductor_chips_on_canvas":True,"auto_open_connections_dialog_on_place":True},
+    "limits":{"max_connections_per_element":4,"voltage_drop_lighting":3.0,"voltage_drop_general":5.0,"load_warning":0.8,"load_error":1.0,"socket_default_current_a":16.0},
+    "cables":{"drums_m":[50,100],"slack_per_termination_m":0.3},
+    "protection":{"source_impedance_ohm":0.3,"conductor_factor":1.2,"default_curve":"B"},
+    "element_types":{"gniazdko":{},"wylacznik_1":{},"wylacznik_2":{},"roleta":{},"lampa":{},"rozdzielnica":{}},
+    "colors":{"conductors":{"L":"#a52a2a","N":"#1a73e8","PE":"#9acd32","L1":"#a52a2a","L2":"#000000","L3":"#808080"},
+              "circuit_palette":{"niebieski":"#1a73e8","czarny":"#000000","zolto-zielony":"#9acd32","szary":"#808080"}}
+}
+
+
+def default_settings() -> dict:
+    return copy.deepcopy(DEFAULT_SETTINGS)
+
+
+def load_settings(path: str = SETTINGS_FILE) -> Tuple[dict, Optional[str]]:
+    """``(ustawienia, błąd)`` — przy błędzie odczytu zwraca kopię ustawień domyślnych i opis błędu."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f), None
+    except Exception as e:
+        return default_settings(), str(e)
+
+
+def parse_hex(h: str, default: RGB = (0, 0, 0)) -> RGB:
+    """``"#a52a2a"`` / ``"#abc"`` → ``(165, 42, 42)``; nieprawidłowy zapis → ``default``."""
+    try:
+        h = h.lstrip("#")
+        if len(h) == 3:
+            h = "".join(c * 2 for c in h)
+        return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+    except (AttributeError, ValueError):
+        return default
+
+
+def _num(v, default=0.0) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def section(settings, name: str) -> Mapping:
+    """Sekcja ``name`` ustawień (słownik lub :class:`CompiledSettings`); brak albo nie-słownik — pusta."""
+    raw = getattr(settings, "raw", settings) or {}
+    sec = raw.get(name) if hasattr(raw, "get") else None
+    return sec if hasattr(sec, "get") else {}
+
+
+def number(sec: Mapping, key: str, default: float, low: Optional[float] = None) -> float:
+    """Liczba z sekcji ustawień: zła wartość — ``default``, nie mniej niż ``low``."""
+    v = _num(sec.get(key, default), default)
+    return v if low is None else max(low, v)
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledSettings:
+    """Niezmienne ustawienia gotowe do rysowania (patrz :func:`compile_settings`)."""
+    raw: Mapping                      # źródłowy słownik (kopia)
+    ui: Mapping
+    conductor_hex: Mapping[str, str]
+    conductor_rgb: Mapping[str, RGB]
+    palette_hex: Mapping[str, str]
+    palette_rgb: Mapping[str, RGB]
+    limits: Mapping[str, float]
+
+    def conductor(self, key: str) -> str:
+        return self.conductor_hex.get(key, "#000000")
+
+    def circuit_hex_map(self, circuits: Iterable) -> Dict[str, str]:
+        """id obwodu → kolor hex; budowane raz na rysowanie zamiast szukania obwodu przy każdym linku."""
+        return {c.id: self.palette_hex.get(c.color, "#000000") for c in circuits}
+
+    def circuit_rgb_map(self, circuits: Iterable) -> Dict[str, RGB]:
+        return {c.id: self.palette_rgb.get(c.color, (0, 0, 0)) for c in circuits}
+
+    def limit(self, key: str, default: float = 0.0) -> float:
+        return self.limits.get(key, default)
+
+    def __reduce__(self):   # pickle (procesy eksportu): źródło jako JSON, kompilowane raz na proces
+        return _unpickle, (json.dumps(dict(self.raw), sort_keys=True),)
+
+
+def compile_settings(settings: dict) -> CompiledSettings:
+    raw = copy.deepcopy(settings)
+    colors = raw.get("colors", {})
+    conductors = {k: str(v) for k, v in colors.get("conductors", {}).items()}
+    palette = {k: str(v) for k, v in colors.get("circuit_palette", {}).items()}
+    return CompiledSettings(
+        raw=MappingProxyType(raw),
+        ui=MappingProxyType(dict(raw.get("ui", {}))),
+        conductor_hex=MappingProxyType(conductors),
+        conductor_rgb=MappingProxyType({k: parse_hex(v) for k, v in conductors.items()}),
+        palette_hex=MappingProxyType(palette),
+        palette_rgb=MappingProxyType({k: parse_hex(v) for k, v in palette.items()}),
+        limits=MappingProxyType({k: _num(v) for k, v in raw.get("limits", {}).items()}),
+    )
+
+
+@lru_cache(maxsize=4)
+def _unpickle(text: str) -> CompiledSettings:
+    return compile_settings(json.loads(text))
+
+
+def compiled(settings) -> CompiledSettings:
+    """Przyjmij słownik albo gotowe :class:`CompiledSettings`."""
+    return settings if isinstance(settings, CompiledSettings) else compile_settings(settings)
@@ -0,0 +1,189 @@
+"""
+Katalogowy format projektu Elektryka z pokojami w osobnych plikach (shardach).
+
+Układ katalogu ``<nazwa>.elkproj``::
+
+    manifest.json        # domy z listą pokoi (uid + nazwa), obwody, rozdzielnica, meta
+    rooms/<uid>.json     # pełna zawartość jednego pokoju
+
+Otwarcie projektu czyta wyłącznie manifest — pokoje powstają jako puste
+zaślepki i są doczytywane przez :class:`ShardStore` dopiero przy pierwszym
+użyciu. Niezmienione pokoje, do których dawno nie zaglądano, są zwalniane
+(LRU), gdy liczba wczytanych pokoi przekroczy limit.
+
+Ten sam układ (manifest + ``rooms/``) wykorzystuje autozapis.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Callable, Iterable, Optional, Set
+
+from elektryka_model import Project, House, Room, Circuit, room_to_dict, room_from_dict
+
+PROJECT_DIR_SUFFIX = ".elkproj"
+MANIFEST_NAME = "manifest.json"
+ROOMS_DIR = "rooms"
+DEFAULT_MAX_LOADED_ROOMS = 40
+
+
+def write_json(path: str, payload) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def read_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def room_path(directory: str, uid: str) -> str:
+    return os.path.join(directory, ROOMS_DIR, f"{uid}.json")
+
+
+def build_manifest(project: Project) -> dict:
+    """Manifest projektu: wszystko poza zawartością pokoi."""
+    return {
+        "format": 1,
+        "version": project.version,
+        "houses": [{"name": h.name, "rooms": [{"uid": r.uid, "name": r.name} for r in h.rooms]}
+                   for h in project.houses],
+        "circuits": [asdict(c) for c in project.circuits],
+        "distribution_board": project.distribution_board,
+        "meta": project.meta,
+    }
+
+
+def prune_rooms(directory: str, alive: Set[str]) -> None:
+    """Usuń pliki pokoi, których nie ma już w manifeście."""
+    rooms_dir = os.path.join(directory, ROOMS_DIR)
+    if not os.path.isdir(rooms_dir):
+        return
+    for name in os.listdir(rooms_dir):
+        if name.endswith(".json") and name[:-5] not in alive:
+            try:
+                os.remove(os.path.join(rooms_dir, name))
+            except OSError:
+                pass
+
+
+class ShardStore:
+    """Leniwe wczytywanie i zwalnianie pokoi projektu katalogowego."""
+
+    def __init__(self, path: str, max_loaded: int = DEFAULT_MAX_LOADED_ROOMS):
+        self.path = path
+        self.max_loaded = max(1, int(max_loaded))
+        self._loaded: "OrderedDict[str, Room]" = OrderedDict()   # uid -> Room (kolejność LRU)
+        self._unloaded: Set[str] = set()
+        self.modified: Set[str] = set()   # zmienione od wczytania/zapisu — nie wolno ich zwolnić
+        self.on_load: Optional[Callable[[Room], None]] = None   # wywoływane po doczytaniu pokoju z dysku
+
+    def is_loaded(self, room: Room) -> bool:
+        return room.uid not in self._unloaded
+
+    def view(self, room: Room) -> Room:
+        """Pokój do odczytu: wczytany albo kopia z pliku, bez wczytywania do projektu (LRU bez zmian)."""
+        if room.uid in self._unloaded:
+            return room_from_dict(read_json(room_path(self.path, room.uid)))
+        return room
+
+    def ensure_loaded(self, room: Room, keep: Iterable[Room] = ()) -> Room:
+        fresh = room.uid in self._unloaded
+        if fresh:
+            data = read_json(room_path(self.path, room.uid))
+            full = room_from_dict(data)
+            room.background_image = full.background_image
+            room.elements, room.segments, room.links = full.elements, full.segments, full.links
+            self._unloaded.discard(room.uid)
+        self._loaded[room.uid] = room
+        self._loaded.move_to_end(room.uid)
+        if fresh and self.on_load is not None:
+            self.on_load(room)
+        self.evict(keep=[room, *keep])
+        return room
+
+    def load_all(self, rooms: Iterable[Room]) -> None:
+        """Doczytaj wszystkie pokoje bez zwalniania (np. przed zapisem do jednego pliku JSON)."""
+        for room in rooms:
+            if room.uid in self._unloaded:
+                self.max_loaded += 1
+                self.ensure_loaded(room)
+
+    def touch(self, room: Room) -> None:
+        self.modified.add(room.uid)
+        if room.uid not in self._unloaded:
+            self._loaded[room.uid] = room
+
+    def evict(self, keep: Iterable[Room] = ()) -> None:
+        keep_ids = {r.uid for r in keep}
+        for uid in list(self._loaded):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if uid in keep_ids or uid in self.modified:
+                continue
+            room = self._loaded.pop(uid)
+            room.elements, room.segments, room.links = [], [], []
+            self._unloaded.add(uid)
+
+    def forget(self, alive: Set[str]) -> None:
+        """Po usunięciu pokoi z projektu."""
+        for uid in list(self._loaded):
+            if uid not in alive:
+                del self._loaded[uid]
+        self._unloaded &= alive
+        self.modified &= alive
+
+
+def open_project_dir(path: str, max_loaded: int = DEFAULT_MAX_LOADED_ROOMS):
+    """Wczytaj sam manifest; pokoje jako zaślepki. Zwraca ``(Project, ShardStore)``."""
+    man = read_json(os.path.join(path, MANIFEST_NAME))
+    store = ShardStore(path, max_loaded)
+    houses = []
+    for h in man.get("houses", []):
+        rooms = []
+        for rr in h.get("rooms", []):
+            rooms.append(Room(name=rr.get("name", ""), uid=rr["uid"]))
+            store._unloaded.add(rr["uid"])
+        houses.append(House(name=h.get("name", ""), rooms=rooms))
+    project = Project(
+        version=man.get("version", "0.7.0"),
+        houses=houses,
+        circuits=[Circuit(**c) for c in man.get("circuits", [])],
+        distribution_board=man.get("distribution_board", {"free_leads": []}),
+        meta=man.get("meta", {}),
+    )
+    return project, store
+
+
+def save_project_dir(project: Project, path: str, store: Optional[ShardStore] = None) -> None:
+    """Zapisz projekt katalogowy.
+
+    Do tego samego katalogu przepisywane są tylko pokoje zmienione lub nowe;
+    niewczytane pokoje z innego katalogu są kopiowane bez parsowania.
+    """
+    os.makedirs(os.path.join(path, ROOMS_DIR), exist_ok=True)
+    same = store is not None and os.path.abspath(store.path) == os.path.abspath(path)
+    alive = set()
+    for h in project.houses:
+        for r in h.rooms:
+            alive.add(r.uid)
+            dst = room_path(path, r.uid)
+            if store is not None and not store.is_loaded(r):
+                if not same:
+                    shutil.copyfile(room_path(store.path, r.uid), dst)
+                continue
+            if same and r.uid not in store.modified and os.path.exists(dst):
+                continue
+            write_json(dst, room_to_dict(r))
+    write_json(os.path.join(path, MANIFEST_NAME), build_manifest(project))
+    prune_rooms(path, alive)
+    if store is not None:
+        store.path = path
+        store.modified.clear()
+        store.forget(alive)
@@ -0,0 +1,174 @@
+"""
+Dobór przekroju przewodów (Cu, izolacja PVC 70 °C) — wsadowo, bez Tkintera.
+
+Obciążalność długotrwała wg sposobu ułożenia (PN-HD 60364-5-52, tablice
+B.52.2–B.52.5: A1, A2, B1, B2, C, E; dwie żyły obciążone dla 1f, trzy dla
+3f) jest mnożona przez współczynniki temperatury otoczenia i grupowania
+obwodów. Dla każdego wiersza wybierany jest najmniejszy przekrój, który
+spełnia jednocześnie:
+
+* ``Iz ≥ Ib`` (oraz ``Iz ≥ In``, jeśli podano prąd zabezpieczenia),
+* spadek napięcia ≤ ``max_drop_pct`` — przekrój minimalny ze wzoru
+  ``S ≥ k·L·I / ΔU%``.
+
+Oba warunki to wyszukanie w posortowanej tablicy (``bisect`` albo —
+z NumPy — ``searchsorted`` dla wszystkich wierszy naraz).
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from elektryka_loads import U_1F, U_3F, drop_coefficient   # jeden wzór spadku dla całego programu
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+    np = None
+
+SECTIONS = (1.5, 2.5, 4.0, 6.0, 10.0, 16.0, 25.0, 35.0, 50.0)
+
+# sposób ułożenia -> (obciążalność [A] dla 2 żył obciążonych, dla 3 żył), kolejno jak SECTIONS
+AMPACITY: Dict[str, Tuple[Tuple[float, ...], Tuple[float, ...]]] = {
+    "A1": ((14.5, 19.5, 26, 34, 46, 61, 80, 99, 119), (13.5, 18, 24, 31, 42, 56, 73, 89, 108)),
+    "A2": ((14, 18.5, 25, 32, 43, 57, 75, 92, 110), (13, 17.5, 23, 29, 39, 52, 68, 83, 99)),
+    "B1": ((17.5, 24, 32, 41, 57, 76, 101, 125, 151), (15.5, 21, 28, 36, 50, 68, 89, 110, 134)),
+    "B2": ((16.5, 23, 30, 38, 52, 69, 90, 111, 133), (15, 20, 27, 34, 46, 62, 80, 99, 118)),
+    "C": ((19.5, 27, 36, 46, 63, 85, 112, 138, 168), (17.5, 24, 32, 41, 57, 76, 96, 119, 144)),
+    "E": ((22, 30, 40, 51, 70, 94, 119, 148, 180), (18.5, 25, 34, 43, 60, 80, 101, 126, 153)),
+}
+METHODS = tuple(AMPACITY)
+METHOD_LABELS = {
+    "A1": "A1 – w rurce w ścianie izolowanej cieplnie (żyły)",
+    "A2": "A2 – w rurce w ścianie izolowanej cieplnie (kabel)",
+    "B1": "B1 – w rurce na ścianie / w tynku (żyły)",
+    "B2": "B2 – w rurce na ścianie / w tynku (kabel)",
+    "C": "C – bezpośrednio na ścianie / w tynku",
+    "E": "E – w powietrzu, na korytku perforowanym",
+}
+
+# temperatura otoczenia [°C] -> współczynnik (PVC); pośrednie — wg wyższej temperatury
+TEMPS = (10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60)
+TEMP_FACTORS = (1.22, 1.17, 1.12, 1.06, 1.00, 0.94, 0.87, 0.79, 0.71, 0.61, 0.50)
+# liczba obwodów w wiązce -> współczynnik; pośrednie — wg większej liczby
+GROUPS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 12, 16, 20)
+GROUP_FACTORS = (1.00, 0.80, 0.70, 0.65, 0.60, 0.57, 0.54, 0.52, 0.50, 0.45, 0.41, 0.38)
+
+Number = Union[float, int]
+Column = Union[Number, str, None, Sequence]
+
+
+def temperature_factor(ambient_c: float) -> float:
+    i = bisect.bisect_left(TEMPS, ambient_c)
+    return TEMP_FACTORS[min(i, len(TEMPS) - 1)] if ambient_c <= TEMPS[-1] else 0.0
+
+
+def grouping_factor(circuits: int) -> float:
+    i = bisect.bisect_left(GROUPS, max(1, circuits))
+    return GROUP_FACTORS[min(i, len(GROUPS) - 1)]
+
+
+def load_current(power_w: float, voltage: float, phases: int = 1, cos_phi: float = 1.0) -> float:
+    """Prąd obliczeniowy Ib: 1f — P/(U·cosφ), 3f — P/(√3·U·cosφ) (U międzyfazowe)."""
+    if voltage <= 0 or cos_phi <= 0:
+        return math.nan
+    return power_w / ((math.sqrt(3) if phases == 3 else 1.0) * voltage * cos_phi)
+
+
+def drop_pct(length_m: float, current_a: float, section_mm2: float, voltage: float, phases: int = 1) -> float:
+    """ΔU% = k·ρ·L·I / (S·U) · 100; k = 2 (1f) albo √3 (3f) — :func:`elektryka_loads.drop_coefficient`."""
+    return drop_coefficient(phases == 3, voltage) * length_m * current_a / section_mm2
+
+
+@dataclass
+class SizingResult:
+    """Kolumny wyników (wiersz i — i-ty wiersz wejścia); ``section_mm2`` None — brak przekroju w tablicy."""
+    current_a: List[float] = field(default_factory=list)
+    section_mm2: List[Optional[float]] = field(default_factory=list)
+    ampacity_a: List[Optional[float]] = field(default_factory=list)     # Iz po współczynnikach
+    drop_pct: List[Optional[float]] = field(default_factory=list)
+    governed_by: List[str] = field(default_factory=list)                # "prąd" / "spadek" / "" (brak)
+
+    def __len__(self) -> int:
+        return len(self.current_a)
+
+    def row(self, i: int) -> Tuple[float, Optional[float], Optional[float], Optional[float], str]:
+        return self.current_a[i], self.section_mm2[i], self.ampacity_a[i], self.drop_pct[i], self.governed_by[i]
+
+
+def _columns(n: Optional[int], **cols: Column) -> Tuple[int, Dict[str, list]]:
+    """Skalary rozciągnięte do długości najdłuższej kolumny."""
+    seqs = {k: v for k, v in cols.items() if isinstance(v, (list, tuple)) or (NUMPY_AVAILABLE and isinstance(v, np.ndarray))}
+    n = n if n is not None else max((len(v) for v in seqs.values()), default=1)
+    out = {}
+    for k, v in cols.items():
+        if k in seqs:
+            if len(v) != n:
+                raise ValueError(f"{k}: {len(v)} wierszy zamiast {n}")
+            out[k] = list(v)
+        else:
+            out[k] = [v] * n
+    return n, out
+
+
+def size_cables(power_w: Column, length_m: Column, voltage: Column = None, phases: Column = 1,
+                method: Column = "C", ambient_c: Column = 30.0, grouped: Column = 1,
+                max_drop_pct: Column = 5.0, breaker_a: Column = None, cos_phi: Column = 1.0) -> SizingResult:
+    """Najmniejszy przekrój spełniający obciążalność i spadek napięcia dla każdego wiersza.
+
+    Każdy argument to skalar albo sekwencja (wspólnej długości); ``method`` — klucz :data:`AMPACITY`.
+    ``voltage`` None (także w wierszu) — U_1F albo U_3F według ``phases`` wiersza.
+    """
+    n, c = _columns(None, power_w=power_w, length_m=length_m, voltage=voltage, phases=phases, method=method,
+                    ambient_c=ambient_c, grouped=grouped, max_drop_pct=max_drop_pct, breaker_a=breaker_a,
+                    cos_phi=cos_phi)
+    for m in set(c["method"]):
+        if m not in AMPACITY:
+            raise ValueError(f"nieznany sposób ułożenia: {m!r} (dostępne: {', '.join(METHODS)})")
+    three = [int(p) == 3 for p in c["phases"]]
+    volt = [float(u) if u is not None else (U_3F if t else U_1F) for u, t in zip(c["voltage"], three)]
+    cur = [load_current(float(p or 0), u, 3 if t else 1, float(cf))
+           for p, u, t, cf in zip(c["power_w"], volt, three, c["cos_phi"])]
+    derate = [temperature_factor(float(t)) * grouping_factor(int(g)) for t, g in zip(c["ambient_c"], c["grouped"])]
+    # wymagana obciążalność z tablicy (przed współczynnikami) i przekrój minimalny ze spadku
+    need_a = [max(i, float(b or 0)) / d if d > 0 else math.inf for i, b, d in zip(cur, c["breaker_a"], derate)]
+    need_s = [drop_coefficient(t, u) * float(L) * i / float(lim) if float(lim) > 0 and u > 0 else math.inf
+              for L, i, lim, u, t in zip(c["length_m"], cur, c["max_drop_pct"], volt, three)]
+    k_amp = [0] * n
+    if NUMPY_AVAILABLE and n > 64:
+        k_sec = np.searchsorted(np.asarray(SECTIONS), np.asarray(need_s, dtype=float) - 1e-9, side="left").tolist()
+        keys = [(m, t) for m, t in zip(c["method"], three)]
+        for key in set(keys):
+            rows = np.asarray([i for i, k in enumerate(keys) if k == key])
+            table = np.asarray(AMPACITY[key[0]][1 if key[1] else 0])
+            found = np.searchsorted(table, np.asarray(need_a, dtype=float)[rows] - 1e-9, side="left")
+            for i, k in zip(rows.tolist(), found.tolist()):
+                k_amp[i] = k
+    else:
+        k_sec = [bisect.bisect_left(SECTIONS, s - 1e-9) for s in need_s]
+        for i, (m, t, a) in enumerate(zip(c["method"], three, need_a)):
+            k_amp[i] = bisect.bisect_left(AMPACITY[m][1 if t else 0], a - 1e-9)
+    out = SizingResult()
+    for i in range(n):
+        table = AMPACITY[c["method"][i]][1 if three[i] else 0]
+        k = max(k_amp[i], k_sec[i])
+        out.current_a.append(cur[i])
+        if cur[i] != cur[i] or k >= len(SECTIONS):
+            out.section_mm2.append(None); out.ampacity_a.append(None); out.drop_pct.append(None); out.governed_by.append("")
+            continue
+        s = SECTIONS[k]
+        out.section_mm2.append(s)
+        out.ampacity_a.append(table[k] * derate[i])
+        out.drop_pct.append(drop_pct(float(c["length_m"][i]), cur[i], s, volt[i], 3 if three[i] else 1))
+        out.governed_by.append("spadek" if k_sec[i] > k_amp[i] else "prąd")
+    return out
+
+
+def size_cable(power_w: float, length_m: float, **kw) -> Tuple[float, Optional[float], Optional[float], Optional[float], str]:
+    """Jeden przewód: ``(Ib, przekrój, Iz, ΔU%, warunek decydujący)``."""
+    return size_cables([power_w], [length_m], **kw).row(0)
@@ -0,0 +1,146 @@
+"""
+Miniatury pokoi (układ, elementy, tło) generowane w tle i zapisywane na dysku.
+
+Plik miniatury nazywa się skrótem zawartości pokoju (:func:`room_digest`),
+więc niezmieniony pokój nigdy nie jest rysowany ponownie — także po
+ponownym uruchomieniu programu — a zmiana pokoju po prostu daje nowy skrót::
+
+    .elektryka_thumbs/<sha1>.png
+
+Rysowanie i haszowanie odbywa się w wątku :class:`ThumbnailWorker`; wątek Tk
+przekazuje jedynie słownik pokoju (lub ścieżkę pliku pokoju projektu
+katalogowego) i odbiera ścieżki gotowych plików PNG.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import queue
+import threading
+from typing import Optional, Tuple, Union
+
+from elektryka_model import room_from_dict
+from elektryka_render import SEGMENT_RGB, open_background
+from elektryka_shards import read_json
+
+try:
+    from PIL import Image, ImageDraw
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+    Image = ImageDraw = None
+
+THUMB_DIR = ".elektryka_thumbs"
+THUMB_SIZE = (128, 80)
+THUMB_VERSION = 1          # zmiana wyglądu miniatur = nowe skróty
+MAX_THUMBS = 2000
+
+
+def _background_stamp(src: str) -> str:
+    """Tło z pliku może się zmienić pod tą samą ścieżką; odwołania ``elk:`` zawierają już skrót zawartości."""
+    if not src or src.startswith("elk:"):
+        return src or ""
+    try:
+        st = os.stat(src)
+        return f"{os.path.abspath(src)}|{st.st_mtime_ns}|{st.st_size}"
+    except OSError:
+        return src
+
+
+def room_digest(data: dict, size: Tuple[int, int] = THUMB_SIZE) -> str:
+    """Skrót zawartości pokoju (słownik jak w JSON) — klucz miniatury na dysku."""
+    payload = {k: v for k, v in data.items() if k not in ("name", "uid")}   # nazwa nie jest rysowana
+    payload["_bg"] = _background_stamp(data.get("background_image", ""))
+    payload["_v"] = [THUMB_VERSION, list(size)]
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def render_thumbnail(data: dict, archive_path: Optional[str] = None, size: Tuple[int, int] = THUMB_SIZE):
+    """Miniatura pokoju: tło w natywnych współrzędnych płótna, segmenty i elementy jako kropki."""
+    room = room_from_dict(data)
+    try:
+        bg = open_background(room.background_image, archive_path)
+    except Exception:
+        bg = None
+    xs = [p[0] for s in room.segments for p in (s.a, s.b)] + [e.x for e in room.elements]
+    ys = [p[1] for s in room.segments for p in (s.a, s.b)] + [e.y for e in room.elements]
+    W = max([bg.width if bg else 0, *[x + 20 for x in xs], 400])
+    H = max([bg.height if bg else 0, *[y + 20 for y in ys], 250])
+    k = min(size[0] / W, size[1] / H)
+    img = Image.new("RGB", size, "white")
+    if bg is not None:
+        bg.thumbnail((max(1, int(bg.width * k)), max(1, int(bg.height * k))))
+        img.paste(bg, (0, 0))
+    draw = ImageDraw.Draw(img)
+    for s in room.segments:
+        draw.line([s.a[0]*k, s.a[1]*k, s.b[0]*k, s.b[1]*k], fill=SEGMENT_RGB.get(s.kind, (43,43,43)),
+                  width=2 if s.kind == "SCIANA" else 1)
+    for e in room.elements:
+        x, y = e.x * k, e.y * k
+        draw.ellipse([x-2, y-2, x+2, y+2], outline=(0,0,0), fill=(255,255,255))
+    draw.rectangle([0, 0, size[0]-1, size[1]-1], outline=(160,160,160))
+    return img
+
+
+class ThumbnailWorker:
+    """Wątek generujący miniatury; wyniki ``(klucz, ścieżka PNG | None)`` w :attr:`results`."""
+
+    def __init__(self, directory: str = THUMB_DIR, size: Tuple[int, int] = THUMB_SIZE):
+        self.directory = directory
+        self.size = size
+        self.results: "queue.Queue[Tuple[str, Optional[str]]]" = queue.Queue()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="elektryka-thumbs", daemon=True)
+        self._thread.start()
+
+    def submit(self, key: str, source: Union[dict, str], archive_path: Optional[str] = None) -> None:
+        """``source`` — słownik pokoju (kopia z wątku Tk) albo ścieżka pliku pokoju."""
+        self._queue.put((key, source, archive_path))
+
+    def close(self, timeout: float = 2.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        prune_thumbnails(self.directory)
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            key, source, archive_path = job
+            try:
+                self.results.put((key, self._thumbnail(source, archive_path)))
+            except Exception:   # uszkodzony pokój/tło — bez miniatury, bez zatrzymania wątku
+                self.results.put((key, None))
+
+    def _thumbnail(self, source: Union[dict, str], archive_path: Optional[str]) -> Optional[str]:
+        data = read_json(source) if isinstance(source, str) else source
+        path = os.path.join(self.directory, room_digest(data, self.size) + ".png")
+        if os.path.exists(path):
+            os.utime(path)          # świeżo użyta — chroniona przed przycinaniem
+            return path
+        if not PIL_AVAILABLE:
+            return None
+        tmp = path + ".tmp"
+        render_thumbnail(data, archive_path, self.size).save(tmp, "PNG")
+        os.replace(tmp, path)
+        return path
+
+
+def prune_thumbnails(directory: str = THUMB_DIR, keep: int = MAX_THUMBS) -> None:
+    """Usuń najdawniej używane miniatury ponad limit."""
+    try:
+        files = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".png")]
+    except OSError:
+        return
+    if len(files) <= keep:
+        return
+    files.sort(key=lambda p: os.stat(p).st_mtime)
+    for p in files[:len(files) - keep]:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
@@ -0,0 +1,210 @@
+"""
+Topologia ścian pokoju: graf wierzchołków i krawędzi z segmentów układu.
+
+Segmenty rysowane „origami” (lub importowane) to luźna lista odcinków.
+:func:`build_topology` skleja końce leżące bliżej niż ``snap`` pikseli,
+dzieli krawędzie w miejscu styku „T” i obchodzi ściany grafu planarnego,
+dzięki czemu wiadomo:
+
+* czy ściany tworzą zamknięty obrys (wielokąty),
+* jaka jest powierzchnia i obwód pokoju (w metrach wg ``ui.px_per_meter``),
+* która ściana leży po stronie N/E/S/W (portale między pokojami).
+
+Okna i drzwi są częścią obrysu (rysuje się je w ciągu ze ścianami);
+przejścia (``PRZEJSCIE``) leżą na ścianach i są pomijane.
+:class:`TopologyCache` trzyma wynik dla pokoju i buduje go ponownie
+tylko po zmianie segmentów.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from elektryka_model import Room, Segment
+
+SNAP_PX = 3.0
+AXIS_TOL = 0.05           # |dy/dx| (lub |dx/dy|) uznawane jeszcze za ścianę poziomą (pionową)
+SIDES = ("N", "E", "S", "W")
+OUTLINE_KINDS = ("SCIANA", "OKNO", "DRZWI")
+
+Point = Tuple[float, float]
+
+
+@dataclass
+class RoomTopology:
+    """Graf ścian pokoju (współrzędne płótna, px)."""
+    vertices: List[Point] = field(default_factory=list)
+    edges: List[Tuple[int, int, int]] = field(default_factory=list)     # (u, v, indeks segmentu)
+    polygons: List[List[int]] = field(default_factory=list)            # obiegi wierzchołków ograniczonych ścian grafu
+    outline: List[int] = field(default_factory=list)                   # krawędzie obrysu zewnętrznego
+    area_px: float = 0.0
+    perimeter_px: float = 0.0
+    sides: Dict[str, int] = field(default_factory=dict)                # strona -> indeks segmentu ściany
+    open_ends: int = 0                                                 # wierzchołki stopnia 1 (niedomknięte ściany)
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.polygons) and self.open_ends == 0
+
+    def area_m2(self, px_per_meter: float) -> float:
+        return self.area_px / (px_per_meter * px_per_meter) if px_per_meter > 0 else 0.0
+
+    def perimeter_m(self, px_per_meter: float) -> float:
+        return self.perimeter_px / px_per_meter if px_per_meter > 0 else 0.0
+
+    def side(self, room: Room, side: str) -> Optional[Segment]:
+        i = self.sides.get(side)
+        return room.segments[i] if i is not None and i < len(room.segments) else None
+
+
+class _Snapper:
+    """Sklejanie punktów w promieniu ``tol`` (siatka kubełków — O(1) na punkt)."""
+
+    def __init__(self, tol: float):
+        self.tol = max(tol, 1e-9)
+        self.points: List[Point] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def add(self, p: Point) -> int:
+        cx, cy = int(math.floor(p[0] / self.tol)), int(math.floor(p[1] / self.tol))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for i in self._cells.get((cx+dx, cy+dy), ()):
+                    q = self.points[i]
+                    if (q[0]-p[0])**2 + (q[1]-p[1])**2 <= self.tol**2:
+                        return i
+        self.points.append((float(p[0]), float(p[1])))
+        self._cells.setdefault((cx, cy), []).append(len(self.points) - 1)
+        return len(self.points) - 1
+
+
+def _split_t_junctions(pts: List[Point], edges: List[Tuple[int, int, int]], tol: float) -> List[Tuple[int, int, int]]:
+    """Wierzchołek leżący na wnętrzu krawędzi dzieli ją na dwie (ściana dochodząca do ściany)."""
+    out = []
+    for u, v, si in edges:
+        (x1, y1), (x2, y2) = pts[u], pts[v]
+        L2 = (x2-x1)**2 + (y2-y1)**2
+        on = []
+        for w, (px, py) in enumerate(pts):
+            if w in (u, v) or not (min(x1, x2)-tol <= px <= max(x1, x2)+tol and min(y1, y2)-tol <= py <= max(y1, y2)+tol):
+                continue
+            t = ((px-x1)*(x2-x1) + (py-y1)*(y2-y1)) / L2
+            if 0 < t < 1 and abs((x2-x1)*(py-y1) - (y2-y1)*(px-x1)) / math.sqrt(L2) <= tol:
+                on.append((t, w))
+        chain = [u] + [w for _, w in sorted(on)] + [v]
+        out.extend((a, b, si) for a, b in zip(chain, chain[1:]))
+    return out
+
+
+def _faces(pts: List[Point], edges: List[Tuple[int, int, int]]):
+    """Obejście ścian grafu planarnego → ``[(wierzchołki, krawędzie, pole ze znakiem)]``."""
+    out_edges: Dict[int, List[Tuple[float, int, int]]] = {}
+    for ei, (u, v, _) in enumerate(edges):
+        for a, b in ((u, v), (v, u)):
+            ang = math.atan2(pts[b][1]-pts[a][1], pts[b][0]-pts[a][0])
+            out_edges.setdefault(a, []).append((ang, b, ei))
+    for lst in out_edges.values():
+        lst.sort()
+    seen = set(); faces = []
+    for start in ((u, v) for u, v, _ in edges):
+        for a, b in (start, start[::-1]):
+            if (a, b) in seen:
+                continue
+            verts, eids = [], []
+            cur = (a, b)
+            while cur not in seen:
+                seen.add(cur); x, y = cur
+                verts.append(x)
+                lst = out_edges[y]
+                k = next(i for i, (_, w, _) in enumerate(lst) if w == x)
+                eids.append(lst[k][2])
+                nxt = lst[k-1][1]                       # następna krawędź: poprzednia wg kąta wokół y
+                cur = (y, nxt)
+            area = 0.5 * sum(pts[p][0]*pts[q][1] - pts[q][0]*pts[p][1] for p, q in zip(verts, verts[1:] + verts[:1]))
+            faces.append((verts, eids, area))
+    return faces
+
+
+def build_topology(segments: Iterable[Segment], snap: float = SNAP_PX) -> RoomTopology:
+    """Graf ścian z segmentów pokoju (patrz opis modułu)."""
+    segments = list(segments)
+    snapper = _Snapper(snap)
+    edges, keys = [], set()
+    for si, s in enumerate(segments):
+        if s.kind not in OUTLINE_KINDS:
+            continue
+        u, v = snapper.add(s.a), snapper.add(s.b)
+        if u != v and (min(u, v), max(u, v)) not in keys:
+            keys.add((min(u, v), max(u, v))); edges.append((u, v, si))
+    pts = snapper.points
+    edges = _split_t_junctions(pts, edges, snap)
+    topo = RoomTopology(vertices=pts, edges=edges)
+    degree: Dict[int, int] = {}
+    for u, v, _ in edges:
+        degree[u] = degree.get(u, 0) + 1; degree[v] = degree.get(v, 0) + 1
+    topo.open_ends = sum(1 for d in degree.values() if d == 1)
+
+    # ściany grafu: na ekranie (oś y w dół) wnętrza obiegane są z polem dodatnim
+    inner_edges: Dict[int, int] = {}
+    for verts, eids, area in _faces(pts, edges):
+        if area > 1e-9:
+            topo.polygons.append(verts); topo.area_px += area
+            for ei in eids:
+                inner_edges[ei] = inner_edges.get(ei, 0) + 1
+    topo.outline = sorted(ei for ei, n in inner_edges.items() if n == 1)   # druga strona — na zewnątrz
+    topo.perimeter_px = sum(math.dist(pts[edges[ei][0]], pts[edges[ei][1]]) for ei in topo.outline)
+    topo.sides = _sides(segments, edges, pts, topo.outline)
+    return topo
+
+
+def _sides(segments: List[Segment], edges, pts, outline: List[int]) -> Dict[str, int]:
+    """Ściana każdej strony: oznaczona ``portal_side`` albo skrajna pozioma/pionowa (obrysu, jeśli jest)."""
+    sides: Dict[str, int] = {}
+    for si, s in enumerate(segments):
+        if s.kind == "SCIANA" and s.portal_side in SIDES and s.portal_side not in sides:
+            sides[s.portal_side] = si
+    walls = {edges[ei][2] for ei in outline} if outline else set(range(len(segments)))
+    walls = [si for si in sorted(walls) if segments[si].kind == "SCIANA"]
+    horiz, vert = [], []
+    for si in walls:
+        (x1, y1), (x2, y2) = segments[si].a, segments[si].b
+        dx, dy = abs(x2-x1), abs(y2-y1)
+        if dx and dy <= AXIS_TOL * dx: horiz.append((si, (y1+y2)/2, dx))
+        elif dy and dx <= AXIS_TOL * dy: vert.append((si, (x1+x2)/2, dy))
+    for side, cands, sign in (("N", horiz, 1), ("S", horiz, -1), ("W", vert, 1), ("E", vert, -1)):
+        if side not in sides and cands:
+            # skrajna współrzędna; przy kilku ścianach na tej samej linii — najdłuższa
+            sides[side] = min(cands, key=lambda c: (sign*c[1], -c[2]))[0]
+    return sides
+
+
+class TopologyCache:
+    """Topologia pokoi wg ``uid``; :meth:`invalidate` (z ``_mark_dirty``) każe sprawdzić segmenty.
+
+    Po zmianie innej niż segmenty (elementy, linki) graf nie jest budowany
+    ponownie — porównywany jest tylko odcisk segmentów.
+    """
+
+    def __init__(self, snap: float = SNAP_PX):
+        self.snap = snap
+        self._cache: Dict[str, Tuple[tuple, RoomTopology]] = {}
+        self._stale: set = set()
+
+    def invalidate(self, rooms: Iterable[Room] = ()) -> None:
+        self._stale.update(r.uid for r in rooms)
+
+    def clear(self) -> None:
+        self._cache.clear(); self._stale.clear()
+
+    def get(self, room: Room) -> RoomTopology:
+        hit = self._cache.get(room.uid)
+        if hit is not None and room.uid not in self._stale:
+            return hit[1]
+        key = tuple((s.kind, tuple(s.a), tuple(s.b), s.portal_side) for s in room.segments)
+        self._stale.discard(room.uid)
+        if hit is None or hit[0] != key:
+            hit = (key, build_topology(room.segments, self.snap))
+            self._cache[room.uid] = hit
+        return hit[1]
@@ -0,0 +1,171 @@
+"""
+Wektorowy eksport rzutów pokoi do PDF i SVG.
+
+Rysowane są te same prymitywy co w eksporcie rastrowym
+(:func:`elektryka_render.room_primitives`) — linie, okręgi, prostokąty
+i tekst — więc plik jest mały, a tekst ostry przy każdym powiększeniu.
+Jedynym rastrem jest zdjęcie tła: JPEG trafia do pliku bez dekodowania,
+a to samo tło użyte w kilku pokojach jest osadzane tylko raz.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import os
+import zipfile
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from elektryka_model import Circuit, Room
+from elektryka_pdf import PdfWriter, jpeg_info, pdf_text
+from elektryka_render import PAGE_SIZE, check_cancel, resolve_room, room_primitives
+from elektryka_settings import compiled
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+    Image = None
+
+FONT_SIZE = 10
+_K = 0.5523  # aproksymacja okręgu krzywymi Béziera
+
+
+def read_background(src: str, archive_path: Optional[str] = None) -> Optional[bytes]:
+    """Surowe bajty pliku tła (ze ścieżki lub archiwum ``.elk``)."""
+    if not src:
+        return None
+    if src.startswith("elk:"):
+        if not archive_path:
+            return None
+        with zipfile.ZipFile(archive_path) as zf:
+            return zf.read(src[4:])
+    if os.path.isfile(src):
+        with open(src, "rb") as f:
+            return f.read()
+    return None
+
+
+def _as_jpeg(data: bytes) -> Optional[Tuple[bytes, int, int, int]]:
+    """JPEG gotowy do osadzenia: oryginał, a inne formaty przekodowane przez Pillow (jeśli jest)."""
+    info = jpeg_info(data)
+    if info:
+        return (data, *info)
+    if not PIL_AVAILABLE:
+        return None
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    buf = io.BytesIO(); img.save(buf, "JPEG", quality=90)
+    return buf.getvalue(), img.width, img.height, 3
+
+
+def _c(rgb) -> bytes:
+    return b"%.3f %.3f %.3f" % tuple(v / 255.0 for v in rgb)
+
+
+def pdf_page_ops(prims: Sequence[tuple], size=PAGE_SIZE, background: Optional[str] = None) -> bytes:
+    """Strumień operatorów strony; współrzędne prymitywów (góra-lewo) odwracane macierzą ``cm``."""
+    W, H = size
+    ops: List[bytes] = []
+    if background:
+        ops.append(b"q %d 0 0 %d 0 0 cm /%s Do Q" % (W, H, background.encode("ascii")))
+    ops.append(b"q 1 0 0 -1 0 %d cm 1 J 1 j" % H)
+    for p in prims:
+        kind = p[0]
+        if kind == "line":
+            _, x1, y1, x2, y2, col, w = p
+            ops.append(b"%s RG %d w %g %g m %g %g l S" % (_c(col), w, x1, y1, x2, y2))
+        elif kind == "rect":
+            _, x1, y1, x2, y2, out, fill = p
+            ops.append(b"%s RG %s rg 1 w %g %g %g %g re B" % (_c(out), _c(fill), x1, y1, x2 - x1, y2 - y1))
+        elif kind == "ellipse":
+            _, x1, y1, x2, y2, out, fill = p
+            cx, cy, rx, ry = (x1 + x2) / 2, (y1 + y2) / 2, (x2 - x1) / 2, (y2 - y1) / 2
+            kx, ky = rx * _K, ry * _K
+            ops.append(b"%s RG %s rg 1 w %g %g m "
+                       b"%g %g %g %g %g %g c %g %g %g %g %g %g c "
+                       b"%g %g %g %g %g %g c %g %g %g %g %g %g c B" % (
+                           _c(out), _c(fill), cx + rx, cy,
+                           cx + rx, cy + ky, cx + kx, cy + ry, cx, cy + ry,
+                           cx - kx, cy + ry, cx - rx, cy + ky, cx - rx, cy,
+                           cx - rx, cy - ky, cx - kx, cy - ry, cx, cy - ry,
+                           cx + kx, cy - ry, cx + rx, cy - ky, cx + rx, cy))
+        elif kind == "text":
+            _, x, y, text, col = p
+            # Tm z odwróconą osią Y przywraca normalną orientację glifów
+            ops.append(b"BT /F1 %d Tf %s rg 1 0 0 -1 %g %g Tm %s Tj ET"
+                       % (FONT_SIZE, _c(col), x, y + FONT_SIZE * 0.85, pdf_text(text)))
+    ops.append(b"Q")
+    return b"\n".join(ops)
+
+
+def export_rooms_pdf(path: str, rooms: Sequence[Room], circuits: Sequence[Circuit], settings,
+                     archive_path: Optional[str] = None, size=PAGE_SIZE, progress=None, cancel=None,
+                     targets=None, loop=None) -> None:
+    """Wektorowy PDF: strona na pokój, każde tło osadzone raz na cały dokument.
+
+    ``rooms`` — pokoje lub ścieżki plików pokoi (projekt katalogowy); ``targets`` — cele
+    linków między pokojami (patrz :func:`elektryka_render.room_primitives`), wspólne
+    albo lista — osobno dla każdego pokoju (pokoje z kilku domów); ``loop`` — stan pętli
+    zwarcia obwodów w legendzie.
+    """
+    embedded: Dict[str, Optional[int]] = {}
+    settings = compiled(settings)
+    per_room = targets if isinstance(targets, (list, tuple)) else [targets] * len(rooms)
+    with PdfWriter(path) as pdf:
+        for i, room in enumerate(rooms):
+            check_cancel(cancel)
+            room = resolve_room(room)
+            src = room.background_image
+            if src and src not in embedded:
+                data = read_background(src, archive_path)
+                jpg = _as_jpeg(data) if data else None
+                embedded[src] = pdf.add_jpeg(*jpg) if jpg else None
+            bg = embedded.get(src) if src else None
+            ops = pdf_page_ops(room_primitives(room, circuits, settings, size, per_room[i], loop), size, "Bg" if bg else None)
+            pdf.add_page(size[0], size[1], ops, {"Bg": bg} if bg else None, text=True)
+            if progress: progress(i+1, len(rooms))
+
+
+def _svg_rgb(rgb) -> str:
+    return "#%02x%02x%02x" % tuple(rgb)
+
+
+def room_svg(room: Room, circuits: Sequence[Circuit], settings,
+             archive_path: Optional[str] = None, size=PAGE_SIZE, targets=None, loop=None) -> str:
+    """Rzut pokoju jako dokument SVG (tło osadzone jako data URI)."""
+    W, H = size
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}" '
+           f'font-family="Helvetica, Arial, sans-serif" font-size="{FONT_SIZE}">',
+           f'<rect width="{W}" height="{H}" fill="#ffffff"/>']
+    data = read_background(room.background_image, archive_path)
+    if data:
+        mime = "image/jpeg" if jpeg_info(data) else "image/png"
+        out.append(f'<image x="0" y="0" width="{W}" height="{H}" preserveAspectRatio="none" '
+                   f'href="data:{mime};base64,{base64.b64encode(data).decode("ascii")}"/>')
+    for p in room_primitives(room, circuits, settings, size, targets, loop):
+        kind = p[0]
+        if kind == "line":
+            _, x1, y1, x2, y2, col, w = p
+            out.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{_svg_rgb(col)}" '
+                       f'stroke-width="{w}" stroke-linecap="round"/>')
+        elif kind == "rect":
+            _, x1, y1, x2, y2, o, fill = p
+            out.append(f'<rect x="{x1}" y="{y1}" width="{x2 - x1}" height="{y2 - y1}" '
+                       f'fill="{_svg_rgb(fill)}" stroke="{_svg_rgb(o)}"/>')
+        elif kind == "ellipse":
+            _, x1, y1, x2, y2, o, fill = p
+            out.append(f'<ellipse cx="{(x1 + x2) / 2:g}" cy="{(y1 + y2) / 2:g}" rx="{(x2 - x1) / 2:g}" '
+                       f'ry="{(y2 - y1) / 2:g}" fill="{_svg_rgb(fill)}" stroke="{_svg_rgb(o)}"/>')
+        elif kind == "text":
+            _, x, y, text, col = p
+            out.append(f'<text x="{x}" y="{y + FONT_SIZE * 0.85:g}" fill="{_svg_rgb(col)}">{escape(text)}</text>')
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+def export_room_svg(path: str, room: Room, circuits: Sequence[Circuit], settings,
+                    archive_path: Optional[str] = None, size=PAGE_SIZE, targets=None, loop=None) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(room_svg(room, circuits, settings, archive_path, size, targets, loop))
@@ -5,9 +5,11 @@ from __future__ import annotations
 import tkinter as tk
 from tkinter import ttk
 
+from elektryka_sizing import METHOD_LABELS, METHODS, size_cable
+
 
 class CableCalculatorDialog(tk.Toplevel):
-    """Simple dialog that estimates current, voltage drop and cable size."""
+    """Dialog that sizes a single cable through :func:`elektryka_sizing.size_cable`."""
 
     def __init__(self, master: tk.Misc):
         super().__init__(master)
@@ -24,6 +26,11 @@ class CableCalculatorDialog(tk.Toplevel):
         self.length_var = tk.StringVar()
         self.power_var = tk.StringVar()
         self.voltage_var = tk.StringVar(value="230")
+        self.phases_var = tk.StringVar(value="1")
+        self.method_var = tk.StringVar(value=METHOD_LABELS["C"])
+        self.ambient_var = tk.StringVar(value="30")
+        self.grouped_var = tk.StringVar(value="1")
+        self.max_drop_var = tk.StringVar(value="5")
 
         form = ttk.Frame(main)
         form.grid(row=0, column=0, sticky="nsew")
@@ -40,6 +47,24 @@ class CableCalculatorDialog(tk.Toplevel):
         voltage_entry = ttk.Entry(form, textvariable=self.voltage_var, width=12)
         voltage_entry.grid(row=2, column=1, sticky="we", padx=(8, 0), pady=6)
 
+        ttk.Label(form, text="Fazy:").grid(row=3, column=0, sticky="w", pady=6)
+        phases = ttk.Combobox(form, textvariable=self.phases_var, values=("1", "3"), width=10, state="readonly")
+        phases.grid(row=3, column=1, sticky="we", padx=(8, 0), pady=6)
+        phases.bind("<<ComboboxSelected>>", self._on_phases)
+
+        ttk.Label(form, text="Sposób ułożenia:").grid(row=4, column=0, sticky="w", pady=6)
+        ttk.Combobox(form, textvariable=self.method_var, values=[METHOD_LABELS[m] for m in METHODS],
+                     width=44, state="readonly").grid(row=4, column=1, sticky="we", padx=(8, 0), pady=6)
+
+        ttk.Label(form, text="Temperatura otoczenia [°C]:").grid(row=5, column=0, sticky="w", pady=6)
+        ttk.Entry(form, textvariable=self.ambient_var, width=12).grid(row=5, column=1, sticky="w", padx=(8, 0), pady=6)
+
+        ttk.Label(form, text="Obwodów w wiązce:").grid(row=6, column=0, sticky="w", pady=6)
+        ttk.Entry(form, textvariable=self.grouped_var, width=12).grid(row=6, column=1, sticky="w", padx=(8, 0), pady=6)
+
+        ttk.Label(form, text="Dopuszczalny spadek [%]:").grid(row=7, column=0, sticky="w", pady=6)
+        ttk.Entry(form, textvariable=self.max_drop_var, width=12).grid(row=7, column=1, sticky="w", padx=(8, 0), pady=6)
+
         button = ttk.Button(main, text="Oblicz", command=self._calculate)
         button.grid(row=1, column=0, pady=(12, 6), sticky="we")
 
@@ -51,11 +76,21 @@ class CableCalculatorDialog(tk.Toplevel):
 
         length_entry.focus_set()
 
+    def _on_phases(self, _event=None) -> None:
+        # typowe napięcie: fazowe dla 1f, międzyfazowe dla 3f
+        if self.phases_var.get() == "3" and self.voltage_var.get().strip() == "230":
+            self.voltage_var.set("400")
+        elif self.phases_var.get() == "1" and self.voltage_var.get().strip() == "400":
+            self.voltage_var.set("230")
+
     def _calculate(self) -> None:
         try:
             cable_length = float(self.length_var.get())
             power = float(self.power_var.get())
             voltage = float(self.voltage_var.get())
+            ambient = float(self.ambient_var.get())
+            grouped = int(self.grouped_var.get())
+            max_drop = float(self.max_drop_var.get())
         except ValueError:
             self.result_var.set("Błąd danych.")
             return
@@ -64,23 +99,19 @@ class CableCalculatorDialog(tk.Toplevel):
             self.result_var.set("Napięcie musi być dodatnie.")
             return
 
-        current = power / voltage
-
-        # Resistance of copper conductor (Ohm·mm²/m) ~ 0.0175
-        # Reference cross-section 1.5 mm² and conductivity 56 (MS/m) as in original dialog.
-        voltage_drop_percent = (2 * cable_length * current * 0.0175) / (1.5 * 56) * 100
+        method = next((m for m, label in METHOD_LABELS.items() if label == self.method_var.get()), "C")
+        current, section, ampacity, drop, governed_by = size_cable(
+            power, cable_length, voltage=voltage, phases=int(self.phases_var.get()), method=method,
+            ambient_c=ambient, grouped=grouped, max_drop_pct=max_drop,
+        )
 
-        if current <= 10:
-            cross_section = "1.5 mm²"
-        elif current <= 16:
-            cross_section = "2.5 mm²"
-        else:
-            cross_section = "4 mm²"
+        if section is None:
+            self.result_var.set(f"I = {current:.2f} A — żaden przekrój z tablicy (do 50 mm²) nie spełnia warunków.")
+            return
 
         self.result_var.set(
             (
-                f"I = {current:.2f} A, spadek ≈ {voltage_drop_percent:.2f}%, "
-                f"zalecany przewód: {cross_section}"
+                f"I = {current:.2f} A, zalecany przewód: {section:g} mm² "
+                f"(Iz = {ampacity:.1f} A, spadek ≈ {drop:.2f}%, decyduje: {governed_by})"
             )
         )
-